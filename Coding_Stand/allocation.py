@@ -0,0 +1,172 @@
+"""
+The code module splits an order across the warehouses holding the item.
+
+Functions:
+    - allocate_fewest
+    - allocate_oldest
+    - allocate_balanced
+    - allocate
+
+An allocation policy gets the quantity to order and one Source per
+warehouse holding the item, and returns how many items to take from
+each of them. Policies only look at the per-warehouse figures of the
+sources, so an allocation costs O(warehouses) whatever the size of the
+stock. New policies are registered in POLICIES.
+"""
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from inventory import SKU
+
+
+class Source(NamedTuple):
+    """
+    What one warehouse can give to an order.
+
+    Attributes:
+        warehouse (Warehouse): The warehouse holding the item.
+        sku (SKU): The SKU of the item in that warehouse.
+        available (int): The quantity of the SKU on hand.
+        occupancy (int): The number of items on hand in the warehouse.
+        oldest (int, optional): The stock date of the oldest item of
+        the SKU, in seconds since the epoch, or None if unknown.
+    """
+
+    warehouse: object
+    sku: SKU
+    available: int
+    occupancy: int
+    oldest: Optional[int] = None
+
+
+Allocation = List[Tuple[Source, int]]
+
+
+def _take_in_order(quantity: int, sources: List[Source]) -> Allocation:
+    """
+    Take as much as possible from each source in turn.
+
+    Args:
+        quantity (int): The quantity to order.
+        sources (List[Source]): The sources, in order of preference.
+
+    Returns:
+        Allocation: The quantity taken from each used source.
+    """
+    allocation = []
+    for source in sources:
+        if not quantity:
+            break
+        taken = min(quantity, source.available)
+        if taken:
+            allocation.append((source, taken))
+            quantity -= taken
+    return allocation
+
+
+def allocate_fewest(quantity: int, sources: List[Source]) -> Allocation:
+    """
+    Use as few warehouses as possible, the fullest ones first.
+
+    Args:
+        quantity (int): The quantity to order.
+        sources (List[Source]): The warehouses holding the item.
+
+    Returns:
+        Allocation: The quantity taken from each used warehouse.
+    """
+    return _take_in_order(
+        quantity, sorted(sources, key=lambda source: -source.available))
+
+
+def allocate_oldest(quantity: int, sources: List[Source]) -> Allocation:
+    """
+    Use the warehouses holding the oldest stock of the item first.
+
+    Args:
+        quantity (int): The quantity to order.
+        sources (List[Source]): The warehouses holding the item.
+
+    Returns:
+        Allocation: The quantity taken from each used warehouse.
+    """
+    return _take_in_order(quantity, sorted(
+        sources,
+        key=lambda source: (source.oldest is None, source.oldest or 0),
+    ))
+
+
+def allocate_balanced(quantity: int, sources: List[Source]) -> Allocation:
+    """
+    Take from the fullest warehouses so their occupancy evens out.
+
+    The items are taken down to a common occupancy level, found by a
+    binary search over the levels, so that after the order no used
+    warehouse holds more items than needed.
+
+    Args:
+        quantity (int): The quantity to order.
+        sources (List[Source]): The warehouses holding the item.
+
+    Returns:
+        Allocation: The quantity taken from each used warehouse.
+    """
+    def takes(level):
+        return [min(source.available, max(0, source.occupancy - level))
+                for source in sources]
+
+    # Find the highest level whose takes still cover the quantity
+    low, high = 0, max((source.occupancy for source in sources), default=0)
+    if sum(takes(low)) < quantity:
+        return _take_in_order(quantity, sources)
+    while low < high:
+        level = (low + high + 1) // 2
+        if sum(takes(level)) >= quantity:
+            low = level
+        else:
+            high = level - 1
+
+    # Fill up from one level higher, one item per warehouse at the top
+    taken = takes(low + 1)
+    missing = quantity - sum(taken)
+    for position, source in enumerate(sources):
+        if not missing:
+            break
+        if taken[position] < min(source.available,
+                                 source.occupancy - low):
+            taken[position] += 1
+            missing -= 1
+    return [(source, count)
+            for source, count in zip(sources, taken) if count]
+
+
+POLICIES: Dict[str, Callable[[int, List[Source]], Allocation]] = {
+    "fewest": allocate_fewest,
+    "oldest": allocate_oldest,
+    "balanced": allocate_balanced,
+}
+
+
+def allocate(quantity: int, sources: List[Source],
+             policy: str = "fewest") -> Allocation:
+    """
+    Split an order across warehouses under an allocation policy.
+
+    Args:
+        quantity (int): The quantity to order.
+        sources (List[Source]): The warehouses holding the item.
+        policy (str, optional): The name of a policy in POLICIES.
+        Defaults to "fewest".
+
+    Returns:
+        Allocation: The quantity taken from each used warehouse. It
+        covers less than the quantity if the sources hold too few items.
+
+    Raises:
+        ValueError: If the quantity is not positive or the policy is
+        unknown.
+    """
+    if quantity < 1:
+        raise ValueError("The quantity must be at least 1.")
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown allocation policy '{policy}'.")
+    return POLICIES[policy](quantity, sources)
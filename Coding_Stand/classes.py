@@ -3,6 +3,10 @@ The code module defines several classes related to managing warehouses.
 
 Classes:
     - Item
+    - ColumnEncoder
+    - StockTable
+    - ItemView
+    - CategoryIndex
     - Warehouse
     - WarehouseManager
     - User
@@ -16,9 +20,35 @@ These classes have methods for:
     - Placing orders
     - Recording session actions
 """
-from collections import Counter
-from datetime import datetime
-from typing import List, Tuple
+import heapq
+import threading
+from array import array
+from collections import Counter, defaultdict
+from collections.abc import Sequence
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from allocation import Source, allocate
+from inventory import (SKU, InsufficientQuantityError, InventoryLedger,
+                       sku_of)
+from metrics import REGISTRY
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+EPOCH = datetime(1970, 1, 1)
+
+ORDERS_PLACED = REGISTRY.counter(
+    "warehouse_orders_placed_total", "Order lines placed.")
+ITEMS_ORDERED = REGISTRY.counter(
+    "warehouse_items_ordered_total", "Items dispatched by orders.")
+SEARCHES = REGISTRY.counter(
+    "warehouse_searches_total", "Item searches run by employees.")
+WAREHOUSE_ITEMS = REGISTRY.gauge(
+    "warehouse_items", "Items on hand in each warehouse.", ["warehouse"])
+# The menu operations that wait for input are timed in their query parts
+OPERATION_SECONDS = REGISTRY.histogram(
+    "warehouse_operation_duration_seconds",
+    "Seconds taken by the warehouse operations.", ["operation"])
 
 
 # OK
@@ -33,9 +63,11 @@ class Item:
         warehouse (int): The ID of the warehouse where the item is stocked.
         date_of_stock (str): The date when the item was stocked
         in the warehouse.
+        expiry_date (str): The date when the item expires, or None.
     """
 
-    def __init__(self, state, category, warehouse, date_of_stock):
+    def __init__(self, state, category, warehouse, date_of_stock,
+                 expiry_date=None):
         """
         Initialize a new instance of the Item class.
 
@@ -45,11 +77,14 @@ class Item:
             warehouse (int): The ID of the warehouse where the item is stocked.
             date_of_stock (str): The date when the item was stocked in
             the warehouse.
+            expiry_date (str, optional): The date when the item expires.
+            Defaults to None, for items that do not expire.
         """
         self.state = state
         self.category = category
         self.warehouse = warehouse
         self.date_of_stock = date_of_stock
+        self.expiry_date = expiry_date
 
     def __str__(self):
         """
@@ -61,16 +96,460 @@ class Item:
         return f"{self.state} {self.category}"
 
 
+class ColumnEncoder:
+    """
+    Dictionary encoder mapping the values of a column to small integer codes.
+
+    Attributes:
+        values (list): The distinct values, indexed by their code.
+    """
+
+    def __init__(self):
+        """Initialize an empty encoder."""
+        self.values = []
+        self._codes = {}
+
+    def encode(self, value) -> int:
+        """
+        Return the code of a value, assigning a new one if needed.
+
+        Args:
+            value: The value to be encoded.
+
+        Returns:
+            int: The code of the value.
+        """
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code_of(self, value):
+        """
+        Return the code of a value without assigning a new one.
+
+        Args:
+            value: The value to look up.
+
+        Returns:
+            int: The code of the value, or None if it was never encoded.
+        """
+        return self._codes.get(value)
+
+
+class StockTable(Sequence):
+    """
+    Columnar storage for the items of a warehouse.
+
+    The state, category and warehouse of every row are stored as 16-bit
+    codes of shared ColumnEncoder instances, and the date of stock as
+    64-bit epoch seconds, so a row takes 14 bytes instead of a full Item
+    object. Indexing the table returns lightweight ItemView objects.
+
+    Attributes:
+        CODED_COLUMNS (tuple): The dictionary-encoded columns.
+        encoders (Dict[str, ColumnEncoder]): The encoders of the coded
+        columns, shared by every table created with them.
+    """
+
+    CODED_COLUMNS = ("state", "category", "warehouse")
+
+    def __init__(self, encoders: Dict[str, ColumnEncoder] = None):
+        """
+        Initialize an empty table.
+
+        Args:
+            encoders (Dict[str, ColumnEncoder], optional): The encoders to
+            share with other tables. Defaults to new encoders.
+        """
+        if encoders is None:
+            encoders = {
+                column: ColumnEncoder() for column in self.CODED_COLUMNS
+            }
+        self.encoders = encoders
+        self.columns = {column: array("H") for column in self.CODED_COLUMNS}
+        self.columns["date_of_stock"] = array("q")
+
+    def __len__(self) -> int:
+        """
+        Return the number of rows in the table.
+
+        Returns:
+            int: The number of rows.
+        """
+        return len(self.columns["date_of_stock"])
+
+    def __getitem__(self, index):
+        """
+        Return a view of a row, or a list of views for a slice.
+
+        Args:
+            index (int or slice): The row or rows to return.
+
+        Returns:
+            ItemView: The view of the row.
+        """
+        if isinstance(index, slice):
+            return [ItemView(self, row)
+                    for row in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("StockTable index out of range")
+        return ItemView(self, index)
+
+    def __iter__(self):
+        """
+        Iterate through views of the rows.
+
+        Yields:
+            ItemView: The view of each row, in insertion order.
+        """
+        for row in range(len(self)):
+            yield ItemView(self, row)
+
+    def append(self, item) -> None:
+        """
+        Append a row built from the attributes of an item.
+
+        Args:
+            item (Item): The item to be stored.
+        """
+        for column in self.CODED_COLUMNS:
+            code = self.encoders[column].encode(getattr(item, column))
+            self.columns[column].append(code)
+        self.columns["date_of_stock"].append(
+            self.encode_date(item.date_of_stock)
+        )
+
+    def value(self, column: str, row: int):
+        """
+        Return the decoded value of a column in a row.
+
+        Args:
+            column (str): The name of the column.
+            row (int): The row number.
+
+        Returns:
+            The value stored in the row.
+        """
+        if column == "date_of_stock":
+            return self.decode_date(self.columns[column][row])
+        return self.encoders[column].values[self.columns[column][row]]
+
+    def count_of(self, column: str, value) -> int:
+        """
+        Count the rows holding a value, scanning only the code column.
+
+        Args:
+            column (str): The name of a dictionary-encoded column.
+            value: The value to be counted.
+
+        Returns:
+            int: The number of rows holding the value.
+        """
+        code = self.encoders[column].code_of(value)
+        if code is None:
+            return 0
+        return self.columns[column].count(code)
+
+    def value_counts(self, *columns: str) -> Counter:
+        """
+        Count the rows holding each value of dictionary-encoded columns.
+
+        Args:
+            *columns (str): The names of one or more dictionary-encoded
+            columns.
+
+        Returns:
+            Counter: The number of rows per value, or per tuple of values
+            when several columns are given, in order of appearance.
+        """
+        values = [self.encoders[column].values for column in columns]
+        if len(columns) == 1:
+            return Counter({
+                values[0][code]: count
+                for code, count in Counter(self.columns[columns[0]]).items()
+            })
+        rows = zip(*(self.columns[column] for column in columns))
+        return Counter({
+            tuple(decoded[code] for decoded, code in zip(values, codes)):
+            count
+            for codes, count in Counter(rows).items()
+        })
+
+    @staticmethod
+    def encode_date(date_of_stock) -> int:
+        """
+        Convert a date of stock to epoch seconds.
+
+        Args:
+            date_of_stock (str or datetime): The date of stock, as a string
+            in DATE_FORMAT or as a datetime.
+
+        Returns:
+            int: The number of seconds since the epoch.
+        """
+        if not isinstance(date_of_stock, datetime):
+            date_of_stock = datetime.fromisoformat(date_of_stock)
+        return int((date_of_stock - EPOCH).total_seconds())
+
+    @staticmethod
+    def decode_date(seconds: int) -> str:
+        """
+        Convert epoch seconds back to a date of stock string.
+
+        Args:
+            seconds (int): The number of seconds since the epoch.
+
+        Returns:
+            str: The date of stock in DATE_FORMAT.
+        """
+        return (EPOCH + timedelta(seconds=seconds)).strftime(DATE_FORMAT)
+
+
+class ItemView:
+    """
+    Read-only view of a StockTable row with the attributes of an Item.
+
+    Attributes:
+        table (StockTable): The table holding the row.
+        row (int): The row number.
+    """
+
+    __slots__ = ("table", "row")
+
+    def __init__(self, table: StockTable, row: int):
+        """
+        Initialize a new view of a row.
+
+        Args:
+            table (StockTable): The table holding the row.
+            row (int): The row number.
+        """
+        self.table = table
+        self.row = row
+
+    @property
+    def state(self) -> str:
+        """str: The state of the item."""
+        return self.table.value("state", self.row)
+
+    @property
+    def category(self) -> str:
+        """str: The category of the item."""
+        return self.table.value("category", self.row)
+
+    @property
+    def warehouse(self) -> int:
+        """int: The ID of the warehouse where the item is stocked."""
+        return self.table.value("warehouse", self.row)
+
+    @property
+    def date_of_stock(self) -> str:
+        """str: The date when the item was stocked in the warehouse."""
+        return self.table.value("date_of_stock", self.row)
+
+    def __str__(self):
+        """
+        Return a string representation of the item.
+
+        Returns:
+            str: The state and category of the item.
+        """
+        return f"{self.state} {self.category}"
+
+
+class CategoryIndex:
+    """
+    Inverted index from lowercased category substrings to stock positions.
+
+    Categories repeat across thousands of items, so every distinct
+    lowercased category keeps a sorted array of the positions where it
+    occurs, and each of its n-grams (substrings up to ``GRAM_SIZE``
+    characters) points back to the category. A search resolves the
+    matching categories through the n-grams and only then touches the
+    positions, so its cost follows the number of matches instead of the
+    size of the stock.
+
+    Attributes:
+        GRAM_SIZE (int): The longest substring stored in the n-gram table.
+    """
+
+    GRAM_SIZE = 3
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._postings = {}
+        self._grams = defaultdict(set)
+        self._size = 0
+
+    def __len__(self) -> int:
+        """
+        Return the number of indexed positions.
+
+        Returns:
+            int: The number of positions added to the index.
+        """
+        return self._size
+
+    def add(self, category: str, position: int) -> None:
+        """
+        Index the item stored at a position under its category.
+
+        Positions must be added in increasing order, which is what
+        appending to a stock list does.
+
+        Args:
+            category (str): The category of the item.
+            position (int): The position of the item in the stock list.
+        """
+        key = category.lower()
+        positions = self._postings.get(key)
+        if positions is None:
+            positions = self._postings[key] = array("I")
+            for gram in self._grams_of(key):
+                self._grams[gram].add(key)
+        positions.append(position)
+        self._size += 1
+
+    def categories(self, search_term: str) -> List[str]:
+        """
+        Return the lowercased categories containing a search term.
+
+        Args:
+            search_term (str): The search term to be matched.
+
+        Returns:
+            List[str]: The indexed categories that contain the term.
+        """
+        term = search_term.lower()
+        if not term:
+            return list(self._postings)
+        if len(term) <= self.GRAM_SIZE:
+            return list(self._grams.get(term, ()))
+
+        candidates = None
+        for start in range(len(term) - self.GRAM_SIZE + 1):
+            gram = term[start:start + self.GRAM_SIZE]
+            matches = self._grams.get(gram)
+            if not matches:
+                return []
+            if candidates is None or len(matches) < len(candidates):
+                candidates = matches
+        return [category for category in candidates if term in category]
+
+    def postings(self) -> Dict[str, array]:
+        """
+        Return the position arrays of every indexed category.
+
+        Returns:
+            Dict[str, array]: The sorted positions per lowercased category.
+        """
+        return dict(self._postings)
+
+    @classmethod
+    def from_postings(cls, postings: Dict[str, array]) -> "CategoryIndex":
+        """
+        Rebuild an index from the output of postings().
+
+        Args:
+            postings (Dict[str, array]): The sorted positions per
+            lowercased category.
+
+        Returns:
+            CategoryIndex: The restored index.
+        """
+        index = cls()
+        for key, positions in postings.items():
+            index._postings[key] = positions
+            for gram in index._grams_of(key):
+                index._grams[gram].add(key)
+            index._size += len(positions)
+        return index
+
+    def positions(self, category: str) -> List[int]:
+        """
+        Return the positions of the items in exactly one category.
+
+        Args:
+            category (str): The category to look up, in any case.
+
+        Returns:
+            List[int]: The sorted positions of the items in the category.
+        """
+        return list(self._postings.get(category.lower(), ()))
+
+    def lookup(self, search_term: str) -> List[int]:
+        """
+        Return the positions of the items whose category contains a term.
+
+        Args:
+            search_term (str): The search term to be matched.
+
+        Returns:
+            List[int]: The sorted positions of the matching items.
+        """
+        postings = [
+            self._postings[category]
+            for category in self.categories(search_term)
+        ]
+        if len(postings) == 1:
+            return list(postings[0])
+        return list(heapq.merge(*postings))
+
+    def _grams_of(self, key: str):
+        """
+        Yield every substring of a key up to ``GRAM_SIZE`` characters.
+
+        Args:
+            key (str): The lowercased category.
+
+        Yields:
+            str: The n-grams of the key.
+        """
+        for size in range(1, self.GRAM_SIZE + 1):
+            for start in range(len(key) - size + 1):
+                yield key[start:start + size]
+
+
 class Warehouse:
     """
     Represents a warehouse and its stock of items.
 
     Attributes:
         id (int): The ID of the warehouse.
-        stock (List[Item]): The list of items in the warehouse's stock.
+        stock (List[Item] or StockTable): The items received by the
+        warehouse, including the ones already dispatched.
+        ledger (InventoryLedger): The quantities on hand per SKU.
+        _index (CategoryIndex): The category index over the stock,
+        kept up to date by add_item.
+        _shipped (set): The stock positions of dispatched items.
+        picking (str): The order in which dispatch picks the items of a
+        SKU, one of PICKING_ORDERS.
+        journal (EventLog): The log recording the received and
+        dispatched items, or None.
+        _queues (Dict[SKU, Dict[str, list]]): Per SKU and picking order,
+        a heap of the sort key and position of its items, built the
+        first time the order is used for the SKU.
+
+    Dispatching is thread-safe: concurrent dispatches of the same SKU are
+    serialized by the ledger lock of that SKU, and dispatches of other
+    SKUs run in parallel. Receiving is serialized by _sync_lock, which
+    is always taken before any SKU lock, never while one is held.
+
+    Dispatched items are picked from a per-SKU heap, so an order of k
+    items costs O(k log n) instead of a sort of the stock:
+        - "fifo": the oldest stock first
+        - "lifo": the newest stock first
+        - "expiry": the earliest expiry date first, then the oldest
     """
 
-    def __init__(self, warehouse_id=None):
+    PICKING_ORDERS = ("fifo", "lifo", "expiry")
+
+    def __init__(self, warehouse_id=None, table: StockTable = None,
+                 index: CategoryIndex = None, picking: str = "fifo"):
         """
 
         Initialize a new instance of the Warehouse class.
@@ -78,18 +557,43 @@ class Warehouse:
         Args:
             warehouse_id (int, optional): The ID of the warehouse.
             Defaults to None.
+            table (StockTable, optional): A columnar table to store the
+            stock in. Defaults to None, which stores a list of items.
+            index (CategoryIndex, optional): A prebuilt index over the
+            given table. Defaults to a new, empty index.
+            picking (str, optional): The picking order of dispatch.
+            Defaults to "fifo".
+
+        Raises:
+            ValueError: If the picking order is unknown.
         """
+        if picking not in self.PICKING_ORDERS:
+            raise ValueError(f"Unknown picking order '{picking}'.")
         self.id = warehouse_id
-        self.stock = []
+        self.picking = picking
+        self.journal = None
+        self.stock = [] if table is None else table
+        self._index = CategoryIndex() if index is None else index
+        self._shipped = set()
+        self._queues = {}
+        self._sync_lock = threading.Lock()
+        self.ledger = InventoryLedger()
+        self._received = 0
+        if table is not None:
+            self.ledger.receive_counts(
+                table.value_counts(*StockTable.CODED_COLUMNS).items())
+            self._received = len(table)
+        self._sync()
 
     def occupancy(self) -> int:
         """
         Returnsthe number of items in the warehouse's stock.
 
         Returns:
-            int: The number of items in the warehouse's stock.
+            int: The number of items on hand, as held by the ledger.
         """
-        return len(self.stock)
+        self._sync()
+        return len(self.ledger)
 
     def add_item(self, item: Item) -> None:
         """
@@ -98,7 +602,226 @@ class Warehouse:
         Args:
             item (Item): The item to be added to the warehouse's stock.
         """
-        self.stock.append(item)
+        # Logged first, so no order of the item can be logged before it
+        if self.journal is not None:
+            self.journal.receive(self.id, item)
+        self._receive(item)
+
+    def _receive(self, item: Item) -> None:
+        """
+        Add an item to the stock without logging it.
+
+        Args:
+            item (Item): The item to be added to the warehouse's stock.
+        """
+        # Appended and counted under one lock, so _sync never sees an
+        # item that is in the stock but not yet in the ledger. It is
+        # appended before it is indexed, as _queue reads the index
+        # without _sync_lock
+        with self._sync_lock:
+            self._catch_up()
+            self.stock.append(item)
+            self._index.add(item.category, len(self.stock) - 1)
+            self.ledger.receive(sku_of(item))
+            self._track(len(self.stock) - 1)
+            self._received += 1
+
+    def _sync(self) -> None:
+        """
+        Account for items appended to the stock list without add_item.
+
+        Must not be called while a ledger lock is held, as it takes
+        _sync_lock and then the locks of the SKUs it receives.
+        """
+        size = len(self.stock)
+        if self._received == size and len(self._index) == size:
+            return
+        with self._sync_lock:
+            self._catch_up()
+
+    def _catch_up(self) -> None:
+        """Index and receive the unaccounted items; needs _sync_lock."""
+        for position in range(len(self._index), len(self.stock)):
+            self._index.add(self.stock[position].category, position)
+        for position in range(self._received, len(self.stock)):
+            self.ledger.receive(sku_of(self.stock[position]))
+            self._track(position)
+        self._received = len(self.stock)
+
+    def _stocked_at(self, position: int) -> int:
+        """
+        Return the stock date of an item in seconds since the epoch.
+
+        Args:
+            position (int): The position of the item in the stock.
+
+        Returns:
+            int: The encoded stock date of the item.
+        """
+        if isinstance(self.stock, StockTable):
+            return self.stock.columns["date_of_stock"][position]
+        return StockTable.encode_date(self.stock[position].date_of_stock)
+
+    def _pick_key(self, picking: str, position: int):
+        """
+        Return the sort key of an item in a picking order.
+
+        Args:
+            picking (str): One of PICKING_ORDERS.
+            position (int): The position of the item in the stock.
+
+        Returns:
+            The key under which the item is queued, smallest first.
+        """
+        stocked_at = self._stocked_at(position)
+        if picking == "lifo":
+            return -stocked_at
+        if picking == "expiry":
+            # Table rows carry no expiry date, so they sort as non-expiring
+            expiry_date = getattr(self.stock[position], "expiry_date", None)
+            if expiry_date is None:
+                return (1, 0, stocked_at)
+            return (0, StockTable.encode_date(expiry_date), stocked_at)
+        return stocked_at
+
+    def _track(self, position: int) -> None:
+        """
+        Add a received item to the built picking queues of its SKU.
+
+        Args:
+            position (int): The position of the item in the stock.
+        """
+        sku = sku_of(self.stock[position])
+        if sku in self._queues:
+            with self.ledger.lock(sku):
+                for picking, queue in self._queues[sku].items():
+                    heapq.heappush(
+                        queue, (self._pick_key(picking, position), position))
+
+    def _queue(self, picking: str, sku: SKU) -> list:
+        """
+        Return the picking queue of a SKU, with an item on hand on top.
+
+        The caller must hold the ledger lock of the SKU.
+
+        Args:
+            picking (str): One of PICKING_ORDERS.
+            sku (SKU): The (state, category, warehouse) of the items.
+
+        Returns:
+            list: The heap of (key, position) pairs of the SKU.
+        """
+        queues = self._queues.setdefault(sku, {})
+        queue = queues.get(picking)
+        if queue is None:
+            queue = [(self._pick_key(picking, position), position)
+                     for position in self._index.positions(sku[1])
+                     if sku_of(self.stock[position]) == sku]
+            heapq.heapify(queue)
+            queues[picking] = queue
+        # Dispatched items are dropped lazily when they reach the top
+        while queue and queue[0][1] in self._shipped:
+            heapq.heappop(queue)
+        return queue
+
+    def oldest(self, sku: SKU):
+        """
+        Return the stock date of the oldest item of a SKU on hand.
+
+        Args:
+            sku (SKU): The (state, category, warehouse) of the items.
+
+        Returns:
+            int: The stock date in seconds since the epoch, or None if
+            no item of the SKU is on hand.
+        """
+        self._sync()
+        return self._oldest(sku)
+
+    def _oldest(self, sku: SKU):
+        """Return what oldest does, without syncing, see oldest."""
+        with self.ledger.lock(sku):
+            queue = self._queue("fifo", sku)
+            return queue[0][0] if queue else None
+
+    def sku_for(self, state: str, category: str):
+        """
+        Return the SKU this warehouse holds for a state and category.
+
+        Args:
+            state (str): The state of the items.
+            category (str): The category of the items.
+
+        Returns:
+            SKU: The matching SKU, or None if the warehouse never
+            received such an item.
+        """
+        self._sync()
+        return self.ledger.sku_for(state, category)
+
+    def dispatch(self, sku: SKU, quantity: int,
+                 held: int = 0) -> List[Item]:
+        """
+        Remove items of a SKU from the warehouse's stock.
+
+        The items are picked in the picking order of the warehouse.
+
+        Args:
+            sku (SKU): The (state, category, warehouse) of the items.
+            quantity (int): The number of items to remove.
+            held (int, optional): A quantity held for this order, which
+            is released under the same lock as the items are taken.
+            Defaults to 0.
+
+        Returns:
+            List[Item]: The dispatched items.
+
+        Raises:
+            InsufficientQuantityError: If fewer items are on hand.
+        """
+        record = None if self.journal is None else self.journal.order
+        return self._dispatch(sku, quantity, record, held)
+
+    def _dispatch(self, sku: SKU, quantity: int, record,
+                  held: int = 0) -> List[Item]:
+        """
+        Remove items of a SKU, recording it while the SKU is locked.
+
+        Args:
+            sku (SKU): The (state, category, warehouse) of the items.
+            quantity (int): The number of items to remove.
+            record (Callable[[SKU, int], None]): Called with the SKU and
+            quantity once the items are picked, or None.
+            held (int, optional): The quantity held for the order.
+
+        Returns:
+            List[Item]: The dispatched items.
+        """
+        self._sync()
+        return self._take(sku, quantity, record, held)
+
+    def _take(self, sku: SKU, quantity: int, record,
+              held: int = 0) -> List[Item]:
+        """
+        Remove items of a SKU without syncing first, see _dispatch.
+
+        It does not take _sync_lock, so it can be called with ledger
+        locks held, after the caller synced the warehouse.
+        """
+        with self.ledger.lock(sku):
+            if held:
+                self.ledger.release(sku, held)
+            self.ledger.take(sku, quantity)
+            queue = self._queue(self.picking, sku)
+            picked = []
+            while len(picked) < quantity:
+                _, position = heapq.heappop(queue)
+                if position not in self._shipped:
+                    self._shipped.add(position)
+                    picked.append(self.stock[position])
+            if record is not None:
+                record(sku, quantity)
+        return picked
 
     def __str__(self) -> str:
         """
@@ -119,11 +842,46 @@ class Warehouse:
         Returns:
             List[Item]: The list of items that match the search term.
         """
-        return [
-            item
-            for item in self.stock
-            if search_term.lower() in item.category.lower()
-        ]
+        self._sync()
+        return [self.stock[position]
+                for position in self._index.lookup(search_term)
+                if position not in self._shipped]
+
+    def items_in_category(self, category: str) -> List[Item]:
+        """
+        Return the items of exactly one category, ignoring case.
+
+        Args:
+            category (str): The category of the items.
+
+        Returns:
+            List[Item]: The items of the category, in stock order.
+        """
+        self._sync()
+        return [self.stock[position]
+                for position in self._index.positions(category)
+                if position not in self._shipped]
+
+    def items_on_hand(self) -> List[Item]:
+        """
+        Return the items that have not been dispatched.
+
+        Returns:
+            List[Item]: The items on hand, in stock order.
+        """
+        self._sync()
+        return [item for position, item in enumerate(self.stock)
+                if position not in self._shipped]
+
+    def category_counts(self) -> Counter:
+        """
+        Count the items on hand of each lowercased category.
+
+        Returns:
+            Counter: The number of items per lowercased category.
+        """
+        self._sync()
+        return self.ledger.category_counts()
 
 
 class WarehouseManager:
@@ -133,6 +891,7 @@ class WarehouseManager:
     Attributes:
         stock (List[Warehouse]): A list of warehouses representing the stock
         managed by the WarehouseManager instance.
+        warehouses (Dict[str, Warehouse]): The warehouses by ID.
     """
 
     def __init__(self, stock: List[Warehouse]):
@@ -144,7 +903,183 @@ class WarehouseManager:
             representing the stock.
         """
         self.stock = stock
+        self.warehouses = {str(warehouse.id): warehouse for warehouse in stock}
+        self._order_hooks = []
+
+    def add_order_hook(self, hook) -> None:
+        """
+        Call a function before every order checks the ledgers.
+
+        The hooks run before any lock is taken, e.g. so a
+        ReservationBook can release its expired holds first.
+
+        Args:
+            hook (Callable[[], None]): The function to call.
+        """
+        self._order_hooks.append(hook)
+
+    def _run_order_hooks(self) -> None:
+        """Call the order hooks, before any ledger lock is taken."""
+        for hook in self._order_hooks:
+            hook()
 
+    def order(self, sku: SKU, quantity: int,
+              held: int = 0) -> List[Item]:
+        """
+        Dispatch an order for one SKU from the warehouse holding it.
+
+        The method can be called from many threads at once. Orders for the
+        same SKU are serialized so they never oversell, while orders for
+        different SKUs only take their own locks.
+
+        Args:
+            sku (SKU): The (state, category, warehouse) of the items.
+            quantity (int): The number of items to order.
+            held (int, optional): A quantity held for this order, e.g.
+            by a reservation, released as the items are taken.
+            Defaults to 0.
+
+        Returns:
+            List[Item]: The dispatched items.
+
+        Raises:
+            KeyError: If the warehouse of the SKU is unknown.
+            InsufficientQuantityError: If fewer items are on hand.
+        """
+        warehouse = self.warehouses[str(sku[2])]
+        self._run_order_hooks()
+        picked = warehouse.dispatch(sku, quantity, held)
+        ORDERS_PLACED.inc()
+        ITEMS_ORDERED.inc(quantity)
+        return picked
+
+    def transfer(self, sku: SKU, warehouse_id, quantity: int) -> List[Item]:
+        """
+        Move items of a SKU to another warehouse.
+
+        Args:
+            sku (SKU): The (state, category, warehouse) of the items.
+            warehouse_id (int): The ID of the receiving warehouse.
+            quantity (int): The number of items to move.
+
+        Returns:
+            List[Item]: The items as received by the other warehouse.
+
+        Raises:
+            KeyError: If either warehouse is unknown.
+            InsufficientQuantityError: If fewer items are on hand.
+        """
+        source = self.warehouses[str(sku[2])]
+        target = self.warehouses[str(warehouse_id)]
+        record = None
+        if source.journal is not None:
+            def record(sku, quantity):
+                source.journal.transfer(sku, target.id, quantity)
+        picked = source._dispatch(sku, quantity, record)
+
+        # The loader keys warehouses by strings but stores the warehouse
+        # of an item as an int, so the moved items join the SKU of the
+        # items the target already holds
+        moved = [Item(item.state, item.category, int(target.id),
+                      item.date_of_stock, getattr(item, "expiry_date", None))
+                 for item in picked]
+        for item in moved:
+            target._receive(item)
+        return moved
+
+    @OPERATION_SECONDS.labels(operation="place_orders").time()
+    def place_orders(self, lines,
+                     policy: str = "fewest") -> List[List[Item]]:
+        """
+        Place many order lines at once, all or nothing.
+
+        Each line asks for a quantity of a state and category, which is
+        split across the warehouses holding it by an allocation policy.
+        The locks of every SKU involved are taken up front, in a fixed
+        order, then all lines are checked against the ledgers in one
+        pass. Only when every line can be filled are the items
+        dispatched, so a failing batch leaves the stock untouched.
+
+        Args:
+            lines (Iterable[Tuple[str, str, int]]): The (state, category,
+            quantity) of each order line.
+            policy (str, optional): The allocation policy, one of
+            "fewest", "oldest" or "balanced". Defaults to "fewest".
+
+        Returns:
+            List[List[Item]]: The dispatched items of each line.
+
+        Raises:
+            ValueError: If a quantity is not positive or the policy is
+            unknown.
+            InsufficientQuantityError: If a line cannot be filled. Its
+            available_quantity is what was left for that line.
+        """
+        lines = [(state, category, int(quantity))
+                 for state, category, quantity in lines]
+        candidates = {}
+        for state, category, quantity in lines:
+            if quantity < 1:
+                raise ValueError("The quantity must be at least 1.")
+            if (state, category) in candidates:
+                continue
+            candidates[(state, category)] = []
+            for warehouse in self.warehouses.values():
+                sku = warehouse.sku_for(state, category)
+                if sku is not None:
+                    candidates[(state, category)].append((warehouse, sku))
+
+        # Lock in a fixed order so concurrent batches cannot deadlock
+        sources = sorted(
+            (source for found in candidates.values() for source in found),
+            key=lambda source: (str(source[0].id), source[1][:2]),
+        )
+        # Sync before locking: _sync_lock is never taken under a SKU lock
+        for warehouse, _ in sources:
+            warehouse._sync()
+        self._run_order_hooks()
+        with ExitStack() as locks:
+            for warehouse, sku in sources:
+                locks.enter_context(warehouse.ledger.lock(sku))
+
+            remaining = {
+                (id(warehouse), sku): warehouse.ledger.available(sku)
+                for warehouse, sku in sources
+            }
+            occupancy = {id(warehouse): len(warehouse.ledger)
+                         for warehouse, _ in sources}
+            plan = []
+            for line, (state, category, quantity) in enumerate(lines):
+                found = [
+                    Source(warehouse, sku,
+                           remaining[(id(warehouse), sku)],
+                           occupancy[id(warehouse)],
+                           # Ages are only worth looking up when used
+                           warehouse._oldest(sku)
+                           if policy == "oldest" else None)
+                    for warehouse, sku in candidates[(state, category)]
+                ]
+                allocation = allocate(quantity, found, policy)
+                filled = sum(taken for _, taken in allocation)
+                if filled < quantity:
+                    raise InsufficientQuantityError(
+                        (state, category, None), quantity, filled)
+                for source, taken in allocation:
+                    plan.append((line, source.warehouse, source.sku, taken))
+                    remaining[(id(source.warehouse), source.sku)] -= taken
+                    occupancy[id(source.warehouse)] -= taken
+
+            dispatched = [[] for _ in lines]
+            for line, warehouse, sku, quantity in plan:
+                record = (None if warehouse.journal is None
+                          else warehouse.journal.order)
+                dispatched[line].extend(
+                    warehouse._take(sku, quantity, record))
+        ORDERS_PLACED.inc(len(lines))
+        ITEMS_ORDERED.inc(sum(quantity for _, _, quantity in lines))
+        return dispatched
+
+    @OPERATION_SECONDS.labels(operation="display_warehouses").time()
     def display_warehouses(self) -> str:
         """
         Display information about the warehouses and their stock.
@@ -163,6 +1098,15 @@ class WarehouseManager:
         print(f"Listed {total_item_count} items.")
         return f"Listed {total_item_count} items."
 
+    def __iter__(self):
+        """
+        Iterate through the warehouses.
+
+        A manager can therefore be passed wherever a list of warehouses
+        is expected, e.g. to the order menus of Employee.
+        """
+        yield from self.stock
+
     def __str__(self) -> str:
         """
         Return a string representation of the WarehouseManager instance.
@@ -300,10 +1244,9 @@ class User:
             None
         """
         categories = Counter()
-        for warehouse in stock:
-            for item in warehouse.stock:
-                category = item.category.lower()
-                categories[category] += 1
+        with OPERATION_SECONDS.labels(operation="browse_categories").time():
+            for warehouse in stock:
+                categories.update(warehouse.category_counts())
 
         print("Available categories:")
         for i, (category, count) in enumerate(categories.items(), 1):
@@ -334,10 +1277,11 @@ class User:
                 print(f"List of {selected_category}s available:")
 
                 found_items = []
-                for warehouse in stock:
-                    for item in warehouse.stock:
-                        if item.category.lower() == selected_category:
-                            found_items.append(item)
+                with OPERATION_SECONDS.labels(
+                        operation="browse_items").time():
+                    for warehouse in stock:
+                        found_items.extend(
+                            warehouse.items_in_category(selected_category))
 
                 for item in found_items:
                     print(
@@ -385,6 +1329,9 @@ class Employee(User):
             that the current employee is the head of.
             last_searched_item (None): The last item searched by the employee.
             last_browsed_item (None): The last item browsed by the employee.
+            allocation_policy (str): The policy place_order splits orders
+            across the warehouses with, "fewest" unless given as a
+            keyword argument.
 
         Example:
             employee = Employee(user_name="John", password="password",
@@ -409,6 +1356,8 @@ class Employee(User):
         self.last_ordered_quantity = None
         self.last_ordered_item_state = None  # New attributes
         self.last_ordered_item_category = None
+        # How place_order splits an order across the warehouses
+        self.allocation_policy = kwargs.get("allocation_policy", "fewest")
 
     def search_and_order_item(self, stock: List[Warehouse]) -> None:
         """
@@ -437,10 +1386,11 @@ class Employee(User):
 
             found_items, item_counts = self.search_item(stock, search_term)
             if found_items:
-                self.order_items(found_items, item_counts)
+                self.order_items(found_items, item_counts, stock)
             else:
                 print("Item not found.")
 
+    @OPERATION_SECONDS.labels(operation="search_item").time()
     def search_item(
         self, stock: List[Warehouse], search_term: str
     ) -> Tuple[List[Item], Counter]:
@@ -454,25 +1404,28 @@ class Employee(User):
 
         Returns:
             Tuple[List[Item], Counter]: A tuple containing a list of found
-            items and a counter of item counts.
+            items and a counter of the quantities on hand of each item,
+            as held by the warehouse ledgers.
         """
+        SEARCHES.inc()
         found_items = []
         item_counts = Counter()
 
         for warehouse in stock:
-            for item in warehouse.stock:
-                if search_term.lower() in item.category.lower():
-                    found_items.append(item)
-                    item_key = (
-                        f"{item.state} {item.category} (Warehouse {
-                            item.warehouse})"
-                    )
-                    item_counts[item_key] += 1
-                    self.last_searched_item = item
+            for item in warehouse.search(search_term):
+                found_items.append(item)
+                item_key = (
+                    f"{item.state} {item.category} (Warehouse {
+                        item.warehouse})"
+                )
+                item_counts[item_key] = warehouse.ledger.available(
+                    sku_of(item))
+                self.last_searched_item = item
 
         return found_items, item_counts
 
-    def order_items(self, found_items: List[Item], item_counts: Counter):
+    def order_items(self, found_items: List[Item], item_counts: Counter,
+                    stock: List[Warehouse] = None):
         """
         Allow an authenticated employee to select and order.
 
@@ -481,6 +1434,8 @@ class Employee(User):
             A list of items that match the search term.
             item_counts (Counter):
             A counter object that stores the count of each item.
+            stock (List[Warehouse], optional): The warehouses to dispatch
+            the ordered items from. Defaults to None.
 
         Returns:
             None
@@ -532,6 +1487,10 @@ class Employee(User):
                             f"(Warehouse {selected_item.warehouse})"
                         )
                         available_quantity = item_counts.get(item_key, 0)
+                        if stock is not None:
+                            # Orders are split across every warehouse
+                            available_quantity = self._total_available(
+                                stock, selected_item)
 
                         print(
                             f"You have selected: {item_key}, Available: {
@@ -547,7 +1506,8 @@ class Employee(User):
                                 if 1 <= order_quantity <= available_quantity:
                                     self.place_order(selected_item,
                                                      order_quantity,
-                                                     item_counts
+                                                     item_counts,
+                                                     stock
                                                      )
                                     self.last_ordered_item = selected_item
                                     self.last_ordered_quantity = order_quantity
@@ -571,16 +1531,27 @@ class Employee(User):
         else:
             print("Item not found")
 
-    def place_order(self, item: Item, quantity: int, item_counts: Counter):
+    @OPERATION_SECONDS.labels(operation="place_order").time()
+    def place_order(self, item: Item, quantity: int, item_counts: Counter,
+                    stock: List[Warehouse] = None):
         """
         Place an order for a selected item.
 
+        When the warehouses are given, the order is placed through
+        WarehouseManager.place_orders, so it is split across every
+        warehouse holding items of the same state and category by the
+        allocation policy of the employee, and reduces their ledgers and
+        stock. The confirmation then lists how many items each warehouse
+        supplied. Otherwise only item_counts is updated.
+
         Args:
             item (Item): The item object representing the selected
             item to be ordered.
             quantity (int): The quantity of the item to be ordered.
             item_counts (Counter): A counter object that stores
             the count of each item.
+            stock (List[Warehouse], optional): The warehouses to dispatch
+            the ordered items from. Defaults to None.
 
         Returns:
             None
@@ -596,16 +1567,59 @@ class Employee(User):
 
         """
         item_key = f"{item.state} {item.category} (Warehouse {item.warehouse})"
-        available_quantity = item_counts[item_key]
-
-        if quantity <= available_quantity:
+        if stock is not None:
+            manager = (stock if isinstance(stock, WarehouseManager)
+                       else WarehouseManager(list(stock)))
+            try:
+                dispatched, = manager.place_orders(
+                    [(item.state, item.category, quantity)],
+                    self.allocation_policy)
+            except InsufficientQuantityError:
+                print("Not enough quantity available for the order.")
+                return
+            for warehouse in manager.stock:
+                sku = warehouse.sku_for(item.state, item.category)
+                key = (f"{item.state} {item.category} "
+                       f"(Warehouse {warehouse.id})")
+                if sku is not None and key in item_counts:
+                    item_counts[key] = warehouse.ledger.available(sku)
+            print(f"Order placed for {quantity} of "
+                  f"'{item.state} {item.category}':")
+            # The allocation policy may take them from several warehouses
+            split = Counter(picked.warehouse for picked in dispatched)
+            for warehouse_id, count in split.items():
+                print(f"- {count} from Warehouse {warehouse_id}")
+        elif quantity <= item_counts[item_key]:
             item_counts[item_key] -= quantity
+            ORDERS_PLACED.inc()
+            ITEMS_ORDERED.inc(quantity)
             print(f"Order placed for {quantity} of '{item_key}'")
-            self.last_ordered_item_state = item.state
-            self.last_ordered_item_category = item.category
-            self.last_ordered_quantity = quantity
         else:
             print("Not enough quantity available for the order.")
+            return
+
+        self.last_ordered_item_state = item.state
+        self.last_ordered_item_category = item.category
+        self.last_ordered_quantity = quantity
+
+    @staticmethod
+    def _total_available(stock: List[Warehouse], item: Item) -> int:
+        """
+        Return how many items like an item all warehouses can supply.
+
+        Args:
+            stock (List[Warehouse]): The warehouses to look in.
+            item (Item): The item whose state and category to count.
+
+        Returns:
+            int: The available quantity summed over the warehouses.
+        """
+        total = 0
+        for warehouse in stock:
+            sku = warehouse.sku_for(item.state, item.category)
+            if sku is not None:
+                total += warehouse.ledger.available(sku)
+        return total
 
 
 class SessionReport:
@@ -0,0 +1,383 @@
+"""
+The code module records every stock mutation in an append-only log.
+
+Classes:
+    - EventLog
+
+Each receive, order and transfer is appended to a binary log as one
+record: a fixed header packed with EVENT, followed by the UTF-8 state
+and category. A snapshot file holds the items on hand, written as
+receive records, and the log offset it covers. Restoring loads the
+snapshot and replays only the log written after it, so the restart time
+depends on the activity since the last snapshot, not on the history.
+"""
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Iterator, Tuple
+
+from classes import Item, StockTable, Warehouse
+from inventory import SKU
+
+# crc32, kind, state and category lengths, warehouse, value, extra
+EVENT = struct.Struct("<IBHHqqq")
+SNAPSHOT_MAGIC = b"WHEVNT01"
+# magic, log offset covered, number of records
+SNAPSHOT_HEADER = struct.Struct("<8sQQ")
+SNAPSHOT_SUFFIX = ".snapshot"
+NO_DATE = -(2 ** 63)
+
+RECEIVE, ORDER, TRANSFER = 1, 2, 3
+
+
+def _pack(kind: int, state: str, category: str, warehouse: int,
+          value: int, extra: int) -> bytes:
+    """
+    Pack one event into a log record.
+
+    Args:
+        kind (int): RECEIVE, ORDER or TRANSFER.
+        state (str): The state of the items.
+        category (str): The category of the items.
+        warehouse (int): The ID of the warehouse of the items.
+        value (int): The stock date of a received item, or the quantity
+        of an order or transfer.
+        extra (int): The expiry date of a received item, or the target
+        warehouse of a transfer.
+
+    Returns:
+        bytes: The record, checksummed.
+    """
+    state_bytes, category_bytes = state.encode(), category.encode()
+    # The loader keeps warehouse IDs as strings of digits
+    body = EVENT.pack(0, kind, len(state_bytes), len(category_bytes),
+                      int(warehouse), value, int(extra))[4:]
+    body += state_bytes + category_bytes
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+
+def _unpack(data, offset: int):
+    """
+    Unpack the record starting at an offset.
+
+    Args:
+        data (bytes): The log or snapshot contents.
+        offset (int): The offset of the record.
+
+    Returns:
+        tuple: The (kind, state, category, warehouse, value, extra)
+        of the event and the offset of the next record, or None if the
+        record is incomplete or corrupt.
+    """
+    if offset + EVENT.size > len(data):
+        return None
+    crc, kind, state_size, category_size, warehouse, value, extra = (
+        EVENT.unpack_from(data, offset))
+    end = offset + EVENT.size + state_size + category_size
+    if end > len(data) or zlib.crc32(data[offset + 4:end]) != crc:
+        return None
+    text_start = offset + EVENT.size
+    state = bytes(data[text_start:text_start + state_size]).decode()
+    category = bytes(data[text_start + state_size:end]).decode()
+    return (kind, state, category, warehouse, value, extra), end
+
+
+def _receive_record(warehouse_id: int, item) -> bytes:
+    """
+    Pack the receipt of an item into a log record.
+
+    Args:
+        warehouse_id (int): The ID of the receiving warehouse.
+        item (Item): The received item.
+
+    Returns:
+        bytes: The record.
+    """
+    expiry_date = getattr(item, "expiry_date", None)
+    return _pack(
+        RECEIVE, item.state, item.category, warehouse_id,
+        StockTable.encode_date(item.date_of_stock),
+        NO_DATE if expiry_date is None
+        else StockTable.encode_date(expiry_date),
+    )
+
+
+class EventLog:
+    """
+    Binary append-only log of the stock mutations of the warehouses.
+
+    Records are written as they happen but only made durable in groups:
+    the file is flushed and fsynced once every group_size records, once
+    the oldest pending record is max_delay seconds old when another is
+    appended, or when commit is called, so one fsync covers many
+    mutations while a slow trickle of them still reaches the disk.
+
+    Attributes:
+        path (str): The path of the log file.
+        snapshot_path (str): The path of the snapshot file.
+        group_size (int): The number of records per fsync.
+        max_delay (float): The age in seconds of the oldest pending
+        record that forces an fsync.
+    """
+
+    def __init__(self, path: str, group_size: int = 64,
+                 max_delay: float = 1.0, clock=time.monotonic):
+        """
+        Initialize a new instance of the EventLog class.
+
+        Args:
+            path (str): The path of the log file.
+            group_size (int, optional): The number of records per fsync.
+            Defaults to 64.
+            max_delay (float, optional): The age in seconds of the
+            oldest pending record that forces an fsync. Defaults to 1.0.
+            clock (Callable[[], float], optional): The clock of the
+            record ages. Defaults to time.monotonic.
+        """
+        self.path = path
+        self.snapshot_path = path + SNAPSHOT_SUFFIX
+        self.group_size = group_size
+        self.max_delay = max_delay
+        self.clock = clock
+        self._file = None
+        self._pending = 0
+        self._deadline = None
+        self._lock = threading.Lock()
+
+    def attach(self, manager) -> None:
+        """
+        Record the mutations of the warehouses of a manager in the log.
+
+        Args:
+            manager (WarehouseManager): The manager of the warehouses.
+        """
+        for warehouse in manager.stock:
+            warehouse.journal = self
+
+    def _append(self, record: bytes) -> None:
+        """
+        Append a record and fsync if a group is complete or due.
+
+        Args:
+            record (bytes): The record to append.
+        """
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "ab")
+            self._file.write(record)
+            self._pending += 1
+            now = self.clock()
+            if self._deadline is None:
+                self._deadline = now + self.max_delay
+            if self._pending >= self.group_size or now >= self._deadline:
+                self._sync()
+
+    def _sync(self) -> None:
+        """Flush and fsync the log while the lock is held."""
+        if self._file is not None and self._pending:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = 0
+        self._deadline = None
+
+    def receive(self, warehouse_id: int, item) -> None:
+        """
+        Record the receipt of an item.
+
+        Args:
+            warehouse_id (int): The ID of the receiving warehouse.
+            item (Item): The received item.
+        """
+        self._append(_receive_record(warehouse_id, item))
+
+    def order(self, sku: SKU, quantity: int) -> None:
+        """
+        Record the dispatch of items.
+
+        Args:
+            sku (SKU): The (state, category, warehouse) of the items.
+            quantity (int): The number of items dispatched.
+        """
+        state, category, warehouse_id = sku
+        self._append(
+            _pack(ORDER, state, category, warehouse_id, quantity, 0))
+
+    def transfer(self, sku: SKU, warehouse_id: int, quantity: int) -> None:
+        """
+        Record the move of items to another warehouse.
+
+        Args:
+            sku (SKU): The (state, category, warehouse) of the items.
+            warehouse_id (int): The ID of the receiving warehouse.
+            quantity (int): The number of items moved.
+        """
+        state, category, source_id = sku
+        self._append(_pack(
+            TRANSFER, state, category, source_id, quantity, warehouse_id))
+
+    def commit(self) -> None:
+        """Make every record appended so far durable."""
+        with self._lock:
+            self._sync()
+
+    def close(self) -> None:
+        """Commit the pending records and close the log file."""
+        with self._lock:
+            self._sync()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def events(self, offset: int = 0) -> Iterator[Tuple[tuple, int]]:
+        """
+        Read the events of the log from an offset.
+
+        Reading stops at the first incomplete or corrupt record, which
+        is what a crash in the middle of a write leaves behind.
+
+        Args:
+            offset (int, optional): The offset to start at. Defaults to 0.
+
+        Yields:
+            Tuple[tuple, int]: The event, as returned by _unpack, and
+            the offset after it.
+        """
+        self.commit()
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as file:
+            file.seek(offset)
+            data = file.read()
+        position = 0
+        while True:
+            unpacked = _unpack(data, position)
+            if unpacked is None:
+                return
+            event, position = unpacked
+            yield event, offset + position
+
+    def snapshot(self, manager) -> None:
+        """
+        Write the items on hand and the current log offset to disk.
+
+        Take it while no stock is being mutated, e.g. at the end of a
+        session, so that the snapshot matches the offset it covers.
+
+        Args:
+            manager (WarehouseManager): The manager of the warehouses.
+        """
+        self.commit()
+        offset = (os.path.getsize(self.path)
+                  if os.path.exists(self.path) else 0)
+        records = [_receive_record(warehouse.id, item)
+                   for warehouse in manager.stock
+                   for item in warehouse.items_on_hand()]
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(SNAPSHOT_HEADER.pack(
+                SNAPSHOT_MAGIC, offset, len(records)))
+            file.writelines(records)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _load_snapshot(self) -> Tuple[list, int]:
+        """
+        Read the receive events of the snapshot.
+
+        Returns:
+            Tuple[list, int]: The events and the log offset they cover,
+            or no events and offset 0 if there is no valid snapshot.
+        """
+        if not os.path.exists(self.snapshot_path):
+            return [], 0
+        with open(self.snapshot_path, "rb") as file:
+            data = file.read()
+        if len(data) < SNAPSHOT_HEADER.size:
+            return [], 0
+        magic, offset, count = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC:
+            return [], 0
+        events, position = [], SNAPSHOT_HEADER.size
+        for _ in range(count):
+            unpacked = _unpack(data, position)
+            if unpacked is None:
+                return [], 0
+            event, position = unpacked
+            events.append(event)
+        return events, offset
+
+    def restore(self, manager) -> int:
+        """
+        Rebuild the stock of empty warehouses from the snapshot and log.
+
+        Warehouses named in the log but missing from the manager are
+        created. Orders are replayed straight into the ledgers and
+        stock, so they run no order hooks and count into no metrics. A
+        torn record at the end of the log is cut off, and the log is
+        attached to the manager afterwards.
+
+        Args:
+            manager (WarehouseManager): The manager to restore into.
+
+        Returns:
+            int: The number of log events replayed after the snapshot.
+        """
+        for warehouse in manager.stock:
+            warehouse.journal = None
+        snapshot_events, offset = self._load_snapshot()
+        for event in snapshot_events:
+            self._apply(manager, event)
+
+        replayed, end = 0, offset
+        for event, end in self.events(offset):
+            self._apply(manager, event)
+            replayed += 1
+        if os.path.exists(self.path) and os.path.getsize(self.path) > end:
+            with open(self.path, "r+b") as file:
+                file.truncate(end)
+        self.attach(manager)
+        return replayed
+
+    @staticmethod
+    def _warehouse(manager, warehouse_id: int) -> Warehouse:
+        """
+        Return a warehouse of a manager, creating it if needed.
+
+        Args:
+            manager (WarehouseManager): The manager of the warehouses.
+            warehouse_id (int): The ID of the warehouse.
+
+        Returns:
+            Warehouse: The warehouse with the ID.
+        """
+        warehouse = manager.warehouses.get(str(warehouse_id))
+        if warehouse is None:
+            warehouse = Warehouse(warehouse_id)
+            manager.stock.append(warehouse)
+            manager.warehouses[str(warehouse_id)] = warehouse
+        return warehouse
+
+    def _apply(self, manager, event: tuple) -> None:
+        """
+        Apply one event to the warehouses of a manager.
+
+        Args:
+            manager (WarehouseManager): The manager of the warehouses.
+            event (tuple): The event, as returned by _unpack.
+        """
+        kind, state, category, warehouse_id, value, extra = event
+        if kind == RECEIVE:
+            self._warehouse(manager, warehouse_id).add_item(Item(
+                state, category, warehouse_id,
+                StockTable.decode_date(value),
+                None if extra == NO_DATE else StockTable.decode_date(extra),
+            ))
+        elif kind == ORDER:
+            self._warehouse(manager, warehouse_id)._dispatch(
+                (state, category, warehouse_id), value, None)
+        elif kind == TRANSFER:
+            self._warehouse(manager, extra)
+            manager.transfer((state, category, warehouse_id), extra, value)
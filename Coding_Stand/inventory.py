@@ -0,0 +1,266 @@
+"""
+The code module keeps track of the quantities held by the warehouses.
+
+Classes:
+    - InsufficientQuantityError
+    - InventoryLedger
+
+A stock keeping unit (SKU) is the tuple (state, category, warehouse) that
+also identifies an item in the order prompts, e.g.
+("Blue", "Mouse", 1) for "Blue Mouse (Warehouse 1)".
+"""
+import threading
+from collections import Counter
+from typing import Iterable, Tuple
+
+SKU = Tuple[str, str, int]
+
+
+def sku_of(item) -> SKU:
+    """
+    Return the SKU of an item.
+
+    Args:
+        item (Item): The item, or any object with the same attributes.
+
+    Returns:
+        SKU: The (state, category, warehouse) tuple of the item.
+    """
+    return (item.state, item.category, item.warehouse)
+
+
+class InsufficientQuantityError(Exception):
+    """
+    Raised when more items are requested than the ledger holds.
+
+    Attributes:
+        sku (SKU): The requested SKU, whose warehouse is None when the
+        request could be served by any warehouse.
+        requested_quantity (int): The quantity requested.
+        available_quantity (int): The quantity available.
+    """
+
+    def __init__(self, sku: SKU, requested_quantity: int,
+                 available_quantity: int):
+        """
+        Initialize a new instance of the InsufficientQuantityError class.
+
+        Args:
+            sku (SKU): The requested SKU.
+            requested_quantity (int): The quantity requested.
+            available_quantity (int): The quantity available.
+        """
+        self.sku = sku
+        self.requested_quantity = requested_quantity
+        self.available_quantity = available_quantity
+        state, category, warehouse = sku
+        item_name = f"{state} {category}"
+        if warehouse is not None:
+            item_name += f" (Warehouse {warehouse})"
+        super().__init__(
+            f"Requested {requested_quantity} of item '{item_name}', "
+            f"but only {available_quantity} available."
+        )
+
+
+class InventoryLedger:
+    """
+    Quantities on hand per SKU for the items of one warehouse.
+
+    The ledger is the single source of truth for counts: availability
+    checks, decrements, per-category totals and the occupancy of the
+    warehouse are all dictionary lookups instead of scans of the stock.
+
+    Quantities can be held for a pending order. Held items stay on hand,
+    so they still count towards the occupancy, but they are no longer
+    available to other orders until they are released.
+
+    The ledger is safe to use from many threads. Each SKU has its own
+    lock guarding its quantity, and each category its own lock guarding
+    the category total, so orders for unrelated SKUs never wait on each
+    other.
+    """
+
+    def __init__(self):
+        """Initialize an empty ledger."""
+        self._quantities = Counter()
+        self._categories = Counter()
+        self._held = Counter()
+        self._skus = {}
+        self._sku_locks = {}
+        self._category_locks = {}
+
+    def __len__(self) -> int:
+        """
+        Return the number of items on hand.
+
+        Returns:
+            int: The total quantity over all SKUs.
+        """
+        return sum(list(self._categories.values()))
+
+    def lock(self, sku: SKU) -> threading.RLock:
+        """
+        Return the lock guarding the quantity of a SKU.
+
+        Hold it to make several ledger calls on the SKU atomic.
+
+        Args:
+            sku (SKU): The SKU to lock.
+
+        Returns:
+            threading.RLock: The reentrant lock of the SKU.
+        """
+        lock = self._sku_locks.get(sku)
+        if lock is None:
+            # setdefault is atomic, so racing threads share one lock
+            lock = self._sku_locks.setdefault(sku, threading.RLock())
+        return lock
+
+    def _adjust(self, sku: SKU, quantity: int) -> None:
+        """
+        Change the quantity of a SKU while its lock is held.
+
+        Args:
+            sku (SKU): The SKU to change.
+            quantity (int): The quantity to add, negative to remove.
+        """
+        self._quantities[sku] += quantity
+        category = sku[1].lower()
+        lock = self._category_locks.get(category)
+        if lock is None:
+            lock = self._category_locks.setdefault(category, threading.Lock())
+        with lock:
+            self._categories[category] += quantity
+
+    def receive(self, sku: SKU, quantity: int = 1) -> None:
+        """
+        Add items of a SKU to the ledger.
+
+        Args:
+            sku (SKU): The SKU of the items.
+            quantity (int, optional): The number of items. Defaults to 1.
+        """
+        with self.lock(sku):
+            self._skus.setdefault(sku[:2], sku)
+            self._adjust(sku, quantity)
+
+    def receive_counts(self, counts: Iterable[Tuple[SKU, int]]) -> None:
+        """
+        Add the quantities of many SKUs to the ledger.
+
+        Args:
+            counts (Iterable[Tuple[SKU, int]]): Pairs of SKU and quantity.
+        """
+        for sku, quantity in counts:
+            self.receive(sku, quantity)
+
+    def available(self, sku: SKU) -> int:
+        """
+        Return the quantity of a SKU that can still be ordered.
+
+        Args:
+            sku (SKU): The SKU to look up.
+
+        Returns:
+            int: The quantity on hand that is not held.
+        """
+        return self._quantities.get(sku, 0) - self._held.get(sku, 0)
+
+    def held(self, sku: SKU) -> int:
+        """
+        Return the quantity of a SKU held for pending orders.
+
+        Args:
+            sku (SKU): The SKU to look up.
+
+        Returns:
+            int: The quantity held.
+        """
+        return self._held.get(sku, 0)
+
+    def hold(self, sku: SKU, quantity: int) -> None:
+        """
+        Hold items of a SKU so that other orders cannot take them.
+
+        Args:
+            sku (SKU): The SKU of the items.
+            quantity (int): The number of items to hold.
+
+        Raises:
+            ValueError: If the quantity is not positive.
+            InsufficientQuantityError: If fewer items are available.
+        """
+        if quantity < 1:
+            raise ValueError("The quantity must be at least 1.")
+        with self.lock(sku):
+            available_quantity = self.available(sku)
+            if quantity > available_quantity:
+                raise InsufficientQuantityError(
+                    sku, quantity, available_quantity)
+            self._held[sku] += quantity
+
+    def release(self, sku: SKU, quantity: int) -> None:
+        """
+        Make held items of a SKU available again.
+
+        Args:
+            sku (SKU): The SKU of the items.
+            quantity (int): The number of items to release.
+        """
+        with self.lock(sku):
+            self._held[sku] -= min(quantity, self._held[sku])
+            if not self._held[sku]:
+                del self._held[sku]
+
+    def sku_for(self, state: str, category: str):
+        """
+        Return the SKU of this ledger with a given state and category.
+
+        Args:
+            state (str): The state of the items.
+            category (str): The category of the items.
+
+        Returns:
+            SKU: The matching SKU, or None if no such item was received.
+        """
+        return self._skus.get((state, category))
+
+    def take(self, sku: SKU, quantity: int) -> None:
+        """
+        Remove items of a SKU from the ledger.
+
+        Args:
+            sku (SKU): The SKU of the items.
+            quantity (int): The number of items to remove.
+
+        Raises:
+            ValueError: If the quantity is not positive.
+            InsufficientQuantityError: If fewer items are available.
+        """
+        if quantity < 1:
+            raise ValueError("The quantity must be at least 1.")
+        with self.lock(sku):
+            available_quantity = self.available(sku)
+            if quantity > available_quantity:
+                raise InsufficientQuantityError(
+                    sku, quantity, available_quantity)
+            self._adjust(sku, -quantity)
+
+    def quantities(self) -> Counter:
+        """
+        Return the quantities on hand per SKU.
+
+        Returns:
+            Counter: The quantity per SKU, without exhausted SKUs.
+        """
+        return +Counter(dict(self._quantities))
+
+    def category_counts(self) -> Counter:
+        """
+        Return the quantities on hand per lowercased category.
+
+        Returns:
+            Counter: The quantity per category, without exhausted ones.
+        """
+        return +Counter(dict(self._categories))
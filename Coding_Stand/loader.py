@@ -1,7 +1,76 @@
 """Data loader."""
+import hashlib
+import importlib.util
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
 
-from data import personnel as employees
-from data import stock as items
+from metrics import REGISTRY
+
+SNAPSHOT_MAGIC = b"WHSNAP01"
+SNAPSHOT_HEADER = struct.Struct("<8sqq32sQ")
+SNAPSHOT_SUFFIX = ".snapshot"
+
+BASE_DIR = os.path.dirname(os.path.realpath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+DATASETS = ("personnel", "stock")
+
+LOAD_SECONDS = REGISTRY.gauge(
+    "warehouse_loader_duration_seconds",
+    "Seconds the last load of each model took.", ["model"])
+SNAPSHOT_LOOKUPS = REGISTRY.counter(
+    "warehouse_snapshot_lookups_total",
+    "Stock snapshot lookups, by whether the snapshot was fresh.",
+    ["result"])
+SNAPSHOT_HIT_RATIO = REGISTRY.gauge(
+    "warehouse_snapshot_hit_ratio",
+    "Share of stock loads served from the snapshot cache.")
+
+
+def _snapshot_hit_ratio():
+    """Return the share of snapshot lookups that hit, NaN before any."""
+    hits = SNAPSHOT_LOOKUPS.value(result="hit")
+    lookups = hits + SNAPSHOT_LOOKUPS.value(result="miss")
+    return hits / lookups if lookups else float("nan")
+
+
+SNAPSHOT_HIT_RATIO.set_function(_snapshot_hit_ratio)
+
+
+def dataset_path(name):
+    """Return the path of the JSON file holding a dataset."""
+    return os.path.join(DATA_DIR, f"{name}.json")
+
+
+def load_dataset(name):
+    """Return the `personnel` or `stock` dataset.
+
+    The datasets are read from the JSON files in data/, which parse in a
+    fraction of the time it takes to compile data.py. data.py is only
+    imported when the JSON file is missing.
+    """
+    path = dataset_path(name)
+    if os.path.exists(path):
+        with open(path) as file:
+            return json.load(file)
+    return getattr(__import__("data"), name)
+
+
+def compile_data():
+    """Write the datasets of data.py to compact JSON files in data/."""
+    data = __import__("data")
+    os.makedirs(DATA_DIR, exist_ok=True)
+    for name in DATASETS:
+        records = ",\n".join(
+            json.dumps(record, separators=(",", ":"))
+            for record in getattr(data, name)
+        )
+        with open(dataset_path(name), "w") as file:
+            file.write(f"[\n{records}\n]\n")
 
 
 class MissingClassError(Exception):
@@ -19,27 +88,200 @@ class MissingArgument(Exception):
     pass
 
 
+def _stock_source():
+    """Return the path of the file the stock is loaded from."""
+    path = dataset_path("stock")
+    if os.path.exists(path):
+        return path
+    spec = importlib.util.find_spec("data")
+    return spec.origin if spec else None
+
+
+def _source_digest(path):
+    """Return the SHA-256 digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _padding(offset):
+    """Return the bytes needed to align an offset to 8 bytes."""
+    return -offset % 8
+
+
+def write_snapshot(path, source, warehouses):
+    """Write table-backed warehouses to a binary snapshot.
+
+    The file holds a fixed header identifying the source (size, mtime and
+    SHA-256), a JSON block with the column dictionaries and the layout,
+    and then every column and index array as raw, 8-byte aligned machine
+    values, so the arrays can be sliced straight out of a memory map.
+    """
+    stat = os.stat(source)
+    encoders = warehouses[0].stock.encoders if warehouses else {}
+    layout = []
+    blocks = []
+    for warehouse in warehouses:
+        postings = warehouse._index.postings()
+        layout.append({
+            "id": warehouse.id,
+            "rows": len(warehouse.stock),
+            "postings": [[key, len(rows)] for key, rows in postings.items()],
+        })
+        blocks.extend(warehouse.stock.columns.values())
+        blocks.extend(postings.values())
+    meta = json.dumps({
+        "byteorder": sys.byteorder,
+        "encoders": {
+            column: encoder.values for column, encoder in encoders.items()
+        },
+        "warehouses": layout,
+    }).encode()
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, stat.st_size, stat.st_mtime_ns,
+            _source_digest(source), len(meta),
+        ))
+        file.write(meta)
+        file.write(b"\0" * _padding(SNAPSHOT_HEADER.size + len(meta)))
+        for block in blocks:
+            data = block.tobytes()
+            file.write(data)
+            file.write(b"\0" * _padding(len(data)))
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path, source, classes):
+    """Return the warehouses stored in a snapshot, or None if it is stale.
+
+    The snapshot is reused while the source keeps its size and mtime. If
+    only the mtime changed, the source is hashed and the snapshot is kept
+    (and its header refreshed) when the content is unchanged. The file
+    is only opened for reading, so a read-only snapshot still loads.
+    """
+    try:
+        stat = os.stat(source)
+        file = open(path, "rb")
+    except OSError:
+        return None
+
+    with file:
+        if os.fstat(file.fileno()).st_size < SNAPSHOT_HEADER.size:
+            return None
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            try:
+                return _load_snapshot(path, data, stat, source, classes)
+            except (ValueError, KeyError, TypeError, struct.error):
+                return None
+
+
+def _refresh_header(path, header):
+    """Rewrite the header of a snapshot, if the file can be written."""
+    try:
+        with open(path, "r+b") as file:
+            file.write(header)
+    except OSError:
+        pass
+
+
+def _load_snapshot(path, data, stat, source, classes):
+    """Rebuild the warehouses from a mapped snapshot file."""
+    magic, size, mtime_ns, digest, meta_length = \
+        SNAPSHOT_HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or size != stat.st_size:
+        return None
+    if mtime_ns != stat.st_mtime_ns:
+        if _source_digest(source) != digest:
+            return None
+        _refresh_header(path, SNAPSHOT_HEADER.pack(
+            magic, size, stat.st_mtime_ns, digest, meta_length))
+
+    offset = SNAPSHOT_HEADER.size
+    meta = json.loads(data[offset:offset + meta_length])
+    if meta["byteorder"] != sys.byteorder:
+        return None
+    offset += meta_length + _padding(offset + meta_length)
+
+    def take(typecode, count):
+        nonlocal offset
+        block = array(typecode)
+        length = block.itemsize * count
+        if offset + length > len(data):
+            raise ValueError("Truncated snapshot")
+        block.frombytes(data[offset:offset + length])
+        offset += length + _padding(length)
+        return block
+
+    encoders = {}
+    for column, values in meta["encoders"].items():
+        encoder = encoders[column] = classes.ColumnEncoder()
+        for value in values:
+            encoder.encode(value)
+
+    warehouses = []
+    for layout in meta["warehouses"]:
+        table = classes.StockTable(encoders)
+        for column, block in table.columns.items():
+            table.columns[column] = take(block.typecode, layout["rows"])
+        index = classes.CategoryIndex.from_postings({
+            key: take("I", count) for key, count in layout["postings"]
+        })
+        warehouses.append(
+            classes.Warehouse(layout["id"], table, index))
+    return warehouses
+
+
 class Loader:
     """Main data loader class."""
 
     model = None
-    objects = None
+    _objects = None
 
     def __init__(self, *args, **kwargs):
-        """Constructor."""
+        """Constructor.
+
+        Nothing is loaded until the objects are first needed, so creating
+        a loader does not depend on the size of the dataset. The stock is
+        cached in a binary snapshot next to its source unless the loader
+        is created with `cache=False`.
+        """
         if "model" not in kwargs:
             raise MissingArgument(
                 "The loader requires a `model` keyword argument to work."
             )
         self.model = kwargs["model"]
-        self.parse()
+        self.cache = kwargs.get("cache", True)
+        self.snapshot_hit = None
+
+    @property
+    def objects(self):
+        """Return the objects, loading them on first access."""
+        if self._objects is None:
+            self.parse()
+        return self._objects
+
+    @objects.setter
+    def objects(self, value):
+        """Replace the loaded objects."""
+        self._objects = value
+
+    def preload(self):
+        """Load the objects now instead of on first access."""
+        self.objects
+        return self
 
     def parse(self):
         """Instantiate objects from the data."""
+        started = time.perf_counter()
         if self.model == "personnel":
             self.objects = self.__parse_personnel()
         if self.model == "stock":
             self.objects = self.__parse_stock()
+        LOAD_SECONDS.set(time.perf_counter() - started, model=self.model)
 
     def __load_class(self, name):
         """Return a class."""
@@ -50,19 +292,44 @@ class Loader:
 
     def __parse_personnel(self):
         """Parse the personnel list."""
+        employees = load_dataset("personnel")
         Employee = self.__load_class("Employee")
 
         return [Employee(**employee) for employee in employees]
 
     def __parse_stock(self):
-        """Parse the stock."""
+        """Parse the stock, going through the snapshot cache if enabled."""
+        source = _stock_source()
+        if not self.cache or source is None:
+            return self.__build_stock()
+
+        path = source + SNAPSHOT_SUFFIX
+        warehouses = read_snapshot(path, source, __import__("classes"))
+        self.snapshot_hit = warehouses is not None
+        SNAPSHOT_LOOKUPS.labels(
+            result="hit" if self.snapshot_hit else "miss").inc()
+        if warehouses is None:
+            warehouses = self.__build_stock()
+            try:
+                write_snapshot(path, source, warehouses)
+            except OSError:
+                pass
+        return warehouses
+
+    def __build_stock(self):
+        """Build the warehouses from the stock list."""
+        items = load_dataset("stock")
         Item = self.__load_class("Item")
         Warehouse = self.__load_class("Warehouse")
+        StockTable = self.__load_class("StockTable")
+        encoders = None
         warehouses = {}
         for item in items:
             warehouse_id = str(item["warehouse"])
             if warehouse_id not in warehouses.keys():
-                warehouses[warehouse_id] = Warehouse(warehouse_id)
+                table = StockTable(encoders)
+                encoders = table.encoders
+                warehouses[warehouse_id] = Warehouse(warehouse_id, table)
             warehouses[warehouse_id].add_item(Item(**item))
         return list(warehouses.values())
 
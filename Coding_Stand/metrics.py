@@ -0,0 +1,618 @@
+"""
+The code module collects operational metrics of the warehouses.
+
+Classes:
+    - Counter
+    - Gauge
+    - Histogram
+    - Registry
+    - TextfileWriter
+
+The metrics are exported in the Prometheus text format, either over a
+local HTTP endpoint started with `serve` or by writing them to a file
+for the textfile collector of the node exporter. Counters are sharded
+per thread, so an increment on a hot path such as `place_order` takes no
+lock and never contends with other threads.
+"""
+import abc
+import bisect
+import functools
+import http.server
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_PORT = 9108
+DEFAULT_INTERVAL = 15.0
+# Upper bounds in seconds, from a quick lookup to a slow full scan
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value) -> str:
+    """
+    Return a sample value as written in the text format.
+
+    Args:
+        value (float): The value of the sample.
+
+    Returns:
+        str: The value, with infinities and NaN spelled as Prometheus does.
+    """
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        if value.is_integer():
+            return str(int(value))
+    return repr(value)
+
+
+def _format_labels(labelnames: Tuple[str, ...],
+                   values: Tuple[str, ...]) -> str:
+    """
+    Return the label set of a sample as written in the text format.
+
+    Args:
+        labelnames (Tuple[str, ...]): The names of the labels.
+        values (Tuple[str, ...]): The values of the labels.
+
+    Returns:
+        str: The escaped `{name="value",...}` set, or "" without labels.
+    """
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, values):
+        value = (str(value).replace("\\", "\\\\")
+                 .replace("\n", "\\n").replace('"', '\\"'))
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Shards:
+    """
+    A counter value split into one cell per thread.
+
+    Each thread only ever adds to its own cell, so no lock is needed to
+    count. The lock is taken once per thread, when its cell is created,
+    and reading the value sums the cells.
+    """
+
+    def __init__(self):
+        """Initialize a counter value of zero."""
+        self._cells: Dict[int, list] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1) -> None:
+        """
+        Add an amount to the cell of the calling thread.
+
+        Args:
+            amount (float, optional): The amount to add. Defaults to 1.
+        """
+        cell = self._cells.get(threading.get_ident())
+        if cell is None:
+            with self._lock:
+                cell = self._cells.setdefault(threading.get_ident(), [0])
+        cell[0] += amount
+
+    def total(self):
+        """
+        Return the sum of the cells of every thread.
+
+        Returns:
+            float: The value of the counter.
+        """
+        return sum(cell[0] for cell in list(self._cells.values()))
+
+
+class _Metric(abc.ABC):
+    """The name, help text and labels shared by every kind of metric."""
+
+    kind = None
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Iterable[str] = ()):
+        """
+        Initialize a metric.
+
+        Args:
+            name (str): The metric name, e.g. "warehouse_orders_total".
+            documentation (str): The help text of the metric.
+            labelnames (Iterable[str], optional): The names of its labels.
+            Defaults to no labels.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _label_values(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """
+        Return the label values in the order of the label names.
+
+        Raises:
+            ValueError: If the labels do not match the label names.
+        """
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} takes the labels {self.labelnames}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def samples(self) -> Iterable[Tuple[Tuple[str, ...], float]]:
+        """Yield the (label values, value) pairs of the metric."""
+
+    def exposition(self) -> str:
+        """
+        Return the metric in the Prometheus text format.
+
+        Returns:
+            str: The HELP and TYPE lines followed by one line per sample.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} {self.kind}"]
+        for values, value in self.samples():
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, values)} "
+                f"{_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class Counter(_Metric):
+    """
+    A value that only goes up, such as the number of orders placed.
+
+    A counter with labels counts each label set separately; the counter
+    of a label set is looked up with `labels` and can be kept by the
+    caller to skip the lookup on later increments.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Iterable[str] = ()):
+        """Initialize a counter, see _Metric."""
+        super().__init__(name, documentation, labelnames)
+        self._children: Dict[Tuple[str, ...], _Shards] = {}
+        self._lock = threading.Lock()
+        self._shards = None
+        if not self.labelnames:
+            self._shards = self._children[()] = _Shards()
+
+    def labels(self, **labels: str) -> _Shards:
+        """
+        Return the counter of one label set.
+
+        Args:
+            **labels (str): A value for every label name.
+
+        Returns:
+            The counter of the label set, with an `inc` method.
+        """
+        values = self._label_values(labels)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, _Shards())
+        return child
+
+    def inc(self, amount=1) -> None:
+        """
+        Increment a counter without labels.
+
+        Args:
+            amount (float, optional): The increment. Defaults to 1.
+
+        Raises:
+            ValueError: If the amount is negative, or the counter has
+            labels.
+        """
+        if self._shards is None:
+            raise ValueError(
+                f"The counter {self.name} has labels "
+                f"{', '.join(self.labelnames)}; increment it with "
+                ".labels(...).inc().")
+        if amount < 0:
+            raise ValueError("A counter can only be incremented.")
+        self._shards.inc(amount)
+
+    def value(self, **labels: str):
+        """
+        Return the current value of the counter of a label set.
+
+        Args:
+            **labels (str): A value for every label name.
+
+        Returns:
+            float: The count, 0 if the label set was never incremented.
+        """
+        child = self._children.get(self._label_values(labels))
+        return 0 if child is None else child.total()
+
+    def samples(self):
+        """Yield the (label values, value) pairs, ordered by labels."""
+        for values, child in sorted(list(self._children.items())):
+            yield values, child.total()
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down, such as the items of a warehouse.
+
+    A gauge is either set by its users or computed by a function when it
+    is collected. Computing it on collection costs nothing between
+    scrapes, which suits values that are already kept elsewhere.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Iterable[str] = ()):
+        """Initialize a gauge, see _Metric."""
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function = None
+
+    def set(self, value, **labels: str) -> None:
+        """
+        Set the value of the gauge for a label set.
+
+        Args:
+            value (float): The new value.
+            **labels (str): A value for every label name.
+        """
+        self._values[self._label_values(labels)] = value
+
+    def set_function(self, function: Callable) -> None:
+        """
+        Compute the gauge with a function each time it is collected.
+
+        Args:
+            function (Callable): Returns the value of a gauge without
+            labels, or a dict of label value tuples to values.
+        """
+        self._function = function
+
+    def value(self, **labels: str):
+        """
+        Return the current value of the gauge for a label set.
+
+        Args:
+            **labels (str): A value for every label name.
+
+        Returns:
+            float: The value, or None if it was never set.
+        """
+        return dict(self.samples()).get(self._label_values(labels))
+
+    def samples(self):
+        """Yield the (label values, value) pairs, ordered by labels."""
+        if self._function is None:
+            values = dict(self._values)
+        elif self.labelnames:
+            values = {tuple(str(part) for part in key): value
+                      for key, value in self._function().items()}
+        else:
+            values = {(): self._function()}
+        for key in sorted(values):
+            yield key, values[key]
+
+
+class _Observations:
+    """
+    The bucket counts and sum of the observations of one label set.
+
+    Attributes:
+        counts (list): The observations per bucket, the last one for
+        the values above every bound.
+        sum (float): The sum of the observed values.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        """Initialize empty counts for the bucket bounds."""
+        self._buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """
+        Count one observed value into its bucket.
+
+        Args:
+            value (float): The value, e.g. a duration in seconds.
+        """
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> "_Timer":
+        """
+        Return a timer observing the seconds a block or function runs.
+
+        Returns:
+            A context manager, which also decorates a function to time
+            each of its calls.
+        """
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[list, float]:
+        """Return copies of the counts and the sum, taken together."""
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class _Timer:
+    """Observes the duration of a `with` block or a call in seconds."""
+
+    __slots__ = ("observations", "start")
+
+    def __init__(self, observations: _Observations):
+        self.observations = observations
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.observations.observe(time.perf_counter() - self.start)
+        return False
+
+    def __call__(self, function: Callable) -> Callable:
+        """Decorate a function, timing each call with a new timer."""
+        observations = self.observations
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with _Timer(observations):
+                return function(*args, **kwargs)
+        return wrapper
+
+
+class Histogram(_Metric):
+    """
+    The distribution of observed values, such as operation durations.
+
+    Values are counted into buckets with fixed upper bounds, exported
+    cumulatively as Prometheus does, so the p50, p95 and p99 of any
+    window can be computed by the collector with histogram_quantile.
+    Observing a value costs one binary search and a short lock.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        """
+        Initialize a histogram, see _Metric.
+
+        Args:
+            buckets (Iterable[float], optional): The upper bounds of the
+            buckets, in increasing order. Defaults to DEFAULT_BUCKETS.
+
+        Raises:
+            ValueError: If the bounds are empty or not increasing.
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets)
+        if not self.buckets or any(
+                low >= high for low, high in zip(self.buckets,
+                                                 self.buckets[1:])):
+            raise ValueError("The bucket bounds must be increasing.")
+        self._children: Dict[Tuple[str, ...], _Observations] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: str) -> _Observations:
+        """
+        Return the observations of one label set.
+
+        Args:
+            **labels (str): A value for every label name.
+
+        Returns:
+            The observations of the label set, with `observe` and
+            `time` methods.
+        """
+        values = self._label_values(labels)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(
+                    values, _Observations(self.buckets))
+        return child
+
+    def samples(self):
+        """Yield the (label values, number of observations) pairs."""
+        for values, child in sorted(list(self._children.items())):
+            yield values, sum(child.snapshot()[0])
+
+    def exposition(self) -> str:
+        """
+        Return the histogram in the Prometheus text format.
+
+        Returns:
+            str: The HELP and TYPE lines, then the cumulative buckets,
+            sum and count of every label set.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} {self.kind}"]
+        names = self.labelnames + ("le",)
+        for values, child in sorted(list(self._children.items())):
+            counts, total = child.snapshot()
+            cumulative = 0
+            bounds = self.buckets + (math.inf,)
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _format_labels(
+                    names, values + (_format_value(float(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+class Registry:
+    """
+    The metrics of a process, exported together.
+
+    Attributes:
+        metrics (Dict[str, _Metric]): The registered metrics by name.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self.metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """
+        Add a metric to the registry.
+
+        Args:
+            metric (_Metric): The metric to add.
+
+        Returns:
+            _Metric: The metric, so it can be defined in one statement.
+
+        Raises:
+            ValueError: If a metric of the same name is registered.
+        """
+        with self._lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"The metric {metric.name} already exists.")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str,
+                labelnames: Iterable[str] = ()) -> Counter:
+        """Create and register a counter, see Counter."""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str,
+              labelnames: Iterable[str] = ()) -> Gauge:
+        """Create and register a gauge, see Gauge."""
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str,
+                  labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Create and register a histogram, see Histogram."""
+        return self.register(
+            Histogram(name, documentation, labelnames, buckets))
+
+    def exposition(self) -> str:
+        """
+        Return every metric in the Prometheus text format.
+
+        Returns:
+            str: The metrics, ordered by name.
+        """
+        with self._lock:
+            metrics = sorted(self.metrics.items())
+        return "".join(metric.exposition() for _, metric in metrics)
+
+    def write_textfile(self, path: str) -> None:
+        """
+        Write the metrics to a file, replacing it atomically.
+
+        The file is first written next to its final path and then moved
+        over it, so a collector never reads a half-written file.
+
+        Args:
+            path (str): The path of the .prom file.
+        """
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as file:
+            file.write(self.exposition())
+        os.replace(temporary, path)
+
+    def serve(self, port: int = DEFAULT_PORT, host: str = "127.0.0.1"):
+        """
+        Serve the metrics over HTTP at /metrics from a daemon thread.
+
+        Args:
+            port (int, optional): The port to listen on, 0 for any free
+            port. Defaults to DEFAULT_PORT.
+            host (str, optional): The address to listen on. Defaults to
+            the local host only.
+
+        Returns:
+            http.server.ThreadingHTTPServer: The running server; call its
+            `shutdown` to stop it.
+        """
+        registry = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.exposition().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http",
+                         daemon=True).start()
+        return server
+
+
+class TextfileWriter:
+    """
+    Writes the metrics of a registry to a file at a fixed interval.
+
+    Attributes:
+        registry (Registry): The registry to write.
+        path (str): The path of the .prom file.
+        interval (float): The seconds between two writes.
+    """
+
+    def __init__(self, registry: Registry, path: str,
+                 interval: float = DEFAULT_INTERVAL):
+        """Initialize a writer; nothing is written until `start`."""
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-textfile", daemon=True)
+
+    def start(self) -> "TextfileWriter":
+        """Start writing from a daemon thread and return the writer."""
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.registry.write_textfile(self.path)
+            except OSError:
+                # The next interval tries again
+                pass
+            if self._stopped.wait(self.interval):
+                return
+
+    def stop(self) -> None:
+        """Stop the thread after writing the metrics one last time."""
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.registry.write_textfile(self.path)
+
+
+REGISTRY = Registry()
@@ -31,14 +31,75 @@ available items, and session actions.
 Example usage:
 main()
 """
-from classes import SessionReport, User, WarehouseManager
+import os
+import time
+
+from classes import WAREHOUSE_ITEMS, SessionReport, User, WarehouseManager
+from events import EventLog
 from loader import Loader
+from metrics import REGISTRY, TextfileWriter
+
+# The loaders read their data on first use, not at import time
+personnel_data = Loader(model="personnel")
+stock = Loader(model="stock")
+
+FAILED_AUTHENTICATIONS = REGISTRY.counter(
+    "warehouse_failed_authentications_total",
+    "Log-ins rejected for a wrong name or password.")
+
+
+def start_metrics_export(manager):
+    """
+    Export the metrics as configured by the environment.
+
+    WAREHOUSE_METRICS_PORT serves them at http://127.0.0.1:<port>/metrics
+    and WAREHOUSE_METRICS_TEXTFILE writes them to a .prom file every
+    WAREHOUSE_METRICS_INTERVAL seconds. Neither is started by default.
+
+    Args:
+        manager (WarehouseManager): The manager whose warehouses are
+        reported by the warehouse_items gauge.
+    """
+    WAREHOUSE_ITEMS.set_function(lambda: {
+        (warehouse.id,): warehouse.occupancy()
+        for warehouse in manager.stock})
 
-personnel_loader = Loader(model="personnel")
-personnel_data = personnel_loader.objects
+    port = os.environ.get("WAREHOUSE_METRICS_PORT")
+    if port:
+        REGISTRY.serve(int(port))
+    path = os.environ.get("WAREHOUSE_METRICS_TEXTFILE")
+    if path:
+        interval = float(os.environ.get("WAREHOUSE_METRICS_INTERVAL", 15))
+        TextfileWriter(REGISTRY, path, interval).start()
 
-stock_loader = Loader(model="stock")
-stock = stock_loader.objects
+
+def open_event_log(manager):
+    """
+    Record the stock mutations as configured by the environment.
+
+    WAREHOUSE_EVENT_LOG names the log file. If the log or its snapshot
+    exists, the stock is restored from them instead of the data file;
+    otherwise the loaded stock is snapshotted, so the log only has to
+    hold what changes afterwards. No log is kept by default.
+
+    Args:
+        manager (WarehouseManager): The manager of the loaded stock.
+
+    Returns:
+        Tuple[WarehouseManager, EventLog]: The manager to use and its
+        log, or the given manager and None if no log is configured.
+    """
+    path = os.environ.get("WAREHOUSE_EVENT_LOG")
+    if not path:
+        return manager, None
+    event_log = EventLog(path)
+    if os.path.exists(path) or os.path.exists(event_log.snapshot_path):
+        manager = WarehouseManager([])
+        event_log.restore(manager)
+    else:
+        event_log.attach(manager)
+        event_log.snapshot(manager)
+    return manager, event_log
 
 
 def guest_login():
@@ -91,6 +152,7 @@ def get_authenticated_user(personnel_data):
 
             return employee  # Return the authenticated Employee object
 
+    FAILED_AUTHENTICATIONS.inc()
     print(f"Authentication failed for user {user_name}.")
     return None  # Return None for failed authentication
 
@@ -146,7 +208,11 @@ def main():
 
     session_report = SessionReport(user)
     # Create an instance of WarehouseManager
-    warehouse_manager = WarehouseManager(stock)
+    warehouse_manager, event_log = open_event_log(WarehouseManager(stock))
+    start_metrics_export(warehouse_manager)
+    snapshot_interval = float(
+        os.environ.get("WAREHOUSE_SNAPSHOT_INTERVAL", 300))
+    last_snapshot = time.monotonic()
 
     while True:
         choice = get_selected_operation()
@@ -164,7 +230,8 @@ def main():
                 print("Authentication required.")
                 continue
 
-            user.search_and_order_item(stock)
+            # Through the manager, so orders can span its warehouses
+            user.search_and_order_item(warehouse_manager)
 
             session_report.add_action("Searched and Ordered")
             session_report.record_searched_item(user.last_searched_item)
@@ -175,7 +242,7 @@ def main():
             )
 
         elif choice == "3":
-            user.browse_by_category(stock)
+            user.browse_by_category(warehouse_manager.stock)
             if user.is_authenticated:
                 session_report.add_action("Browsed Items")
                 session_report.record_browsed_item(user.last_browsed_item)
@@ -185,6 +252,17 @@ def main():
 
             break
 
+        # Between operations nothing mutates the stock, so a snapshot
+        # taken here matches the log offset it covers
+        if (event_log is not None
+                and time.monotonic() - last_snapshot >= snapshot_interval):
+            event_log.snapshot(warehouse_manager)
+            last_snapshot = time.monotonic()
+
+    if event_log is not None:
+        event_log.snapshot(warehouse_manager)
+        event_log.close()
+
 
 if __name__ == "__main__":
     main()
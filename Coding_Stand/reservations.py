@@ -0,0 +1,201 @@
+"""
+The code module holds stock for an order while it is being confirmed.
+
+Classes:
+    - Reservation
+    - ReservationBook
+
+A reservation holds a quantity of a SKU in the ledger of its warehouse
+for a limited time. Other orders cannot take the held items, and the
+reservation is either confirmed, which dispatches them, cancelled or
+left to expire, which makes them available again.
+"""
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, List, NamedTuple
+
+from inventory import SKU
+
+DEFAULT_TTL = 300.0
+
+
+class Reservation(NamedTuple):
+    """
+    A quantity of a SKU held for a pending order.
+
+    Attributes:
+        id (int): The ID of the reservation.
+        sku (SKU): The reserved SKU.
+        quantity (int): The number of items held.
+        expires_at (float): The clock time at which the hold ends.
+    """
+
+    id: int
+    sku: SKU
+    quantity: int
+    expires_at: float
+
+
+class ReservationBook:
+    """
+    The reservations held against the warehouses of a WarehouseManager.
+
+    Expiry is driven by a heap of the reservations ordered by their
+    expiry time. Every call first pops the reservations whose time is
+    up, so releasing a hold costs O(log n) once, and no periodic scan
+    over the outstanding holds is needed. Confirmed and cancelled
+    reservations are left in the heap and skipped when they reach the
+    top. The book also registers `expire` as an order hook of the
+    manager, so orders placed through the manager never find items
+    held by a reservation whose time is up.
+    """
+
+    def __init__(self, manager, ttl: float = DEFAULT_TTL,
+                 clock=time.monotonic):
+        """
+        Initialize an empty reservation book.
+
+        Args:
+            manager (WarehouseManager): The manager of the warehouses.
+            ttl (float, optional): The default hold time in seconds.
+            Defaults to DEFAULT_TTL.
+            clock (Callable[[], float], optional): The clock of the
+            expiry times. Defaults to time.monotonic.
+        """
+        self.manager = manager
+        self.ttl = ttl
+        self.clock = clock
+        self._active: Dict[int, Reservation] = {}
+        self._expiries = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        manager.add_order_hook(self.expire)
+
+    def __len__(self) -> int:
+        """
+        Return the number of reservations still held.
+
+        Returns:
+            int: The number of outstanding reservations.
+        """
+        self.expire()
+        return len(self._active)
+
+    def _ledger(self, sku: SKU):
+        """
+        Return the ledger of the warehouse holding a SKU.
+
+        Args:
+            sku (SKU): The (state, category, warehouse) of the items.
+
+        Returns:
+            InventoryLedger: The ledger of the warehouse.
+
+        Raises:
+            KeyError: If the warehouse of the SKU is unknown.
+        """
+        return self.manager.warehouses[str(sku[2])].ledger
+
+    def reserve(self, sku: SKU, quantity: int,
+                ttl: float = None) -> Reservation:
+        """
+        Hold items of a SKU for a limited time.
+
+        Args:
+            sku (SKU): The (state, category, warehouse) of the items.
+            quantity (int): The number of items to hold.
+            ttl (float, optional): The hold time in seconds. Defaults to
+            the ttl of the book.
+
+        Returns:
+            Reservation: The new reservation.
+
+        Raises:
+            KeyError: If the warehouse of the SKU is unknown.
+            ValueError: If the quantity is not positive.
+            InsufficientQuantityError: If fewer items are available.
+        """
+        self.expire()
+        self._ledger(sku).hold(sku, quantity)
+        expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            reservation = Reservation(
+                next(self._ids), sku, quantity, expires_at)
+            self._active[reservation.id] = reservation
+            heapq.heappush(self._expiries, (expires_at, reservation.id))
+        return reservation
+
+    def _pop(self, reservation_id: int) -> Reservation:
+        """
+        Remove an outstanding reservation from the book.
+
+        Args:
+            reservation_id (int): The ID of the reservation.
+
+        Returns:
+            Reservation: The removed reservation.
+
+        Raises:
+            KeyError: If the reservation is unknown or has expired.
+        """
+        self.expire()
+        with self._lock:
+            reservation = self._active.pop(reservation_id, None)
+        if reservation is None:
+            raise KeyError(
+                f"Reservation {reservation_id} is unknown or has expired.")
+        return reservation
+
+    def confirm(self, reservation_id: int) -> List:
+        """
+        Dispatch the items held by a reservation.
+
+        Args:
+            reservation_id (int): The ID of the reservation.
+
+        Returns:
+            List[Item]: The dispatched items.
+
+        Raises:
+            KeyError: If the reservation is unknown or has expired.
+        """
+        reservation = self._pop(reservation_id)
+        # The hold is released under the lock the items are taken with
+        return self.manager.order(reservation.sku, reservation.quantity,
+                                  held=reservation.quantity)
+
+    def cancel(self, reservation_id: int) -> None:
+        """
+        Release the items held by a reservation.
+
+        Args:
+            reservation_id (int): The ID of the reservation.
+
+        Raises:
+            KeyError: If the reservation is unknown or has expired.
+        """
+        reservation = self._pop(reservation_id)
+        self._ledger(reservation.sku).release(
+            reservation.sku, reservation.quantity)
+
+    def expire(self) -> int:
+        """
+        Release the reservations whose hold time is up.
+
+        Returns:
+            int: The number of reservations released.
+        """
+        now = self.clock()
+        expired = []
+        with self._lock:
+            while self._expiries and self._expiries[0][0] <= now:
+                _, reservation_id = heapq.heappop(self._expiries)
+                reservation = self._active.pop(reservation_id, None)
+                if reservation is not None:
+                    expired.append(reservation)
+        for reservation in expired:
+            self._ledger(reservation.sku).release(
+                reservation.sku, reservation.quantity)
+        return len(expired)
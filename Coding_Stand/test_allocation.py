@@ -0,0 +1,94 @@
+"""
+Unit tests for the 'allocation' module.
+
+The tests check how each allocation policy splits an order across the
+warehouses, and that WarehouseManager.place_orders dispatches the items
+the chosen policy allocated.
+"""
+import unittest
+
+from allocation import Source, allocate
+from classes import Item, Warehouse, WarehouseManager
+
+
+def split(allocation):
+    """Return an allocation as a dict of warehouse name to quantity."""
+    return {source.warehouse: taken for source, taken in allocation}
+
+
+class TestPolicies(unittest.TestCase):
+    """Tests for the allocation policies."""
+
+    def setUp(self):
+        """Create three sources of one item."""
+        self.sources = [
+            Source("north", ("Blue", "Mouse", 1), 2, 10, oldest=300),
+            Source("south", ("Blue", "Mouse", 2), 5, 6, oldest=100),
+            Source("east", ("Blue", "Mouse", 3), 4, 12, oldest=200),
+        ]
+
+    def test_fewest(self):
+        """Test that the fullest sources are used first."""
+        self.assertEqual(split(allocate(6, self.sources, "fewest")),
+                         {"south": 5, "east": 1})
+
+    def test_oldest(self):
+        """Test that the sources with the oldest stock are used first."""
+        self.assertEqual(split(allocate(6, self.sources, "oldest")),
+                         {"south": 5, "east": 1})
+        self.assertEqual(split(allocate(3, self.sources, "oldest")),
+                         {"south": 3})
+
+    def test_balanced(self):
+        """Test that the fullest warehouses are evened out."""
+        self.assertEqual(split(allocate(2, self.sources, "balanced")),
+                         {"east": 2})
+        self.assertEqual(split(allocate(5, self.sources, "balanced")),
+                         {"north": 2, "east": 3})
+
+    def test_short_and_invalid_requests(self):
+        """Test partial allocations and rejected arguments."""
+        self.assertEqual(sum(split(allocate(20, self.sources)).values()), 11)
+        with self.assertRaises(ValueError):
+            allocate(0, self.sources)
+        with self.assertRaises(ValueError):
+            allocate(1, self.sources, "random")
+
+
+class TestSplitOrders(unittest.TestCase):
+    """Tests for orders split by WarehouseManager.place_orders."""
+
+    def setUp(self):
+        """Create two warehouses with items of different ages."""
+        self.first = Warehouse(1)
+        self.second = Warehouse(2)
+        for warehouse, dates in ((self.first, ("2022-01-01", "2022-01-02")),
+                                 (self.second, ("2021-01-01",))):
+            for date in dates:
+                warehouse.add_item(Item("Blue", "Mouse", warehouse.id,
+                                        f"{date} 10:00:00"))
+            warehouse.add_item(Item("Red", "Keyboard", warehouse.id,
+                                    "2020-01-01 10:00:00"))
+        self.manager = WarehouseManager([self.first, self.second])
+
+    def test_oldest_stock_is_dispatched_first(self):
+        """Test that the oldest policy prefers the older warehouse."""
+        self.assertLess(self.second.oldest(("Blue", "Mouse", 2)),
+                        self.first.oldest(("Blue", "Mouse", 1)))
+
+        (items,) = self.manager.place_orders([("Blue", "Mouse", 1)],
+                                             policy="oldest")
+        self.assertEqual(items[0].warehouse, 2)
+        self.assertIsNone(self.second.oldest(("Blue", "Mouse", 2)))
+
+    def test_order_larger_than_any_warehouse(self):
+        """Test that an order is split when no warehouse can fill it."""
+        (items,) = self.manager.place_orders([("Blue", "Mouse", 3)])
+
+        self.assertEqual(sorted(item.warehouse for item in items), [1, 1, 2])
+        self.assertEqual(self.first.occupancy(), 1)
+        self.assertEqual(self.second.occupancy(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -20,7 +20,7 @@ Note: The 'classes' module needs to be imported before running the tests.
 """
 import unittest
 
-from classes import Employee, Item, User, Warehouse
+from classes import Employee, Item, StockTable, User, Warehouse
 
 
 class TestClasses(unittest.TestCase):
@@ -365,6 +365,107 @@ class TestEmployee(unittest.TestCase):
             "Expected 1 occurrence of Orange Keyboard in Warehouse 2",
         )
 
+    def test_warehouse_search_index(self):
+        """Test that Warehouse.search matches category substrings."""
+        warehouse = Warehouse(1)
+        categories = ["Mouse", "Keyboard", "USB hub", "mouse pad", "Mouse"]
+        for category in categories:
+            warehouse.add_item(
+                Item(
+                    state="Blue",
+                    category=category,
+                    warehouse=1,
+                    date_of_stock="2021-05-26 17:20:10",
+                )
+            )
+
+        self.assertEqual(
+            [item.category for item in warehouse.search("MOUSE")],
+            ["Mouse", "mouse pad", "Mouse"],
+            "Search should be case-insensitive and keep stock order",
+        )
+        self.assertEqual(
+            [item.category for item in warehouse.search("b")],
+            ["Keyboard", "USB hub"],
+            "Short search terms should match any substring",
+        )
+        self.assertEqual(
+            [item.category for item in warehouse.search("eyboar")],
+            ["Keyboard"],
+            "Long search terms should match any substring",
+        )
+        self.assertEqual(warehouse.search("tablet"), [],
+                         "Unknown terms should not match")
+        self.assertEqual(len(warehouse.search("")), len(categories),
+                         "An empty term should match every item")
+
+        # Items appended to the stock list directly are still found
+        warehouse.stock.append(
+            Item(
+                state="Red",
+                category="Mouse",
+                warehouse=1,
+                date_of_stock="2021-05-26 17:20:10",
+            )
+        )
+        self.assertEqual(len(warehouse.search("mouse")), 4,
+                         "Directly appended items should be indexed")
+
+    def test_stock_table_backed_warehouse(self):
+        """Test a Warehouse storing its stock in a StockTable."""
+        warehouse = Warehouse(1, StockTable())
+        warehouse.add_item(
+            Item(
+                state="Blue",
+                category="Mouse",
+                warehouse=1,
+                date_of_stock="2021-05-26 17:20:10",
+            )
+        )
+        warehouse.add_item(
+            Item(
+                state="Red",
+                category="Keyboard",
+                warehouse=1,
+                date_of_stock="2020-01-02 03:04:05",
+            )
+        )
+        warehouse.add_item(
+            Item(
+                state="Red",
+                category="mouse",
+                warehouse=1,
+                date_of_stock="2019-12-31 23:59:59",
+            )
+        )
+
+        self.assertEqual(warehouse.occupancy(), 3,
+                         "Occupancy should count the table rows")
+        item = warehouse.stock[1]
+        self.assertEqual(
+            [item.state, item.category, item.warehouse, item.date_of_stock],
+            ["Red", "Keyboard", 1, "2020-01-02 03:04:05"],
+            "Item views should decode the stored row",
+        )
+        self.assertEqual(str(item), "Red Keyboard",
+                         "Item views should print like items")
+        self.assertEqual(warehouse.stock.count_of("state", "Red"), 2,
+                         "Counts should scan the code column")
+        self.assertEqual(
+            warehouse.category_counts(), {"mouse": 2, "keyboard": 1},
+            "Category counts should be grouped by lowercased category",
+        )
+        self.assertEqual(
+            [str(item) for item in warehouse.search("MOUSE")],
+            ["Blue Mouse", "Red mouse"],
+            "Search should return views of the matching rows",
+        )
+
+        # Tables created from the same encoders share the codes
+        other = StockTable(warehouse.stock.encoders)
+        self.assertIs(other.encoders["category"],
+                      warehouse.stock.encoders["category"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,118 @@
+"""
+Unit tests for the 'events' module.
+
+The tests check that the stock mutations of attached warehouses are
+logged and fsynced in groups or once they are due, and that restoring
+from the snapshot and the log tail rebuilds the same stock without
+counting the replayed orders again.
+"""
+import os
+import tempfile
+import unittest
+
+import classes
+from classes import Item, Warehouse, WarehouseManager
+from events import EventLog
+
+
+def on_hand(manager):
+    """Return the quantities on hand of every warehouse of a manager."""
+    return {str(warehouse.id): warehouse.ledger.quantities()
+            for warehouse in manager.stock}
+
+
+class TestEventLog(unittest.TestCase):
+    """Tests for the EventLog class."""
+
+    def setUp(self):
+        """Create a logged manager of two warehouses."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "stock.log")
+        self.log = EventLog(self.path, group_size=4)
+        self.manager = WarehouseManager([Warehouse(1), Warehouse(2)])
+        self.log.attach(self.manager)
+        for day in range(1, 4):
+            self.manager.stock[0].add_item(Item(
+                "Blue", "Mouse", 1, f"2021-05-0{day} 17:20:10"))
+        self.manager.stock[1].add_item(Item(
+            "Red", "Keyboard", 2, "2021-05-01 17:20:10",
+            "2025-01-01 00:00:00"))
+
+    def tearDown(self):
+        """Close the log and remove its directory."""
+        self.log.close()
+        self.directory.cleanup()
+
+    def restored(self):
+        """Return a new manager restored from the files on disk."""
+        manager = WarehouseManager([])
+        replayed = EventLog(self.path).restore(manager)
+        return manager, replayed
+
+    def test_replay_whole_log(self):
+        """Test that replaying the log rebuilds the stock."""
+        self.manager.order(("Blue", "Mouse", 1), 1)
+        self.manager.transfer(("Blue", "Mouse", 1), 2, 1)
+        self.log.close()
+        orders = classes.ORDERS_PLACED.value()
+
+        manager, replayed = self.restored()
+        self.assertEqual(replayed, 6)
+        self.assertEqual(classes.ORDERS_PLACED.value(), orders,
+                         "Replayed orders are not new orders")
+        self.assertEqual(on_hand(manager), on_hand(self.manager))
+        moved = manager.warehouses["2"].items_on_hand()
+        self.assertEqual([item.date_of_stock for item in moved],
+                         ["2021-05-01 17:20:10", "2021-05-02 17:20:10"])
+        self.assertEqual(moved[0].expiry_date, "2025-01-01 00:00:00")
+
+    def test_snapshot_and_tail(self):
+        """Test that only the events after the snapshot are replayed."""
+        self.manager.order(("Blue", "Mouse", 1), 2)
+        self.log.snapshot(self.manager)
+        self.manager.transfer(("Red", "Keyboard", 2), 1, 1)
+        self.log.close()
+
+        manager, replayed = self.restored()
+        self.assertEqual(replayed, 1)
+        self.assertEqual(on_hand(manager), on_hand(self.manager))
+
+        # The restored log keeps recording the restored warehouses
+        manager.order(("Blue", "Mouse", 1), 1)
+        manager.stock[0].journal.close()
+        self.assertEqual(self.restored()[1], 2)
+
+    def test_pending_records_are_synced_when_due(self):
+        """Test that a trickle of records is fsynced after max_delay."""
+        now = [0.0]
+        log = EventLog(os.path.join(self.directory.name, "slow.log"),
+                       group_size=100, max_delay=5, clock=lambda: now[0])
+        self.addCleanup(log.close)
+        sku = ("Blue", "Mouse", 1)
+
+        log.order(sku, 1)
+        now[0] = 4
+        log.order(sku, 1)
+        self.assertEqual(log._pending, 2)
+
+        now[0] = 5
+        log.order(sku, 1)
+        self.assertEqual(log._pending, 0)
+        now[0] = 9
+        log.order(sku, 1)
+        self.assertEqual(log._pending, 1, "The delay starts over")
+
+    def test_torn_tail_is_dropped(self):
+        """Test that a half-written record at the end is cut off."""
+        self.log.close()
+        size = os.path.getsize(self.path)
+        with open(self.path, "ab") as file:
+            file.write(b"\x01\x02\x03")
+
+        manager, replayed = self.restored()
+        self.assertEqual(replayed, 4)
+        self.assertEqual(os.path.getsize(self.path), size)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,335 @@
+"""
+Unit tests for the 'inventory' module.
+
+The tests check that the InventoryLedger keeps the quantities per SKU and
+per category, and that orders placed by an Employee are taken from the
+ledger and the stock of the warehouse holding the item.
+"""
+import sys
+import threading
+import unittest
+from collections import Counter
+from unittest.mock import patch
+
+from classes import Employee, Item, Warehouse, WarehouseManager
+from inventory import InsufficientQuantityError, InventoryLedger
+
+
+def make_warehouse(warehouse_id, *items):
+    """Return a warehouse holding items given as (state, category) pairs."""
+    warehouse = Warehouse(warehouse_id)
+    for state, category in items:
+        warehouse.add_item(
+            Item(state, category, warehouse_id, "2021-05-26 17:20:10"))
+    return warehouse
+
+
+class TestInventoryLedger(unittest.TestCase):
+    """Tests for the InventoryLedger class."""
+
+    def test_receive_and_take(self):
+        """Test that receiving and taking items updates every count."""
+        ledger = InventoryLedger()
+        ledger.receive(("Blue", "Mouse", 1), 3)
+        ledger.receive(("Red", "mouse", 1))
+        ledger.receive(("Red", "Keyboard", 1))
+
+        self.assertEqual(len(ledger), 5)
+        self.assertEqual(ledger.available(("Blue", "Mouse", 1)), 3)
+        self.assertEqual(ledger.available(("Green", "Mouse", 1)), 0)
+        self.assertEqual(ledger.category_counts(),
+                         Counter({"mouse": 4, "keyboard": 1}))
+
+        ledger.take(("Red", "Keyboard", 1), 1)
+        self.assertEqual(len(ledger), 4)
+        self.assertEqual(ledger.category_counts(), Counter({"mouse": 4}))
+        self.assertNotIn(("Red", "Keyboard", 1), ledger.quantities())
+
+    def test_take_more_than_available(self):
+        """Test that over-ordering raises and leaves the ledger untouched."""
+        ledger = InventoryLedger()
+        ledger.receive(("Blue", "Mouse", 1), 2)
+
+        with self.assertRaises(InsufficientQuantityError) as context:
+            ledger.take(("Blue", "Mouse", 1), 3)
+        self.assertEqual(context.exception.available_quantity, 2)
+        with self.assertRaises(ValueError):
+            ledger.take(("Blue", "Mouse", 1), 0)
+        self.assertEqual(ledger.available(("Blue", "Mouse", 1)), 2)
+
+
+class TestOrders(unittest.TestCase):
+    """Tests for orders placed against the warehouse ledgers."""
+
+    def setUp(self):
+        """Create two warehouses with mice and keyboards."""
+        self.stock = [
+            make_warehouse(1, ("Blue", "Mouse"), ("Blue", "Mouse"),
+                           ("Red", "Keyboard")),
+            make_warehouse(2, ("Blue", "Mouse")),
+        ]
+        self.employee = Employee(user_name="John", password="password")
+
+    @patch("builtins.print")
+    def test_place_order_reduces_stock(self, mock_print):
+        """Test that an order is dispatched from the right warehouse."""
+        found_items, item_counts = self.employee.search_item(
+            self.stock, "mouse")
+        self.assertEqual(item_counts["Blue Mouse (Warehouse 1)"], 2)
+
+        self.employee.place_order(found_items[0], 2, item_counts, self.stock)
+
+        self.assertEqual(item_counts["Blue Mouse (Warehouse 1)"], 0)
+        self.assertEqual(self.stock[0].occupancy(), 1)
+        self.assertEqual(self.stock[1].occupancy(), 1)
+        found_items, item_counts = self.employee.search_item(
+            self.stock, "mouse")
+        self.assertEqual(len(found_items), 1,
+                         "Dispatched items should no longer be found")
+        self.assertEqual(self.stock[0].category_counts(),
+                         Counter({"keyboard": 1}))
+
+    @patch("builtins.print")
+    def test_place_order_over_availability(self, mock_print):
+        """Test that an order larger than the ledger is refused."""
+        found_items, item_counts = self.employee.search_item(
+            self.stock, "keyboard")
+
+        self.employee.place_order(found_items[0], 2, item_counts, self.stock)
+
+        mock_print.assert_called_with(
+            "Not enough quantity available for the order.")
+        self.assertEqual(self.stock[0].occupancy(), 3)
+        self.assertIsNone(self.employee.last_ordered_quantity)
+
+    @patch("builtins.print")
+    def test_place_order_across_warehouses(self, mock_print):
+        """Test that an order larger than one warehouse is split."""
+        manager = WarehouseManager(self.stock)
+        found_items, item_counts = self.employee.search_item(
+            manager, "mouse")
+
+        self.employee.place_order(found_items[0], 3, item_counts, manager)
+
+        self.assertEqual(self.employee.last_ordered_quantity, 3)
+        self.assertEqual(self.stock[0].occupancy(), 1)
+        self.assertEqual(self.stock[1].occupancy(), 0)
+        self.assertEqual(item_counts["Blue Mouse (Warehouse 1)"], 0)
+        self.assertEqual(item_counts["Blue Mouse (Warehouse 2)"], 0)
+        self.assertEqual(
+            [call.args for call in mock_print.call_args_list[-3:]],
+            [("Order placed for 3 of 'Blue Mouse':",),
+             ("- 2 from Warehouse 1",), ("- 1 from Warehouse 2",)])
+
+    @patch("builtins.print")
+    def test_order_menu_offers_every_warehouse(self, mock_print):
+        """Test that the menu accepts the quantity of all warehouses."""
+        found_items, item_counts = self.employee.search_item(
+            self.stock, "mouse")
+
+        with patch("builtins.input", side_effect=["1", "3"]):
+            self.employee.order_items(found_items, item_counts, self.stock)
+
+        self.assertEqual(self.employee.last_ordered_quantity, 3)
+        self.assertEqual(
+            sum(warehouse.occupancy() for warehouse in self.stock), 1)
+
+
+class TestConcurrentOrders(unittest.TestCase):
+    """Tests for WarehouseManager.order called from many threads."""
+
+    def test_parallel_orders_never_oversell(self):
+        """Test that racing orders dispatch each item at most once."""
+        warehouse = make_warehouse(
+            1, *[("Blue", "Mouse")] * 50, *[("Red", "Keyboard")] * 50)
+        manager = WarehouseManager([warehouse])
+        dispatched = []
+        refused = []
+
+        def place_orders(sku):
+            for _ in range(20):
+                try:
+                    dispatched.extend(manager.order(sku, 1))
+                except InsufficientQuantityError:
+                    refused.append(sku)
+
+        threads = [
+            threading.Thread(target=place_orders, args=(sku,))
+            for sku in [("Blue", "Mouse", 1), ("Red", "Keyboard", 1)] * 4
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(dispatched), 100, "Every item should be sold")
+        self.assertEqual(len(set(map(id, dispatched))), 100,
+                         "No item should be dispatched twice")
+        self.assertEqual(len(refused), 60)
+        self.assertEqual(warehouse.occupancy(), 0)
+        self.assertEqual(warehouse.search("mouse"), [])
+
+    def test_receive_while_ordering(self):
+        """Test that racing receipts and orders keep the ledger exact."""
+        warehouse = make_warehouse(1, ("Blue", "Mouse"))
+        manager = WarehouseManager([warehouse])
+        dispatched = []
+        # Switch threads often, so the races actually interleave
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-6)
+
+        def receive():
+            for _ in range(1000):
+                warehouse.add_item(
+                    Item("Blue", "Mouse", 1, "2021-05-26 17:20:10"))
+
+        def order():
+            for _ in range(300):
+                try:
+                    dispatched.extend(manager.order(("Blue", "Mouse", 1), 1))
+                    dispatched.extend(manager.place_orders(
+                        [("Blue", "Mouse", 1)], policy="oldest")[0])
+                except InsufficientQuantityError:
+                    pass
+
+        def count():
+            for _ in range(1000):
+                warehouse.occupancy()
+
+        errors = []
+
+        def run(target):
+            try:
+                target()
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=run, args=(target,))
+                   for target in (receive, receive, order, order, count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+            self.assertFalse(thread.is_alive(), "The threads deadlocked")
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(set(map(id, dispatched))), len(dispatched))
+        self.assertEqual(len(warehouse.stock), 2001)
+        self.assertEqual(warehouse.occupancy() + len(dispatched),
+                         len(warehouse.stock),
+                         "The ledger should hold exactly the undispatched "
+                         "items")
+
+    def test_order_unknown_warehouse(self):
+        """Test that ordering from an unknown warehouse raises KeyError."""
+        manager = WarehouseManager([make_warehouse(1, ("Blue", "Mouse"))])
+
+        with self.assertRaises(KeyError):
+            manager.order(("Blue", "Mouse", 9), 1)
+
+
+class TestBatchOrders(unittest.TestCase):
+    """Tests for WarehouseManager.place_orders."""
+
+    def setUp(self):
+        """Create two warehouses and their manager."""
+        self.stock = [
+            make_warehouse(1, ("Blue", "Mouse"), ("Blue", "Mouse"),
+                           ("Red", "Keyboard")),
+            make_warehouse(2, ("Blue", "Mouse"), ("Red", "Keyboard")),
+        ]
+        self.manager = WarehouseManager(self.stock)
+
+    def test_lines_are_filled_across_warehouses(self):
+        """Test that every line is dispatched, spilling to later warehouses."""
+        dispatched = self.manager.place_orders([
+            ("Blue", "Mouse", 2),
+            ("Red", "Keyboard", 1),
+            ("Blue", "Mouse", 1),
+        ])
+
+        self.assertEqual([len(items) for items in dispatched], [2, 1, 1])
+        self.assertEqual([item.warehouse for item in dispatched[2]], [2])
+        self.assertEqual(self.stock[0].occupancy(), 0)
+        self.assertEqual(self.stock[1].occupancy(), 1)
+
+    def test_failing_batch_changes_nothing(self):
+        """Test that one unfillable line cancels the whole batch."""
+        with self.assertRaises(InsufficientQuantityError) as context:
+            self.manager.place_orders([
+                ("Blue", "Mouse", 2),
+                ("Red", "Keyboard", 3),
+            ])
+
+        self.assertEqual(context.exception.sku, ("Red", "Keyboard", None))
+        self.assertEqual(context.exception.available_quantity, 2)
+        self.assertEqual(self.stock[0].occupancy(), 3)
+        self.assertEqual(self.stock[1].occupancy(), 2)
+
+        with self.assertRaises(InsufficientQuantityError):
+            self.manager.place_orders([("Green", "Tablet", 1)])
+        with self.assertRaises(ValueError):
+            self.manager.place_orders([("Blue", "Mouse", 0)])
+
+
+class TestTransfers(unittest.TestCase):
+    """Tests for WarehouseManager.transfer."""
+
+    def test_transferred_items_join_the_target_sku(self):
+        """Test that moved items can be ordered with the target's own."""
+        # Warehouse IDs are strings and item warehouses ints, as loaded
+        stock = [Warehouse("1"), Warehouse("2")]
+        for warehouse_id, count in ((1, 2), (2, 3)):
+            for _ in range(count):
+                stock[warehouse_id - 1].add_item(Item(
+                    "Original", "GPS", warehouse_id, "2021-05-26 17:20:10"))
+        manager = WarehouseManager(stock)
+
+        moved = manager.transfer(("Original", "GPS", 1), "2", 2)
+
+        self.assertEqual([item.warehouse for item in moved], [2, 2])
+        self.assertEqual(stock[1].sku_for("Original", "GPS"),
+                         ("Original", "GPS", 2))
+        self.assertEqual(len(manager.order(("Original", "GPS", 2), 5)), 5)
+        self.assertEqual(stock[1].occupancy(), 0)
+
+
+class TestPicking(unittest.TestCase):
+    """Tests for the picking order of Warehouse.dispatch."""
+
+    def make_warehouse(self, picking):
+        """Return a warehouse holding mice stocked on different days."""
+        warehouse = Warehouse(1, picking=picking)
+        for day, expiry_date in ((3, None), (1, "2023-06-01 00:00:00"),
+                                 (2, "2023-01-01 00:00:00"), (4, None)):
+            warehouse.add_item(Item("Blue", "Mouse", 1,
+                                    f"2021-05-0{day} 17:20:10", expiry_date))
+        return warehouse
+
+    def picked_days(self, warehouse, quantity):
+        """Dispatch mice and return the days they were stocked on."""
+        return [int(item.date_of_stock[8:10])
+                for item in warehouse.dispatch(("Blue", "Mouse", 1),
+                                               quantity)]
+
+    def test_picking_orders(self):
+        """Test that each picking order dispatches the right items."""
+        fifo = self.make_warehouse("fifo")
+        self.assertEqual(self.picked_days(fifo, 2), [1, 2])
+        fifo.add_item(Item("Blue", "Mouse", 1, "2021-05-01 08:00:00"))
+        self.assertEqual(self.picked_days(fifo, 2), [1, 3])
+
+        self.assertEqual(self.picked_days(self.make_warehouse("lifo"), 3),
+                         [4, 3, 2])
+        self.assertEqual(
+            self.picked_days(self.make_warehouse("expiry"), 4),
+            [2, 1, 3, 4])
+
+    def test_unknown_picking_order(self):
+        """Test that an unknown picking order is rejected."""
+        with self.assertRaises(ValueError):
+            Warehouse(1, picking="random")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Unit tests for the data sources of the 'loader' module.
+
+The dataset tests check that the JSON files in data/ hold the same
+records as data.py. The snapshot tests build table-backed warehouses,
+write them to a snapshot next to a temporary source file and check that
+the snapshot is reused while the source is unchanged, also when it
+cannot be written, and rejected once its content changes.
+"""
+import os
+import stat as file_mode
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import classes
+import data
+from classes import Item, StockTable, Warehouse
+from loader import dataset_path, load_dataset, read_snapshot, write_snapshot
+
+
+class TestDatasets(unittest.TestCase):
+    """Tests for load_dataset."""
+
+    def test_json_datasets_match_data_module(self):
+        """Test that the JSON datasets hold the records of data.py."""
+        for name in ("personnel", "stock"):
+            self.assertTrue(os.path.exists(dataset_path(name)),
+                            f"data/{name}.json should exist")
+            self.assertEqual(
+                load_dataset(name),
+                getattr(data, name),
+                f"data/{name}.json is out of date, run compile_data()",
+            )
+
+
+class TestSnapshot(unittest.TestCase):
+    """Tests for write_snapshot and read_snapshot."""
+
+    def setUp(self):
+        """Create a source file and two table-backed warehouses."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.directory.name, "data.py")
+        self.path = self.source + ".snapshot"
+        with open(self.source, "w") as file:
+            file.write("stock = []\n")
+
+        first = Warehouse("1", StockTable())
+        second = Warehouse("2", StockTable(first.stock.encoders))
+        first.add_item(Item("Blue", "Mouse", 1, "2021-05-26 17:20:10"))
+        first.add_item(Item("Red", "Keyboard", 1, "2020-01-02 03:04:05"))
+        second.add_item(Item("Blue", "Mouse", 2, "2019-12-31 23:59:59"))
+        self.warehouses = [first, second]
+
+    def tearDown(self):
+        """Remove the temporary files."""
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        """Test that a fresh snapshot restores the same warehouses."""
+        write_snapshot(self.path, self.source, self.warehouses)
+        restored = read_snapshot(self.path, self.source, classes)
+
+        self.assertEqual([warehouse.id for warehouse in restored], ["1", "2"])
+        self.assertEqual(
+            [[vars_of(item) for item in warehouse.stock]
+             for warehouse in restored],
+            [[vars_of(item) for item in warehouse.stock]
+             for warehouse in self.warehouses],
+            "The restored rows should match the original rows",
+        )
+        self.assertEqual(
+            [str(item) for item in restored[0].search("mouse")],
+            ["Blue Mouse"],
+            "The restored category index should answer searches",
+        )
+
+    def test_touched_source_is_verified_by_hash(self):
+        """Test that a new mtime with the same content keeps the snapshot."""
+        write_snapshot(self.path, self.source, self.warehouses)
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns,
+                                  stat.st_mtime_ns + 10 ** 9))
+
+        self.assertIsNotNone(read_snapshot(self.path, self.source, classes))
+        with patch("loader._source_digest", side_effect=AssertionError(
+                "The refreshed header should spare the hash")):
+            self.assertIsNotNone(
+                read_snapshot(self.path, self.source, classes))
+
+    @unittest.skipIf(os.geteuid() == 0, "root can write read-only files")
+    def test_read_only_snapshot(self):
+        """Test that a snapshot the user cannot write is still read."""
+        write_snapshot(self.path, self.source, self.warehouses)
+        os.chmod(self.path, file_mode.S_IRUSR)
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns,
+                                  stat.st_mtime_ns + 10 ** 9))
+
+        self.assertIsNotNone(read_snapshot(self.path, self.source, classes))
+
+    def test_changed_source_invalidates_snapshot(self):
+        """Test that changing the source content discards the snapshot."""
+        write_snapshot(self.path, self.source, self.warehouses)
+        with open(self.source, "w") as file:
+            file.write("stock = [1]\n")
+
+        self.assertIsNone(read_snapshot(self.path, self.source, classes))
+
+    def test_missing_or_truncated_snapshot(self):
+        """Test that unreadable snapshots are ignored."""
+        self.assertIsNone(read_snapshot(self.path, self.source, classes))
+
+        write_snapshot(self.path, self.source, self.warehouses)
+        with open(self.path, "r+b") as file:
+            file.truncate(os.path.getsize(self.path) - 16)
+        self.assertIsNone(read_snapshot(self.path, self.source, classes))
+
+
+def vars_of(item):
+    """Return the attributes of an item or item view as a list."""
+    return [item.state, item.category, item.warehouse, item.date_of_stock]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,220 @@
+"""
+Unit tests for the 'metrics' module.
+
+The tests check that sharded counters add up across threads, that gauges
+are set or computed on collection, that histograms count observations
+into cumulative buckets, that the registry writes the Prometheus text
+format to a file and over HTTP, and that placing orders and searching
+count and time into the warehouse metrics.
+"""
+import os
+import tempfile
+import threading
+import unittest
+import urllib.request
+from collections import Counter as ItemCounter
+from unittest.mock import patch
+
+import classes
+from classes import Employee, Item, Warehouse, WarehouseManager
+from metrics import CONTENT_TYPE, Counter, Gauge, Histogram, Registry
+
+
+class TestCounter(unittest.TestCase):
+    """Tests for the Counter class."""
+
+    def test_increments_from_many_threads(self):
+        """Test that no increment is lost when threads count at once."""
+        counter = Counter("hits_total", "Hits.")
+
+        def count():
+            for _ in range(10000):
+                counter.inc()
+
+        threads = [threading.Thread(target=count) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter.value(), 80000)
+
+    def test_labels_count_separately(self):
+        """Test that each label set has its own count."""
+        counter = Counter("lookups_total", "Lookups.", ["result"])
+        counter.labels(result="hit").inc(2)
+        counter.labels(result="miss").inc()
+        self.assertEqual(counter.value(result="hit"), 2)
+        self.assertEqual(counter.value(result="miss"), 1)
+        with self.assertRaises(ValueError):
+            counter.labels(outcome="hit")
+        with self.assertRaisesRegex(ValueError, r"\.labels\(\.\.\.\)"):
+            counter.inc()
+
+    def test_negative_increment(self):
+        """Test that a counter cannot go down."""
+        with self.assertRaises(ValueError):
+            Counter("hits_total", "Hits.").inc(-1)
+
+
+class TestGauge(unittest.TestCase):
+    """Tests for the Gauge class."""
+
+    def test_set_and_function(self):
+        """Test that a gauge reports set values or its function's."""
+        gauge = Gauge("items", "Items.", ["warehouse"])
+        gauge.set(3, warehouse="1")
+        self.assertEqual(gauge.value(warehouse="1"), 3)
+
+        stock = {"1": 5, "2": 7}
+        gauge.set_function(
+            lambda: {(key,): value for key, value in stock.items()})
+        stock["2"] = 8
+        self.assertEqual(list(gauge.samples()), [(("1",), 5), (("2",), 8)])
+
+
+class TestHistogram(unittest.TestCase):
+    """Tests for the Histogram class."""
+
+    def test_exposition(self):
+        """Test that buckets are cumulative and bounds are inclusive."""
+        histogram = Histogram("query_seconds", "Queries.", ["query"],
+                              buckets=[0.1, 1])
+        observations = histogram.labels(query="items")
+        for value in (0.05, 0.1, 0.5, 3):
+            observations.observe(value)
+
+        self.assertEqual(
+            histogram.exposition(),
+            "# HELP query_seconds Queries.\n"
+            "# TYPE query_seconds histogram\n"
+            'query_seconds_bucket{query="items",le="0.1"} 2\n'
+            'query_seconds_bucket{query="items",le="1"} 3\n'
+            'query_seconds_bucket{query="items",le="+Inf"} 4\n'
+            'query_seconds_sum{query="items"} 3.65\n'
+            'query_seconds_count{query="items"} 4\n',
+        )
+        self.assertEqual(list(histogram.samples()), [(("items",), 4)])
+
+    def test_timer(self):
+        """Test that a timer observes blocks and decorated calls."""
+        histogram = Histogram("call_seconds", "Calls.", ["call"])
+        observations = histogram.labels(call="add")
+
+        @observations.time()
+        def add(a, b):
+            return a + b
+
+        self.assertEqual(add(1, 2), 3)
+        with observations.time():
+            add(3, 4)
+        counts, total = observations.snapshot()
+        self.assertEqual(sum(counts), 3)
+        self.assertGreater(total, 0)
+
+    def test_bucket_bounds(self):
+        """Test that bucket bounds must increase."""
+        with self.assertRaises(ValueError):
+            Histogram("seconds", "Seconds.", buckets=[1, 1])
+        with self.assertRaises(ValueError):
+            Histogram("seconds", "Seconds.", buckets=[])
+
+
+class TestRegistry(unittest.TestCase):
+    """Tests for the Registry class."""
+
+    def setUp(self):
+        """Create a registry with a counter and a gauge."""
+        self.registry = Registry()
+        self.counter = self.registry.counter(
+            "orders_total", "Orders.", ["warehouse"])
+        self.gauge = self.registry.gauge("ratio", "Ratio.")
+        self.counter.labels(warehouse='a"b').inc(3)
+        self.gauge.set_function(lambda: float("nan"))
+
+    def test_exposition(self):
+        """Test the Prometheus text format of the metrics."""
+        self.assertEqual(
+            self.registry.exposition(),
+            "# HELP orders_total Orders.\n"
+            "# TYPE orders_total counter\n"
+            'orders_total{warehouse="a\\"b"} 3\n'
+            "# HELP ratio Ratio.\n"
+            "# TYPE ratio gauge\n"
+            "ratio NaN\n",
+        )
+
+    def test_duplicate_name(self):
+        """Test that a name can only be registered once."""
+        with self.assertRaises(ValueError):
+            self.registry.gauge("ratio", "Another ratio.")
+
+    def test_write_textfile(self):
+        """Test that the textfile holds the exposition."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "warehouse.prom")
+            self.registry.write_textfile(path)
+            with open(path) as file:
+                self.assertEqual(file.read(), self.registry.exposition())
+            self.assertEqual(os.listdir(directory), ["warehouse.prom"])
+
+    def test_serve(self):
+        """Test that the metrics are served at /metrics."""
+        server = self.registry.serve(port=0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            self.assertEqual(response.headers["Content-Type"], CONTENT_TYPE)
+            self.assertEqual(response.read().decode(),
+                             self.registry.exposition())
+
+
+class TestWarehouseMetrics(unittest.TestCase):
+    """Tests for the metrics counted by the warehouse classes."""
+
+    def setUp(self):
+        """Create a warehouse with three mice."""
+        self.warehouse = Warehouse(1)
+        for _ in range(3):
+            self.warehouse.add_item(
+                Item("Blue", "Mouse", 1, "2021-05-26 17:20:10"))
+        self.manager = WarehouseManager([self.warehouse])
+
+    def test_orders_are_counted(self):
+        """Test that every way of ordering counts orders and items."""
+        orders = classes.ORDERS_PLACED.value()
+        items = classes.ITEMS_ORDERED.value()
+
+        self.manager.order(("Blue", "Mouse", 1), 1)
+        self.manager.place_orders([("Blue", "Mouse", 1)])
+        employee = Employee("John", "password")
+        employee.place_order(self.warehouse.stock[0], 1, ItemCounter(),
+                             [self.warehouse])
+
+        self.assertEqual(classes.ORDERS_PLACED.value() - orders, 3)
+        self.assertEqual(classes.ITEMS_ORDERED.value() - items, 3)
+
+    def test_searches_are_counted(self):
+        """Test that searching counts a search."""
+        searches = classes.SEARCHES.value()
+        Employee("John", "password").search_item([self.warehouse], "mouse")
+        self.assertEqual(classes.SEARCHES.value() - searches, 1)
+
+    def test_operations_are_timed(self):
+        """Test that the menu operations observe their durations."""
+        def observed(operation):
+            return dict(classes.OPERATION_SECONDS.samples()).get(
+                (operation,), 0)
+
+        before = {operation: observed(operation)
+                  for operation in ("display_warehouses", "search_item")}
+        with patch("builtins.print"):
+            self.manager.display_warehouses()
+        Employee("John", "password").search_item([self.warehouse], "mouse")
+
+        for operation, count in before.items():
+            self.assertEqual(observed(operation) - count, 1, operation)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -35,12 +35,14 @@ printed output. Assert that the printed output matches the expected output.
 search term and capturing the printed output. Assert that the number of found
 items matches the sum of item counts.
 """
+import os
+import tempfile
 import unittest
 from contextlib import contextmanager
 from unittest.mock import patch
 
 import query
-from classes import Employee, User, WarehouseManager
+from classes import Employee, Item, User, Warehouse, WarehouseManager
 from query import stock
 
 
@@ -192,6 +194,36 @@ class TestQuery(unittest.TestCase):
         print(f"Found Items : {len(found_items)}")
         print(f"Sum of item counts :  {sum(item_counts.values())}")
 
+    def test_event_log_restores_the_stock(self):
+        """
+        Tests that the configured event log snapshots the loaded stock.
+
+        and that the next run restores it with the orders placed since.
+        """
+        # Warehouse IDs are strings, as the loader creates them
+        warehouse = Warehouse("1")
+        for _ in range(3):
+            warehouse.add_item(
+                Item("Blue", "Mouse", 1, "2021-05-26 17:20:10"))
+
+        with tempfile.TemporaryDirectory() as directory, patch.dict(
+                os.environ, WAREHOUSE_EVENT_LOG=os.path.join(
+                    directory, "stock.log")):
+            manager, event_log = query.open_event_log(
+                WarehouseManager([warehouse]))
+            manager.order(("Blue", "Mouse", 1), 1)
+            event_log.close()
+
+            restored, event_log = query.open_event_log(
+                WarehouseManager(stock))
+            event_log.close()
+
+        self.assertEqual([wh.occupancy() for wh in restored.stock], [2])
+
+        with patch.dict(os.environ, WAREHOUSE_EVENT_LOG=""):
+            self.assertEqual(query.open_event_log(manager),
+                             (manager, None))
+
 
 if __name__ == "__main__":
     unittest.main()
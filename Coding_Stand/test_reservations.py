@@ -0,0 +1,110 @@
+"""
+Unit tests for the 'reservations' module.
+
+The tests check that reservations hold quantities in the ledger, and
+that they are dispatched when confirmed and released when cancelled or
+expired, also when the next order is placed without the book.
+"""
+import unittest
+from collections import Counter
+
+from classes import Employee, Item, Warehouse, WarehouseManager
+from inventory import InsufficientQuantityError
+from reservations import ReservationBook
+
+SKU = ("Blue", "Mouse", 1)
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        """Start the clock at zero."""
+        self.now = 0.0
+
+    def __call__(self):
+        """Return the current time."""
+        return self.now
+
+
+class TestReservationBook(unittest.TestCase):
+    """Tests for the ReservationBook class."""
+
+    def setUp(self):
+        """Create a warehouse of three mice and an empty book."""
+        self.warehouse = Warehouse(1)
+        for _ in range(3):
+            self.warehouse.add_item(
+                Item("Blue", "Mouse", 1, "2021-05-26 17:20:10"))
+        self.clock = FakeClock()
+        self.manager = WarehouseManager([self.warehouse])
+        self.book = ReservationBook(self.manager, ttl=60, clock=self.clock)
+
+    def test_held_items_are_not_available(self):
+        """Test that a reservation keeps other orders off its items."""
+        self.book.reserve(SKU, 2)
+
+        self.assertEqual(self.warehouse.ledger.available(SKU), 1)
+        self.assertEqual(self.warehouse.occupancy(), 3)
+        with self.assertRaises(InsufficientQuantityError):
+            self.book.reserve(SKU, 2)
+        with self.assertRaises(InsufficientQuantityError):
+            self.warehouse.dispatch(SKU, 2)
+
+    def test_confirm_and_cancel(self):
+        """Test that confirming dispatches and cancelling releases."""
+        confirmed = self.book.reserve(SKU, 2)
+        cancelled = self.book.reserve(SKU, 1)
+
+        self.assertEqual(len(self.book.confirm(confirmed.id)), 2)
+        self.book.cancel(cancelled.id)
+        self.assertEqual(len(self.book), 0)
+        self.assertEqual(self.warehouse.occupancy(), 1)
+        self.assertEqual(self.warehouse.ledger.available(SKU), 1)
+        with self.assertRaises(KeyError):
+            self.book.confirm(confirmed.id)
+
+    def test_expiry(self):
+        """Test that holds are released once their time is up."""
+        first = self.book.reserve(SKU, 1)
+        self.clock.now = 30
+        second = self.book.reserve(SKU, 2, ttl=60)
+
+        self.clock.now = 60
+        self.assertEqual(self.book.expire(), 1)
+        self.assertEqual(self.warehouse.ledger.available(SKU), 1)
+        with self.assertRaises(KeyError):
+            self.book.confirm(first.id)
+
+        self.clock.now = 90
+        self.assertEqual(len(self.book), 0)
+        self.assertEqual(self.warehouse.ledger.held(SKU), 0)
+        with self.assertRaises(KeyError):
+            self.book.cancel(second.id)
+
+    def test_orders_release_expired_holds(self):
+        """Test that every way of ordering first expires old holds."""
+        employee = Employee("John", "password")
+        self.book.reserve(SKU, 3, ttl=10)
+        with self.assertRaises(InsufficientQuantityError):
+            self.manager.order(SKU, 1)
+
+        self.clock.now = 100
+        self.assertEqual(len(self.manager.order(SKU, 1)), 1)
+        self.assertEqual(self.warehouse.ledger.held(SKU), 0)
+
+        self.book.reserve(SKU, 2, ttl=10)
+        self.clock.now = 200
+        self.assertEqual(
+            len(self.manager.place_orders([(*SKU[:2], 1)])[0]), 1)
+
+        self.book.reserve(SKU, 1, ttl=10)
+        self.clock.now = 300
+        employee.place_order(self.warehouse.stock[0], 1, Counter(),
+                             self.manager)
+        self.assertEqual(employee.last_ordered_quantity, 1)
+        self.assertEqual(self.warehouse.occupancy(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
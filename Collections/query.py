@@ -19,6 +19,19 @@ def list_items_by_warehouse():
     print(f"Total items in warehouse 2: {total_items_warehouse2}")
 
 
+# Function to split an order over the warehouses, fullest first
+def split_order(amount, warehouse_counts):
+    taken = []
+    for warehouse, count in sorted(
+        warehouse_counts.items(), key=lambda pair: -pair[1]
+    ):
+        if amount <= 0:
+            break
+        taken.append((warehouse, min(count, amount)))
+        amount -= taken[-1][1]
+    return taken
+
+
 # Function to search and order an item
 def search_and_order_item(item_name):
     item_name = item_name.lower()
@@ -62,25 +75,29 @@ def search_and_order_item(item_name):
                 f"Maximum availability: {max_count} in Warehouses {', '.join(map(str, max_warehouses))}"
             )
 
+        # An order can take items from every warehouse holding them
+        total_count = sum(warehouse_counts.values())
+
         # Ask if the user wants to place an order
         order_choice = input("Would you like to order this item?(y/n) ").strip().lower()
         if order_choice == "y":
             order_quantity = int(input("How many would you like? "))
-            if order_quantity <= max_count:
-                print(f"{order_quantity} {item_name.capitalize()} have been ordered.")
-            else:
+            if order_quantity > total_count:
                 print("**************************************************")
                 print(
                     "There are not this many available. The maximum amount that can be ordered is",
-                    max_count,
+                    total_count,
                 )
                 order_choice = (
                     input("Would you like to order the maximum available?(y/n) ")
                     .strip()
                     .lower()
                 )
-                if order_choice == "y":
-                    print(f"{max_count} {item_name.capitalize()} have been ordered.")
+                order_quantity = total_count if order_choice == "y" else 0
+            if order_quantity > 0:
+                print(f"{order_quantity} {item_name.capitalize()} have been ordered.")
+                for warehouse, count in split_order(order_quantity, warehouse_counts):
+                    print(f"- {count} from Warehouse {warehouse}")
     else:
         print(f"Amaunt availability: 0 ")
         print("Location: Not in stock")
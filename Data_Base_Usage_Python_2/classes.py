@@ -1,10 +1,13 @@
 #classes.py
-from collections import Counter
+import heapq
+from collections import Counter, defaultdict
 from datetime import datetime
 from typing import List, Tuple
 import json
 import os
 
+from timing import timed, timed_function
+
 
 class MissingArgument(Exception):
     def __init__(self, argument, message):
@@ -44,29 +47,121 @@ class Item:
     def __str__(self):
         return f"{self.state} {self.category}"
     
+class CategoryIndex:
+    """Inverted index from lowercased category substrings to stock positions."""
+
+    GRAM_SIZE = 3
+
+    def __init__(self):
+        self._postings = {}  # lowercased category -> sorted positions
+        self._grams = defaultdict(set)  # n-gram -> lowercased categories
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, category: str, position: int) -> None:
+        key = category.lower()
+        positions = self._postings.get(key)
+        if positions is None:
+            positions = self._postings[key] = []
+            for size in range(1, self.GRAM_SIZE + 1):
+                for start in range(len(key) - size + 1):
+                    self._grams[key[start:start + size]].add(key)
+        positions.append(position)
+        self._size += 1
+
+    def categories(self, search_term: str) -> List[str]:
+        term = search_term.lower()
+        if not term:
+            return list(self._postings)
+        if len(term) <= self.GRAM_SIZE:
+            return list(self._grams.get(term, ()))
+
+        candidates = None
+        for start in range(len(term) - self.GRAM_SIZE + 1):
+            matches = self._grams.get(term[start:start + self.GRAM_SIZE])
+            if not matches:
+                return []
+            if candidates is None or len(matches) < len(candidates):
+                candidates = matches
+        return [category for category in candidates if term in category]
+
+    def lookup(self, search_term: str) -> List[int]:
+        postings = [self._postings[category]
+                    for category in self.categories(search_term)]
+        if len(postings) == 1:
+            return list(postings[0])
+        return list(heapq.merge(*postings))
+
 class Warehouse:
 
     def __init__(self, warehouse_id=None):
 
         self.id = warehouse_id
         self.stock = []
+        self._index = CategoryIndex()
 
     def occupancy(self) -> int:
     
         return len(self.stock)
 
     def add_item(self, item: Item) -> None:
+        self._sync_index()
+        self._index.add(item.category, len(self.stock))
         self.stock.append(item)
 
+    def _sync_index(self) -> None:
+        # Pick up items appended to the stock list without add_item
+        for position in range(len(self._index), len(self.stock)):
+            self._index.add(self.stock[position].category, position)
+
     def __str__(self) -> str:
         return f"Warehouse {self.id}"
 
     def search(self, search_term: str) -> List[Item]:
-        return [
-            item
-            for item in self.stock
-            if search_term.lower() in item.category.lower()
-        ]
+        self._sync_index()
+        return [self.stock[position]
+                for position in self._index.lookup(search_term)]
+
+class MemoryStock:
+    """Stock queries answered from loaded warehouses.
+
+    `repository.StockRepository` offers the same operations on the
+    database, so the user menus accept either.
+    """
+
+    def __init__(self, warehouses: List[Warehouse]):
+        self.warehouses = warehouses
+
+    def warehouse_counts(self) -> List[Tuple[str, int]]:
+        return [(warehouse.id, warehouse.occupancy())
+                for warehouse in self.warehouses]
+
+    def category_counts(self) -> Counter:
+        categories = Counter()
+        for warehouse in self.warehouses:
+            for item in warehouse.stock:
+                categories[item.category.lower()] += 1
+        return categories
+
+    def items_in_category(self, category: str) -> List[Item]:
+        category = category.lower()
+        return [item for warehouse in self.warehouses
+                for item in warehouse.stock
+                if item.category.lower() == category]
+
+    def search(self, search_term: str) -> List[Item]:
+        return [item for warehouse in self.warehouses
+                for item in warehouse.search(search_term)]
+
+
+def stock_queries(stock):
+    """Return the stock queries of a repository or of loaded warehouses."""
+    if hasattr(stock, "warehouse_counts"):
+        return stock
+    return MemoryStock(stock)
+
 
 class User:
     def __init__(self, user_name: str = "Anonymous", password=None):
@@ -98,14 +193,14 @@ class User:
             "\nPlease contact technical support."
         )
 
+    @timed_function("menu.display_warehouses")
     def display_warehouses(self, stock: List[Warehouse]) -> str:
         total_item_count = 0
 
-        for warehouse in stock:
-            stock_count = warehouse.occupancy()
+        for warehouse_id, stock_count in stock_queries(stock).warehouse_counts():
             total_item_count += stock_count
 
-            print(f"Warehouse {warehouse.id} - Stock Count: {stock_count}")
+            print(f"Warehouse {warehouse_id} - Stock Count: {stock_count}")
 
         print(f"Listed {total_item_count} items.")
     
@@ -120,11 +215,10 @@ class User:
 
 
     def browse_by_category(self, stock: List[Warehouse]) -> None:
-        categories = Counter()
-        for warehouse in stock:
-            for item in warehouse.stock:
-                category = item.category.lower()
-                categories[category] += 1
+        queries = stock_queries(stock)
+        # Only the queries are timed, not the wait for the user's choice
+        with timed("menu.browse_by_category.counts"):
+            categories = queries.category_counts()
 
         print("Available categories:")
         for i, (category, count) in enumerate(categories.items(), 1):
@@ -154,11 +248,9 @@ class User:
 
                 print(f"List of {selected_category}s available:")
 
-                found_items = []
-                for warehouse in stock:
-                    for item in warehouse.stock:
-                        if item.category.lower() == selected_category:
-                            found_items.append(item)
+                with timed("menu.browse_by_category.items"):
+                    found_items = queries.items_in_category(
+                        selected_category)
 
                 for item in found_items:
                     print(
@@ -205,22 +297,21 @@ class Employee(User):
             else:
                 print("Item not found.")
 
+    @timed_function("menu.search_item")
     def search_item(
         self, stock: List[Warehouse], search_term: str) -> Tuple[List[Item], Counter]:
 
         found_items = []
         item_counts = Counter()
 
-        for warehouse in stock:
-            for item in warehouse.stock:
-                if search_term.lower() in item.category.lower():
-                    found_items.append(item)
-                    item_key = (
-                        f"{item.state} {item.category} (Warehouse {
-                            item.warehouse})"
-                    )
-                    item_counts[item_key] += 1
-                    self.last_searched_item = item
+        for item in stock_queries(stock).search(search_term):
+            found_items.append(item)
+            item_key = (
+                f"{item.state} {item.category} (Warehouse {
+                    item.warehouse})"
+            )
+            item_counts[item_key] += 1
+            self.last_searched_item = item
 
         return found_items, item_counts
 
@@ -291,6 +382,7 @@ class Employee(User):
             print("Item not found")
 
 
+    @timed_function("menu.place_order")
     def place_order(self, item: Item, quantity: int, item_counts: Counter, stock: List[Warehouse]):
         item_key = f"{item.state} {item.category} (Warehouse {item.warehouse})"
         available_quantity = item_counts[item_key]
@@ -298,21 +390,6 @@ class Employee(User):
         if quantity <= available_quantity:
             item_counts[item_key] -= quantity
 
-            # Find the corresponding item in the warehouse and update its quantity
-            for warehouse in stock:
-                for warehouse_item in warehouse.stock:
-                    if (
-                        warehouse_item.state == item.state
-                        and warehouse_item.category == item.category
-                        and warehouse_item.warehouse == item.warehouse
-                    ):
-                        warehouse_item_key = (
-                            f"{warehouse_item.state} {warehouse_item.category} "
-                            f"(Warehouse {warehouse_item.warehouse})"
-                        )
-                        item_counts[warehouse_item_key] -= quantity
-                        break
-
             print(f"Order placed for {quantity} of '{item_key}'")
             self.last_ordered_item_state = item.state
             self.last_ordered_item_category = item.category
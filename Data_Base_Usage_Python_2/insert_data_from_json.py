@@ -1,102 +1,207 @@
+import argparse
+import csv
+import io
 import json
-import psycopg2
-from datetime import datetime
-
-# Read JSON data from the stock file
-with open('data/stock.json') as json_file:
-    stock_data = json.load(json_file)
-
-# Read JSON data from the employee file
-with open('data/personnel.json') as json_file:
-    employee_data = json.load(json_file)
-
-# Connect to the PostgreSQL database
-conn = psycopg2.connect(
-    dbname='wh-project',
-    user='postgres',
-    password='admin',
-    host='localhost',
-    port='5432'
-)
-
-# Create a cursor object to execute SQL queries
-cursor = conn.cursor()
-
-# Set to store unique warehouse IDs and names
-unique_warehouses = set()
-
-# Iterate over each JSON object and collect unique warehouses for stock data
-for item in stock_data:
-    warehouse_id = item.get('warehouse')
-    unique_warehouses.add((warehouse_id, str(warehouse_id)))  # Assuming warehouse names are derived from warehouse IDs
-
-# Iterate over unique warehouses and insert into the warehouse table for stock data
-for warehouse_id, warehouse_name in unique_warehouses:
-    # Define the SQL query for warehouse insertion
-    warehouse_sql_query = """
-        INSERT INTO warehouse (warehouse_id, name)
-        VALUES (%s, %s)
-        ON CONFLICT (warehouse_id) DO NOTHING;  -- To avoid duplicate entries based on warehouse_id
+import os
+
+from pool import get_pool
+
+BASE_DIR = os.path.dirname(os.path.realpath(__file__))
+STOCK_PATH = os.path.join(BASE_DIR, "data", "stock.json")
+EMPLOYEES_PATH = os.path.join(BASE_DIR, "data", "personnel.json")
+
+CHUNK_SIZE = 64 * 1024
+BATCH_SIZE = 5000
+
+
+def _iter_json_array(path, chunk_size=CHUNK_SIZE):
+    """Yield the elements of a top-level JSON array one at a time."""
+    decoder = json.JSONDecoder()
+    with open(path) as file:
+        buffer = ""
+        pos = 0
+        eof = False
+        started = False
+
+        while True:
+            # Skip whitespace and separators, reading more data as needed
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                buffer = file.read(chunk_size)
+                pos = 0
+                eof = not buffer
+
+            if pos == len(buffer):
+                raise ValueError(f"Unexpected end of JSON array in {path}")
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError(f"Expected a JSON array in {path}")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            # A bare number or literal may go on in the next chunk until a
+            # "," or "]" follows it, so only trust it once one has been read
+            if end is not None and not eof and buffer[pos] not in '{["':
+                following = end
+                while (following < len(buffer)
+                       and buffer[following] in " \t\r\n"):
+                    following += 1
+                if following == len(buffer) or buffer[following] not in ",]":
+                    end = None
+            # A value touching the end of the buffer may continue in the
+            # next chunk, so only trust it once more data has been read
+            if end is None or (end == len(buffer) and not eof):
+                chunk = file.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+
+            yield element
+            pos = end
+
+
+def _batches(rows, size):
+    """Group rows into lists of at most `size` rows."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert_many(cursor, statement, rows, suffix=""):
+    """Insert many rows with one multi-row INSERT statement."""
+    placeholders = "(" + ", ".join(["%s"] * len(rows[0])) + ")"
+    values = ", ".join([placeholders] * len(rows))
+    params = [value for row in rows for value in row]
+    cursor.execute(f"{statement} VALUES {values} {suffix}", params)
+
+
+def iter_stock_rows(path=STOCK_PATH):
+    """Yield the (state, category, warehouse_id, date_of_stock) rows."""
+    for item in _iter_json_array(path):
+        yield (item["state"], item["category"], item["warehouse"],
+               item["date_of_stock"])
+
+
+def flatten_employees(employees, first_id=1):
+    """Assign IDs to a nested personnel list and flatten it.
+
+    Returns (employee_id, user_name, password, head_of) rows with every
+    head listed before the employees under it, so the rows can be
+    inserted in one statement without a RETURNING round trip per row.
     """
-
-    # Execute the SQL query with the warehouse data
-    cursor.execute(warehouse_sql_query, (warehouse_id, warehouse_name))
-
-# Commit the changes for stock data
-conn.commit()
-
-# Iterate over each JSON object and insert data into the item table for stock data
-for item_data in stock_data:
-    state = item_data['state']
-    category = item_data['category']
-    warehouse_id = item_data['warehouse']
-    date_of_stock = datetime.strptime(item_data['date_of_stock'], '%Y-%m-%d %H:%M:%S')
-
-    # Define the SQL query for item insertion
-    item_sql_query = """
-        INSERT INTO item (state, category, warehouse_id, date_of_stock)
-        VALUES (%s, %s, %s, %s);
+    rows = []
+    next_id = first_id
+    # Depth-first, in the order of the file, with the head ID of each node
+    pending = [(employee, None) for employee in reversed(employees)]
+    while pending:
+        employee, head_id = pending.pop()
+        employee_id = next_id
+        next_id += 1
+        rows.append((employee_id, employee["user_name"],
+                     employee["password"], head_id))
+        for child in reversed(employee.get("head_of", [])):
+            pending.append((child, employee_id))
+    return rows
+
+
+def import_stock(cursor, rows, batch_size=BATCH_SIZE, use_copy=True):
+    """Import item rows in batches, adding their warehouses first.
+
+    With `use_copy` every batch is streamed through COPY FROM STDIN,
+    otherwise it is sent as one multi-row INSERT. Either way a batch
+    costs at most two round trips.
     """
-
-    # Execute the SQL query with the item data
-    cursor.execute(item_sql_query, (state, category, warehouse_id, date_of_stock))
-
-# Commit the changes for item data
-conn.commit()
-
-# Set to store unique employee user names and passwords
-unique_employees = set()
-
-# Function to recursively insert employees and their hierarchy
-def insert_employee(employee_data, head_of_id=None):
-    user_name = employee_data['user_name']
-    password = employee_data['password']
-
-    # Define the SQL query for employee insertion
-    sql_query = """
-        INSERT INTO Employee (user_name, password, head_of)
-        VALUES (%s, %s, %s)
-        RETURNING employee_id;
-    """
-
-    # Execute the SQL query with the employee data
-    cursor.execute(sql_query, (user_name, password, head_of_id))
-    
-    # Fetch the generated employee ID
-    employee_id = cursor.fetchone()[0]
-
-    # Recursively insert employees in the "head_of" hierarchy
-    head_of_list = employee_data.get('head_of', [])
-    for head_of_data in head_of_list:
-        insert_employee(head_of_data, head_of_id=employee_id)
-
-# Iterate over each JSON object and insert data into the Employee table
-for employee_data_entry in employee_data:
-    insert_employee(employee_data_entry)
-
-# Commit the changes for employee data
-conn.commit()
-
-# Close the cursor and connection
-cursor.close()
-conn.close()
+    known_warehouses = set()
+    imported = 0
+    for batch in _batches(rows, batch_size):
+        new_warehouses = sorted({row[2] for row in batch} - known_warehouses)
+        if new_warehouses:
+            _insert_many(
+                cursor, "INSERT INTO warehouse (warehouse_id, name)",
+                [(warehouse_id, str(warehouse_id))
+                 for warehouse_id in new_warehouses],
+                "ON CONFLICT (warehouse_id) DO NOTHING")
+            known_warehouses.update(new_warehouses)
+
+        if use_copy:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(batch)
+            buffer.seek(0)
+            cursor.copy_expert(
+                "COPY item (state, category, warehouse_id, date_of_stock) "
+                "FROM STDIN WITH (FORMAT csv)", buffer)
+        else:
+            _insert_many(
+                cursor,
+                "INSERT INTO item (state, category, warehouse_id, "
+                "date_of_stock)", batch)
+        imported += len(batch)
+    return imported
+
+
+def import_personnel(cursor, employees, batch_size=BATCH_SIZE):
+    """Import a nested personnel list with pre-assigned employee IDs."""
+    cursor.execute("SELECT COALESCE(MAX(employee_id), 0) FROM employee")
+    first_id = cursor.fetchone()[0] + 1
+    rows = flatten_employees(employees, first_id)
+    for batch in _batches(rows, batch_size):
+        _insert_many(
+            cursor,
+            "INSERT INTO employee (employee_id, user_name, password, "
+            "head_of)", batch)
+    return rows
+
+
+def _reset_employee_sequence(cursor):
+    """Move the employee_id sequence past the pre-assigned IDs."""
+    cursor.execute(
+        "SELECT setval(pg_get_serial_sequence('employee', 'employee_id'), "
+        "(SELECT COALESCE(MAX(employee_id), 1) FROM employee))")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Import stock.json and personnel.json in bulk.")
+    parser.add_argument("--mode", choices=["copy", "batch"], default="copy",
+                        help="COPY FROM STDIN or batched multi-row INSERTs")
+    parser.add_argument("--chunk-size", type=int, default=BATCH_SIZE,
+                        help="rows per COPY or INSERT batch")
+    parser.add_argument("--stock", default=STOCK_PATH)
+    parser.add_argument("--personnel", default=EMPLOYEES_PATH)
+    args = parser.parse_args(argv)
+
+    with open(args.personnel) as json_file:
+        employee_data = json.load(json_file)
+
+    # One transaction: the import is all or nothing
+    with get_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            items = import_stock(cursor, iter_stock_rows(args.stock),
+                                 args.chunk_size, args.mode == "copy")
+            employees = import_personnel(cursor, employee_data,
+                                         args.chunk_size)
+            _reset_employee_sequence(cursor)
+
+    print(f"Imported {items} items and {len(employees)} employees.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,44 @@
 #loader.py
+import itertools
 import json
 import os
-import psycopg2
-from classes import Item, Employee
+
+from pool import DATABASE_CONFIG, get_pool  # noqa: F401
+from timing import timed
 
 BASE_DIR = os.path.dirname(os.path.realpath(__file__))
 EMPLOYEES_PATH = os.path.join(BASE_DIR, "data", "personnel.json")
 STOCK_PATH = os.path.join(BASE_DIR, "data", "stock.json")
 
-employees = []
-items = []
+ITERSIZE = 2000
+_cursor_names = itertools.count(1)
+
 
-DATABASE_CONFIG = {
-    "dbname": "wh-project",
-    "user": "postgres",
-    "password": "admin",
-    "host": "localhost",
-    "port": "5432",
-}
+def _fetch_all(query, params=(), name="query"):
+    """Run a query on a pooled connection and return all of its rows."""
+    with timed(f"db.{name}"):
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchall()
 
-# Load items from the database
-with psycopg2.connect(**DATABASE_CONFIG) as conn:
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT * FROM item")
-        items_data = cursor.fetchall()
 
-items = [Item(*item) for item in items_data]
+def _stream(query, params=(), itersize=ITERSIZE, name="stream"):
+    """Yield the rows of a query through a named server-side cursor.
 
-with psycopg2.connect(**DATABASE_CONFIG) as conn:
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT employee_id, user_name, password, head_of FROM employee")
-        employees_data = cursor.fetchall()
+    The rows are fetched `itersize` at a time, so only one batch is held
+    in client memory however large the result is. Only the execute is
+    timed as `db.<name>`; fetching counts towards the loader phase.
+    """
+    with get_pool().connection() as conn:
+        # Named cursors live on the server until the transaction ends
+        cursor_name = f"loader_stream_{next(_cursor_names)}"
+        with conn.cursor(name=cursor_name) as cursor:
+            cursor.itersize = itersize
+            with timed(f"db.{name}"):
+                cursor.execute(query, params)
+            yield from cursor
 
-employees = [Employee(*employee) for employee in employees_data]
 
 def _import(name):
     """Dynamically import a package."""
@@ -58,22 +64,41 @@ class Loader:
     """Main data loader class."""
 
     model = None
-    objects = None
+    _objects = None
 
     def __init__(self, *args, **kwargs):
-        """Construct object."""
+        """Construct object.
+
+        Nothing is queried until the objects are first needed.
+        """
         if "model" not in kwargs:
             raise Exception("The loader requires a `model` "
                             "keyword argument to work.")
         self.model = kwargs["model"]
-        self.parse()
+
+    @property
+    def objects(self):
+        """Return the objects, loading them on first access."""
+        if self._objects is None:
+            self.parse()
+        return self._objects
+
+    @objects.setter
+    def objects(self, value):
+        self._objects = value
+
+    def preload(self):
+        """Load the objects now instead of on first access."""
+        self.objects
+        return self
 
     def parse(self):
         """Instantiate objects from the data."""
-        if self.model == "personnel":
-            self.objects = self.__parse_personnel()
-        if self.model == "stock":
-            self.objects = self.__parse_stock()
+        with timed(f"loader.{self.model}"):
+            if self.model == "personnel":
+                self.objects = self.__parse_personnel()
+            if self.model == "stock":
+                self.objects = self.__parse_stock()
 
     def __load_class(self, name):
         """Return a class."""
@@ -83,36 +108,73 @@ class Loader:
         return getattr(classes, name)
 
     def __parse_personnel(self):
-        """Parse the personnel list."""
+        """Parse the personnel list.
+
+        The hierarchy comes from one recursive query that lists every head
+        before the employees under it, so each row becomes exactly one
+        Employee, appended to the `head_of` list of its already built head.
+        """
         Employee = self.__load_class("Employee")  # noqa: N806
 
-        employees = []
-        for employee_data in employees_data:
-            employee_id, user_name, password, head_of_data = employee_data
-            head_of = [Employee(user_name=user_name, password=password, employee_id=head_id) for head_id in [head_of_data]] if head_of_data else []
-            
-            employee = Employee(employee_id=employee_id, user_name=user_name, password=password, head_of=head_of)
-            employees.append(employee)
+        employees_data = _stream("""
+            WITH RECURSIVE hierarchy AS (
+                SELECT employee_id, user_name, password, head_of, 0 AS depth
+                FROM employee
+                WHERE head_of IS NULL
+              UNION ALL
+                SELECT e.employee_id, e.user_name, e.password, e.head_of,
+                       h.depth + 1
+                FROM employee e
+                JOIN hierarchy h ON e.head_of = h.employee_id
+            )
+            SELECT employee_id, user_name, password, head_of
+            FROM hierarchy
+            ORDER BY depth, employee_id
+        """, name="personnel_hierarchy")
+
+        employees = {}
+        for employee_id, user_name, password, head_id in employees_data:
+            employee = Employee(employee_id=employee_id, user_name=user_name, password=password)
+            if head_id is not None:
+                employees[head_id].head_of.append(employee)
+            employees[employee_id] = employee
+
+        return list(employees.values())
 
-        return employees
-    
     def __parse_stock(self):
         """Parse the stock."""
+        return list(self.stream_stock())
+
+    def stream_stock(self, itersize=ITERSIZE):
+        """Yield the warehouses one by one as their items arrive.
+
+        The items are read in warehouse order through a server-side
+        cursor, so each warehouse is yielded as soon as its last item has
+        been read, and memory is bounded by the largest warehouse.
+        """
         Item = self.__load_class("Item")  # noqa: N806
         Warehouse = self.__load_class("Warehouse")  # noqa: N806
 
-        warehouses = {}
+        items_data = _stream(
+            "SELECT item_id, state, category, warehouse_id, date_of_stock "
+            "FROM item ORDER BY warehouse_id, item_id", itersize=itersize,
+            name="stock_items")
+
+        current = None
         for item_data in items_data:
             item_id, state, category, warehouse, date_of_stock = item_data
             warehouse_id_str = str(warehouse) if warehouse else "unknown"
-            
-            if warehouse_id_str not in warehouses.keys():
-                warehouses[warehouse_id_str] = Warehouse(warehouse_id_str)
-            
+
+            if current is None or current.id != warehouse_id_str:
+                if current is not None:
+                    yield current
+                current = Warehouse(warehouse_id_str)
+
             item = Item(item_id=item_id, state=state, category=category, warehouse=warehouse, date_of_stock=date_of_stock)
-            warehouses[warehouse_id_str].add_item(item)
+            current.add_item(item)
 
-        return list(warehouses.values())
+        if current is not None:
+            yield current
 
     def __iter__(self, *args, **kwargs):
         """Iterate through the objects."""
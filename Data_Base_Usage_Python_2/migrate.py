@@ -0,0 +1,165 @@
+#migrate.py
+import argparse
+import os
+import re
+
+from pool import get_pool
+
+BASE_DIR = os.path.dirname(os.path.realpath(__file__))
+MIGRATIONS_DIR = os.path.join(BASE_DIR, "migrations")
+
+FILE_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
+# "-- expect <index>: <query>" lines name an index the query must use
+CHECK_PATTERN = re.compile(r"^--\s*expect\s+(\w+):\s*(.+)$", re.MULTILINE)
+# "-- expect constraint <name>" lines name a constraint that must exist
+CONSTRAINT_PATTERN = re.compile(r"^--\s*expect\s+constraint\s+(\w+)\s*$",
+                                re.MULTILINE)
+
+
+class Migration:
+    """One versioned SQL file of the migrations directory."""
+
+    def __init__(self, version, name, path):
+        """Construct object."""
+        self.version = version
+        self.name = name
+        self.path = path
+
+    @property
+    def sql(self):
+        """Return the SQL of the migration."""
+        with open(self.path) as file:
+            return file.read()
+
+    @property
+    def checks(self):
+        """Return the (index name, query) pairs the migration expects."""
+        return CHECK_PATTERN.findall(self.sql)
+
+    @property
+    def constraints(self):
+        """Return the names of the constraints the migration expects."""
+        return CONSTRAINT_PATTERN.findall(self.sql)
+
+    def __str__(self):
+        return f"{self.version:04d}_{self.name}"
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Return the migrations of a directory, ordered by version."""
+    migrations = []
+    for file_name in os.listdir(directory):
+        match = FILE_PATTERN.match(file_name)
+        if match:
+            migrations.append(Migration(
+                int(match.group(1)), match.group(2),
+                os.path.join(directory, file_name)))
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def _applied_versions(cursor):
+    """Return the versions already applied, creating the ledger table."""
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version INT PRIMARY KEY,"
+        " name VARCHAR(255) NOT NULL,"
+        " applied_at TIMESTAMP NOT NULL DEFAULT now())")
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate(target=None, directory=MIGRATIONS_DIR, pool=None):
+    """Apply the pending migrations up to `target`, each in a transaction."""
+    pool = get_pool() if pool is None else pool
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            applied = _applied_versions(cursor)
+
+    done = []
+    for migration in load_migrations(directory):
+        if migration.version in applied:
+            continue
+        if target is not None and migration.version > target:
+            break
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(migration.sql)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name) "
+                    "VALUES (%s, %s)", (migration.version, migration.name))
+        print(f"Applied {migration}")
+        done.append(migration)
+    return done
+
+
+def status(directory=MIGRATIONS_DIR, pool=None):
+    """Return (migration, applied) pairs for every migration."""
+    pool = get_pool() if pool is None else pool
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            applied = _applied_versions(cursor)
+    return [(migration, migration.version in applied)
+            for migration in load_migrations(directory)]
+
+
+def check(directory=MIGRATIONS_DIR, pool=None):
+    """Run the EXPLAIN and constraint checks of the applied migrations.
+
+    Sequential scans are disabled while planning, so a check passes when
+    the planner can use the index at all, even on a table small enough
+    for a scan to be cheaper. A constraint check passes when pg_constraint
+    holds the named constraint. Returns (migration, name, ok) triples.
+    """
+    pool = get_pool() if pool is None else pool
+    results = []
+    for migration, applied in status(directory, pool):
+        if not applied:
+            continue
+        for index_name, query in migration.checks:
+            with pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+                    cursor.execute(f"EXPLAIN {query}")
+                    plan = "\n".join(row[0] for row in cursor.fetchall())
+                conn.rollback()
+            results.append((migration, index_name, index_name in plan))
+        for constraint_name in migration.constraints:
+            with pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT 1 FROM pg_constraint WHERE conname = %s",
+                        (constraint_name,))
+                    found = cursor.fetchone() is not None
+            results.append((migration, constraint_name, found))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Apply and verify the database migrations.")
+    parser.add_argument("command", nargs="?", default="up",
+                        choices=["up", "status", "check"])
+    parser.add_argument("--target", type=int,
+                        help="highest version to apply")
+    args = parser.parse_args(argv)
+
+    if args.command == "up":
+        if not migrate(args.target):
+            print("The database is up to date.")
+    elif args.command == "status":
+        for migration, applied in status():
+            print(f"[{'x' if applied else ' '}] {migration}")
+    else:
+        failures = 0
+        for migration, name, ok in check():
+            print(f"{'OK  ' if ok else 'FAIL'} {migration}: {name}")
+            failures += not ok
+        return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
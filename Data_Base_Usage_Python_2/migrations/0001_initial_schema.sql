@@ -0,0 +1,19 @@
+-- The tables of db_structure.sql
+CREATE TABLE IF NOT EXISTS Employee (
+    employee_id SERIAL PRIMARY KEY,
+    user_name VARCHAR(255) NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    head_of INT REFERENCES Employee(employee_id)
+);
+
+CREATE TABLE IF NOT EXISTS Warehouse (
+    warehouse_id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Item (
+    item_id SERIAL PRIMARY KEY,
+    state VARCHAR(255) NOT NULL,
+    category VARCHAR(255) NOT NULL,
+    warehouse_id INT NOT NULL,
+    date_of_stock DATE NOT NULL);
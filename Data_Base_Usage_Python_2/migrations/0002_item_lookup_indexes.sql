@@ -0,0 +1,18 @@
+-- Indexes for the lookups of test_queries.sql and the loader.
+-- Case-insensitive matches use lower(column) = lower(%s), which these
+-- expression indexes serve; ILIKE without wildcards cannot use them.
+
+-- expect item_warehouse_id_idx: SELECT COUNT(*) FROM item WHERE warehouse_id = 1
+CREATE INDEX IF NOT EXISTS item_warehouse_id_idx ON Item (warehouse_id);
+
+-- expect item_lower_category_idx: SELECT COUNT(*) FROM item WHERE lower(category) = 'smartphone'
+CREATE INDEX IF NOT EXISTS item_lower_category_idx ON Item (lower(category));
+
+-- expect item_lower_state_idx: SELECT COUNT(*) FROM item WHERE lower(state) = 'blue'
+CREATE INDEX IF NOT EXISTS item_lower_state_idx ON Item (lower(state));
+
+-- expect item_warehouse_category_idx: SELECT COUNT(*) FROM item WHERE warehouse_id = 1 AND lower(category) = 'smartphone'
+CREATE INDEX IF NOT EXISTS item_warehouse_category_idx
+    ON Item (warehouse_id, lower(category));
+
+ANALYZE Item;
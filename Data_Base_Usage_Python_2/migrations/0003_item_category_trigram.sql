@@ -0,0 +1,9 @@
+-- Trigram index for substring search: category ILIKE '%term%'
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- expect item_category_trgm_idx: SELECT item_id FROM item WHERE category ILIKE '%phone%'
+CREATE INDEX IF NOT EXISTS item_category_trgm_idx
+    ON Item USING gin (category gin_trgm_ops);
+
+ANALYZE Item;
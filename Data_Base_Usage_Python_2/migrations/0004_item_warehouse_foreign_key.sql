@@ -0,0 +1,16 @@
+-- Make item.warehouse_id a real foreign key to warehouse
+
+INSERT INTO Warehouse (warehouse_id, name)
+SELECT DISTINCT warehouse_id, warehouse_id::text
+FROM Item
+WHERE warehouse_id NOT IN (SELECT warehouse_id FROM Warehouse);
+
+-- An empty table leaves the sequence uncalled, so the next id is still 1
+SELECT setval(pg_get_serial_sequence('warehouse', 'warehouse_id'),
+              COALESCE(MAX(warehouse_id), 1), MAX(warehouse_id) IS NOT NULL)
+FROM Warehouse;
+
+-- expect constraint item_warehouse_id_fkey
+ALTER TABLE Item
+    ADD CONSTRAINT item_warehouse_id_fkey
+    FOREIGN KEY (warehouse_id) REFERENCES Warehouse (warehouse_id);
@@ -0,0 +1,100 @@
+-- Item counts per (warehouse_id, lower(category), lower(state)), kept
+-- current by statement-level triggers on item. Each INSERT, UPDATE or
+-- DELETE statement folds its changed rows into the rollup with one
+-- grouped upsert, so bulk COPY imports stay fast.
+
+CREATE TABLE IF NOT EXISTS item_rollup (
+    warehouse_id INT NOT NULL,
+    category VARCHAR(255) NOT NULL,
+    state VARCHAR(255) NOT NULL,
+    item_count BIGINT NOT NULL,
+    first_item_id INT NOT NULL,
+    PRIMARY KEY (warehouse_id, category, state)
+);
+
+CREATE OR REPLACE FUNCTION item_rollup_insert() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO item_rollup AS r
+        (warehouse_id, category, state, item_count, first_item_id)
+    SELECT warehouse_id, lower(category), lower(state), COUNT(*), MIN(item_id)
+    FROM new_rows
+    GROUP BY 1, 2, 3
+    ON CONFLICT (warehouse_id, category, state) DO UPDATE
+    SET item_count = r.item_count + EXCLUDED.item_count,
+        first_item_id = LEAST(r.first_item_id, EXCLUDED.first_item_id);
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION item_rollup_delete() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE item_rollup AS r
+    SET item_count = r.item_count - o.removed
+    FROM (SELECT warehouse_id, lower(category) AS category,
+                 lower(state) AS state, COUNT(*) AS removed
+          FROM old_rows
+          GROUP BY 1, 2, 3) AS o
+    WHERE r.warehouse_id = o.warehouse_id
+      AND r.category = o.category
+      AND r.state = o.state;
+    DELETE FROM item_rollup WHERE item_count <= 0;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION item_rollup_update() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE item_rollup AS r
+    SET item_count = r.item_count - o.removed
+    FROM (SELECT warehouse_id, lower(category) AS category,
+                 lower(state) AS state, COUNT(*) AS removed
+          FROM old_rows
+          GROUP BY 1, 2, 3) AS o
+    WHERE r.warehouse_id = o.warehouse_id
+      AND r.category = o.category
+      AND r.state = o.state;
+
+    INSERT INTO item_rollup AS r
+        (warehouse_id, category, state, item_count, first_item_id)
+    SELECT warehouse_id, lower(category), lower(state), COUNT(*), MIN(item_id)
+    FROM new_rows
+    GROUP BY 1, 2, 3
+    ON CONFLICT (warehouse_id, category, state) DO UPDATE
+    SET item_count = r.item_count + EXCLUDED.item_count,
+        first_item_id = LEAST(r.first_item_id, EXCLUDED.first_item_id);
+
+    DELETE FROM item_rollup WHERE item_count <= 0;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS item_rollup_after_insert ON Item;
+CREATE TRIGGER item_rollup_after_insert
+    AFTER INSERT ON Item
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION item_rollup_insert();
+
+DROP TRIGGER IF EXISTS item_rollup_after_delete ON Item;
+CREATE TRIGGER item_rollup_after_delete
+    AFTER DELETE ON Item
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION item_rollup_delete();
+
+DROP TRIGGER IF EXISTS item_rollup_after_update ON Item;
+CREATE TRIGGER item_rollup_after_update
+    AFTER UPDATE ON Item
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION item_rollup_update();
+
+-- Backfill from the rows already in item
+LOCK TABLE Item IN SHARE MODE;
+TRUNCATE item_rollup;
+INSERT INTO item_rollup
+    (warehouse_id, category, state, item_count, first_item_id)
+SELECT warehouse_id, lower(category), lower(state), COUNT(*), MIN(item_id)
+FROM Item
+GROUP BY 1, 2, 3;
+
+ANALYZE item_rollup;
+
+-- expect item_rollup_pkey: SELECT SUM(item_count) FROM item_rollup WHERE warehouse_id = 1 AND category = 'smartphone'
@@ -0,0 +1,276 @@
+#pool.py
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DATABASE_CONFIG = {
+    "dbname": "wh-project",
+    "user": "postgres",
+    "password": "admin",
+    "host": "localhost",
+    "port": "5432",
+}
+
+
+class PoolError(Exception):
+    """Raised when no connection can be checked out of the pool."""
+
+    def __init__(self, message):
+        """Construct object."""
+        self.message = message
+        super().__init__(message)
+
+
+def postgres_connect(config=None):
+    """Return a connection factory for the PostgreSQL database."""
+    config = DATABASE_CONFIG if config is None else config
+
+    def connect():
+        import psycopg2
+        return psycopg2.connect(**config)
+
+    return connect
+
+
+def _to_sqlite(query):
+    """Translate %s placeholders and ILIKE, which SQLite spells LIKE."""
+    return re.sub(r"\bILIKE\b", "LIKE", query).replace("%s", "?")
+
+
+class _SQLiteCursor:
+    """Cursor of a SQLite connection that speaks the psycopg2 dialect."""
+
+    def __init__(self, cursor):
+        """Construct object."""
+        self._cursor = cursor
+        self.itersize = 2000
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+
+    def __iter__(self):
+        """Iterate through the rows in batches of `itersize`."""
+        while True:
+            rows = self._cursor.fetchmany(self.itersize)
+            if not rows:
+                return
+            yield from rows
+
+    def execute(self, query, params=()):
+        """Run a query written with %s placeholders."""
+        self._cursor.execute(_to_sqlite(query), params)
+        return self
+
+    def executemany(self, query, params_seq):
+        """Run a query once for each set of parameters."""
+        self._cursor.executemany(_to_sqlite(query), params_seq)
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class SQLiteConnection:
+    """SQLite stand-in for a psycopg2 connection, for offline use."""
+
+    def __init__(self, path=":memory:"):
+        """Construct object."""
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, uri=path.startswith("file:"))
+        self.closed = 0
+
+    def cursor(self, name=None):
+        """Return a cursor; named (server-side) cursors are plain here."""
+        return _SQLiteCursor(self._connection.cursor())
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        self._connection.close()
+        self.closed = 1
+
+
+def sqlite_connect(path=":memory:"):
+    """Return a connection factory for a SQLite stand-in database.
+
+    Every ":memory:" connection is a separate database; pass a file path
+    or a "file:name?mode=memory&cache=shared" URI to share one.
+    """
+    def connect():
+        return SQLiteConnection(path)
+
+    return connect
+
+
+class ConnectionPool:
+    """Pool of database connections shared by the loader and queries.
+
+    At least `minconn` connections are kept open and at most `maxconn` are
+    handed out at once. A connection taken from the idle list is checked
+    with `health_check` first and replaced when it fails. A thread that
+    checks out a connection while already holding one gets the same one
+    back, so nested helpers share a transaction. Connections are opened,
+    checked and closed outside the pool lock, so a slow database never
+    stalls the threads returning theirs.
+    """
+
+    def __init__(self, connect=None, minconn=1, maxconn=5,
+                 health_check="SELECT 1", timeout=30.0):
+        """Construct object and open `minconn` connections."""
+        if not 0 <= minconn <= maxconn or maxconn < 1:
+            raise ValueError("The pool requires 0 <= minconn <= maxconn "
+                             "and maxconn >= 1.")
+        self.connect = postgres_connect() if connect is None else connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.health_check = health_check
+        self.timeout = timeout
+        self._idle = []
+        self._size = 0
+        self._local = threading.local()
+        self._condition = threading.Condition()
+        for _ in range(minconn):
+            self._size += 1
+            self._idle.append(self._open())
+
+    def _open(self):
+        """Open a new connection in a slot already counted in the size."""
+        try:
+            return self.connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def _discard(self, conn):
+        """Close a connection and free its slot."""
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn):
+        """Return whether a connection still answers queries."""
+        if getattr(conn, "closed", 0):
+            return False
+        if not self.health_check:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(self.health_check)
+                cursor.fetchall()
+            conn.rollback()
+        except Exception:
+            return False
+        return True
+
+    def getconn(self):
+        """Check out a connection for the calling thread."""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            return held
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn = self._reserve(deadline)
+            if conn is None:
+                conn = self._open()
+                break
+            if self._is_healthy(conn):
+                break
+            self._discard(conn)
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def _reserve(self, deadline):
+        """Take an idle connection, or count a slot for a new one (None)."""
+        with self._condition:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.maxconn:
+                    self._size += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolError(
+                        f"No connection available after {self.timeout}s.")
+                self._condition.wait(remaining)
+
+    def putconn(self, conn, close=False):
+        """Return a connection checked out by the calling thread."""
+        if getattr(self._local, "conn", None) is not conn:
+            raise PoolError("The connection was not checked out "
+                            "by this thread.")
+        self._local.depth -= 1
+        if self._local.depth:
+            return
+        self._local.conn = None
+        if close or getattr(conn, "closed", 0):
+            self._discard(conn)
+            return
+        with self._condition:
+            self._idle.append(conn)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection, committing or rolling back on return."""
+        conn = self.getconn()
+        outermost = self._local.depth == 1
+        try:
+            yield conn
+            if outermost:
+                conn.commit()
+        except Exception:
+            if outermost:
+                conn.rollback()
+            raise
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        """Close every idle connection."""
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the pool shared by the loader and queries."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def set_pool(pool):
+    """Replace the shared pool, e.g. with a SQLite stand-in."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool is not pool:
+            _pool.closeall()
+        _pool = pool
@@ -1,12 +1,23 @@
 #query.py
 from classes import SessionReport, User,Warehouse,Employee 
 from loader import Loader
+from repository import StockRepository
+import timing
 import os
 import json
 from datetime import datetime
 
+# WAREHOUSE_TIMING=stderr or =<file> records how long each operation
+# takes and dumps p50/p95/p99 on exit and on SIGUSR1
+if os.environ.get("WAREHOUSE_TIMING"):
+    timing.enable(os.environ["WAREHOUSE_TIMING"])
+
 personnel_data = Loader(model="personnel")
-stock = Loader(model="stock")
+# WAREHOUSE_BACKEND=database runs search, browse and counts as SQL queries
+if os.environ.get("WAREHOUSE_BACKEND") == "database":
+    stock = StockRepository()
+else:
+    stock = Loader(model="stock")
 
 def guest_login():
     guest_name = input("Enter your name: ")
@@ -0,0 +1,102 @@
+#repository.py
+from collections import Counter
+from typing import List, Tuple
+
+from classes import Item
+from pool import get_pool
+from timing import timed
+
+ITEM_COLUMNS = "item_id, state, category, warehouse_id, date_of_stock"
+
+
+def _like_pattern(search_term):
+    """Return a LIKE pattern matching the term anywhere, literally."""
+    escaped = (search_term.replace("\\", "\\\\")
+               .replace("%", "\\%").replace("_", "\\_"))
+    return f"%{escaped}%"
+
+
+class StockRepository:
+    """Stock queries answered by the database instead of loaded lists.
+
+    It offers the same operations as `classes.MemoryStock`, so the user
+    menus work on either. Every call reads the current table, and the
+    filtering and counting run where the indexes of the migrations are.
+    With `rollups` the counts are summed from the trigger-maintained
+    item_rollup table (migration 0005), costing O(groups) instead of a
+    scan of item.
+    """
+
+    def __init__(self, pool=None, rollups=True):
+        """Construct object."""
+        self.pool = pool
+        self.rollups = rollups
+
+    def _fetch_all(self, name, query, params=()):
+        """Run a query on a pooled connection and return its rows.
+
+        The query is timed as `db.<name>` when timing is enabled.
+        """
+        pool = get_pool() if self.pool is None else self.pool
+        with timed(f"db.{name}"):
+            with pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(query, params)
+                    return cursor.fetchall()
+
+    def _items(self, name, where, params):
+        """Return the items matching a WHERE clause, in stock order."""
+        rows = self._fetch_all(
+            name, f"SELECT {ITEM_COLUMNS} FROM item WHERE {where} "
+            "ORDER BY warehouse_id, item_id", params)
+        return [Item(item_id=item_id, state=state, category=category,
+                     warehouse=warehouse, date_of_stock=date_of_stock)
+                for item_id, state, category, warehouse, date_of_stock
+                in rows]
+
+    def warehouse_counts(self) -> List[Tuple[str, int]]:
+        """Return (warehouse id, item count) pairs, by warehouse."""
+        if self.rollups:
+            query = ("SELECT warehouse_id, SUM(item_count) FROM item_rollup "
+                     "GROUP BY warehouse_id ORDER BY warehouse_id")
+        else:
+            query = ("SELECT warehouse_id, COUNT(*) FROM item "
+                     "GROUP BY warehouse_id ORDER BY warehouse_id")
+        return [(str(warehouse_id), int(count))
+                for warehouse_id, count
+                in self._fetch_all("warehouse_counts", query)]
+
+    def category_counts(self) -> Counter:
+        """Count the items of each lowercased category."""
+        if self.rollups:
+            query = ("SELECT category, SUM(item_count) FROM item_rollup "
+                     "GROUP BY category ORDER BY MIN(first_item_id)")
+        else:
+            query = ("SELECT lower(category), COUNT(*) FROM item "
+                     "GROUP BY lower(category) ORDER BY MIN(item_id)")
+        return Counter({category: int(count)
+                        for category, count
+                        in self._fetch_all("category_counts", query)})
+
+    def refresh_rollups(self):
+        """Rebuild item_rollup from item, e.g. after triggers were off."""
+        pool = get_pool() if self.pool is None else self.pool
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("LOCK TABLE item IN SHARE MODE")
+                cursor.execute("TRUNCATE item_rollup")
+                cursor.execute(
+                    "INSERT INTO item_rollup (warehouse_id, category, state, "
+                    "item_count, first_item_id) "
+                    "SELECT warehouse_id, lower(category), lower(state), "
+                    "COUNT(*), MIN(item_id) FROM item GROUP BY 1, 2, 3")
+
+    def items_in_category(self, category: str) -> List[Item]:
+        """Return the items of one category, ignoring case."""
+        return self._items("items_in_category",
+                           "lower(category) = lower(%s)", (category,))
+
+    def search(self, search_term: str) -> List[Item]:
+        """Return the items whose category contains the term."""
+        return self._items("search", "category ILIKE %s ESCAPE '\\'",
+                           (_like_pattern(search_term),))
@@ -0,0 +1,69 @@
+"""
+Unit tests for the 'insert_data_from_json' module.
+
+The tests check that a JSON array read in small chunks yields the same
+elements as reading it whole, whatever chunk boundary a value spans,
+and that the stock rows are read from the records in column order.
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from insert_data_from_json import _iter_json_array, iter_stock_rows
+
+ELEMENTS = [1.5, -20, 3e10, True, None, "a, b]", {"x": [1, 2]}, [], 12345]
+
+
+class TestIterJsonArray(unittest.TestCase):
+    """Tests for the _iter_json_array function."""
+
+    def setUp(self):
+        """Create a temporary directory for the JSON files."""
+        self.temporary = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temporary.name, "data.json")
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.temporary.cleanup()
+
+    def read(self, text, chunk_size):
+        """Write text to the file and return the elements read back."""
+        with open(self.path, "w") as file:
+            file.write(text)
+        return list(_iter_json_array(self.path, chunk_size))
+
+    def test_every_chunk_size(self):
+        """Test that no chunk boundary splits or drops a value."""
+        for text in (json.dumps(ELEMENTS), json.dumps(ELEMENTS, indent=1)):
+            for chunk_size in range(1, len(text) + 1):
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    self.assertEqual(self.read(text, chunk_size), ELEMENTS)
+
+    def test_number_across_chunks(self):
+        """Test that a number cut by a chunk is read as one number."""
+        self.assertEqual(self.read("[1.5]", 3), [1.5])
+        self.assertEqual(self.read("[10, 200 ]", 2), [10, 200])
+
+    def test_truncated_array(self):
+        """Test that an array cut short raises ValueError."""
+        with self.assertRaises(ValueError):
+            self.read("[1.5, 2", 3)
+
+    def test_stock_rows(self):
+        """Test that every stock record becomes one row."""
+        records = [{"state": "Original", "category": "GPS", "warehouse": 1,
+                    "date_of_stock": "2021-05-26 17:20:10"},
+                   {"state": "Red", "category": "Mouse", "warehouse": 20,
+                    "date_of_stock": "2020-01-02 03:04:05"}]
+        with open(self.path, "w") as file:
+            json.dump(records, file)
+
+        self.assertEqual(list(iter_stock_rows(self.path)), [
+            ("Original", "GPS", 1, "2021-05-26 17:20:10"),
+            ("Red", "Mouse", 20, "2020-01-02 03:04:05"),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+"""
+Unit tests for the 'migrate' module.
+
+The tests check that the migrations are loaded in version order and that
+their index and constraint checks are read from the SQL comments.
+"""
+import unittest
+
+from migrate import load_migrations
+
+
+class TestMigrations(unittest.TestCase):
+    """Tests for loading the migrations and their checks."""
+
+    def test_versions_are_ordered(self):
+        """Test that the migrations are sorted by version."""
+        versions = [migration.version for migration in load_migrations()]
+        self.assertEqual(versions, sorted(versions))
+
+    def test_checks(self):
+        """Test that each kind of expect comment is read on its own."""
+        migrations = {str(migration): migration
+                      for migration in load_migrations()}
+        foreign_key = migrations["0004_item_warehouse_foreign_key"]
+        self.assertEqual(foreign_key.checks, [])
+        self.assertEqual(foreign_key.constraints, ["item_warehouse_id_fkey"])
+
+        indexes = migrations["0002_item_lookup_indexes"]
+        self.assertIn("item_warehouse_id_idx",
+                      [index_name for index_name, _ in indexes.checks])
+        self.assertEqual(indexes.constraints, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Unit tests for the 'pool' module.
+
+The tests run the ConnectionPool against the SQLite stand-in and check
+that connections are checked out, shared and returned, that a full pool
+times out, that broken idle connections are replaced, that a slow
+connect does not block other threads, and that set_pool swaps the
+shared pool.
+"""
+import threading
+import time
+import unittest
+
+import pool
+from pool import ConnectionPool, PoolError, sqlite_connect
+
+
+def in_thread(target):
+    """Run a function in another thread and return its result or error."""
+    outcome = []
+
+    def run():
+        try:
+            outcome.append(target())
+        except Exception as error:
+            outcome.append(error)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join(timeout=5)
+    return outcome[0]
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Tests for the ConnectionPool class."""
+
+    def test_checkout_and_return(self):
+        """Test that a thread shares its connection until it returns it."""
+        connections = ConnectionPool(sqlite_connect(), minconn=1, maxconn=2)
+        conn = connections.getconn()
+        self.assertIs(connections.getconn(), conn)
+        connections.putconn(conn)
+        self.assertIsNot(in_thread(connections.getconn), conn,
+                         "A held connection is not handed out again")
+
+        connections.putconn(conn)
+        with connections.connection() as shared:
+            self.assertIs(shared, conn)
+            with connections.connection() as nested:
+                self.assertIs(nested, conn)
+        self.assertEqual(connections._idle, [conn])
+        with self.assertRaises(PoolError):
+            connections.putconn(conn)
+
+    def test_timeout(self):
+        """Test that checking out of a full pool gives up after timeout."""
+        connections = ConnectionPool(sqlite_connect(), minconn=0,
+                                     maxconn=1, timeout=0.05)
+        conn = connections.getconn()
+        self.assertIsInstance(in_thread(connections.getconn), PoolError)
+
+        connections.putconn(conn)
+        self.assertIs(in_thread(connections.getconn), conn)
+
+    def test_broken_connections_are_replaced(self):
+        """Test that an idle connection failing its check is evicted."""
+        connections = ConnectionPool(sqlite_connect(), minconn=1, maxconn=1)
+        broken = connections._idle[0]
+        # Closed behind the pool's back, as a dropped server link would be
+        broken._connection.close()
+
+        conn = connections.getconn()
+        self.assertIsNot(conn, broken)
+        self.assertEqual(connections._size, 1)
+        connections.putconn(conn, close=True)
+        self.assertEqual(connections._size, 0)
+        self.assertEqual(conn.closed, 1)
+
+    def test_slow_connect_does_not_block_returns(self):
+        """Test that a connection can be returned while another opens."""
+        opening = threading.Event()
+        release = threading.Event()
+        connect = sqlite_connect()
+
+        def slow_connect():
+            opening.set()
+            release.wait(2)
+            return connect()
+
+        connections = ConnectionPool(connect, minconn=1, maxconn=2)
+        conn = connections.getconn()
+        connections.connect = slow_connect
+        thread = threading.Thread(target=connections.getconn)
+        thread.start()
+        self.assertTrue(opening.wait(5))
+
+        start = time.monotonic()
+        connections.putconn(conn)
+        self.assertLess(time.monotonic() - start, 1,
+                        "Returning waited for the connect")
+        release.set()
+        thread.join(timeout=5)
+        self.assertEqual(connections._idle, [conn])
+        self.assertEqual(connections._size, 2)
+
+    def test_set_pool(self):
+        """Test that set_pool replaces the shared pool and closes the old."""
+        self.addCleanup(setattr, pool, "_pool", pool._pool)
+        first = ConnectionPool(sqlite_connect(), minconn=1)
+        second = ConnectionPool(sqlite_connect(), minconn=1)
+        idle = first._idle[0]
+
+        pool.set_pool(first)
+        self.assertIs(pool.get_pool(), first)
+        pool.set_pool(second)
+        self.assertIs(pool.get_pool(), second)
+        self.assertEqual(idle.closed, 1)
+        self.assertEqual(first._size, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
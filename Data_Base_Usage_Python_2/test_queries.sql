@@ -2,10 +2,10 @@ SELECT * FROM item;
 
 
 -- How many smartphones are there in stock?
-SELECT COUNT(*) FROM item WHERE category ILIKE 'smartphone';
+SELECT COUNT(*) FROM item WHERE lower(category) = lower('smartphone');
 
 -- How many blue items are there in stock in warehouse 1?
-SELECT COUNT(*) FROM item WHERE state ILIKE 'blue' AND warehouse_id = 1;
+SELECT COUNT(*) FROM item WHERE lower(state) = lower('blue') AND warehouse_id = 1;
 
 -- How many items are in stock in warehouse 1?
 SELECT COUNT(*) FROM item WHERE warehouse_id = 1;
@@ -26,3 +26,28 @@ ORDER BY
     item_count DESC;
 
 SELECT * FROM item;
+
+
+-- The same reports read from the item_rollup table, in O(groups)
+
+-- How many smartphones are there in stock?
+SELECT COALESCE(SUM(item_count), 0) FROM item_rollup WHERE category = 'smartphone';
+
+-- How many blue items are there in stock in warehouse 1?
+SELECT COALESCE(SUM(item_count), 0) FROM item_rollup WHERE state = 'blue' AND warehouse_id = 1;
+
+-- How many items are in stock in warehouse 1?
+SELECT COALESCE(SUM(item_count), 0) FROM item_rollup WHERE warehouse_id = 1;
+
+-- All warehouses with their name and amount of items in stock
+SELECT
+    w.name AS warehouse_name,
+    SUM(r.item_count) AS item_count
+FROM
+    Warehouse w
+JOIN
+    item_rollup r ON w.warehouse_id = r.warehouse_id
+GROUP BY
+    w.warehouse_id
+ORDER BY
+    item_count DESC;
@@ -0,0 +1,128 @@
+"""
+Unit tests for the 'timing' module.
+
+The tests check that the histogram buckets cover every value without
+gaps and within 1/16 of it, that percentiles are read back within that
+error, that timed blocks and functions only record while enabled, and
+the table that dump writes.
+"""
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import timing
+from timing import (SUB_BITS, Histogram, Timings, _bucket, _bucket_bounds,
+                    dump, timed, timed_function)
+
+
+class TestBuckets(unittest.TestCase):
+    """Tests for the bucket computation of the histograms."""
+
+    def test_buckets_are_contiguous(self):
+        """Test that each bucket starts right after the previous one."""
+        for bucket in range(1, 40 << SUB_BITS):
+            with self.subTest(bucket=bucket):
+                self.assertEqual(_bucket_bounds(bucket)[0],
+                                 _bucket_bounds(bucket - 1)[1] + 1)
+
+    def test_values_fall_in_their_bounds(self):
+        """Test that a value lies in its bucket, which is narrow enough."""
+        values = list(range(200)) + [2 ** power + offset
+                                     for power in range(8, 40)
+                                     for offset in (-1, 0, 1, 12345)]
+        for value in values:
+            with self.subTest(value=value):
+                low, high = _bucket_bounds(_bucket(value))
+                self.assertLessEqual(low, value)
+                self.assertLessEqual(value, high)
+                self.assertLessEqual(high - low, low >> SUB_BITS)
+
+
+class TestHistogram(unittest.TestCase):
+    """Tests for the Histogram class."""
+
+    def test_percentiles(self):
+        """Test that percentiles are within a bucket of the true value."""
+        histogram = Histogram()
+        self.assertIsNone(histogram.percentile(0.5))
+        for value in range(1, 100001):
+            histogram.record(value * 1000)
+
+        for fraction in (0.5, 0.95, 0.99):
+            with self.subTest(fraction=fraction):
+                expected = fraction * 100000 * 1000
+                self.assertAlmostEqual(histogram.percentile(fraction),
+                                       expected, delta=expected / 16)
+        self.assertEqual(histogram.percentile(1), 100000 * 1000)
+        self.assertEqual(histogram.count, 100000)
+        self.assertEqual(histogram.min, 1000)
+
+    def test_single_value(self):
+        """Test that one value is reported exactly."""
+        histogram = Histogram()
+        histogram.record(123456789)
+        self.assertEqual(histogram.percentile(0.5), 123456789)
+        self.assertEqual(histogram.percentile(0.99), 123456789)
+
+
+class TestTimings(unittest.TestCase):
+    """Tests for timed blocks, timed functions and dump."""
+
+    def setUp(self):
+        """Replace the shared timings with fresh, enabled ones."""
+        self.timings = Timings()
+        patcher = patch.object(timing, "TIMINGS", self.timings)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_enabled_timings_record(self):
+        """Test that nothing is recorded until timing is enabled."""
+        @timed_function("call")
+        def call():
+            return 42
+
+        with timed("block"):
+            pass
+        self.assertEqual(call(), 42)
+        self.assertEqual(self.timings.histograms, {})
+
+        self.timings.enabled = True
+        with timed("block"):
+            pass
+        call()
+        call()
+        self.assertEqual(self.timings.histograms["block"].count, 1)
+        self.assertEqual(self.timings.histograms["call"].count, 2)
+
+    def test_dump(self):
+        """Test the table written to a file and to stderr."""
+        self.timings.record("db.items", 2000000)
+        self.timings.record("db.items", 4000000)
+        self.timings.record("menu.search_item", 1500000)
+        self.timings.histogram("unused")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "log", "timings.txt")
+            dump(path)
+            dump(path)
+            with open(path) as dump_file:
+                lines = dump_file.read().splitlines()
+        self.assertEqual(len(lines), 8, "Each dump appends its table")
+        self.assertTrue(lines[0].startswith("Timings at "))
+        self.assertEqual(lines[1].split(), [
+            "operation", "count", "p50", "p95", "p99", "max", "total"])
+        self.assertEqual(lines[2].split(), [
+            "db.items", "2", "2.000", "4.000", "4.000", "4.000", "6.000"])
+        self.assertEqual(lines[3].split(), [
+            "menu.search_item", "1", "1.500", "1.500", "1.500", "1.500",
+            "1.500"])
+
+        with patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            dump("stderr")
+        self.assertEqual(stderr.getvalue().splitlines()[1:], lines[1:4])
+
+
+if __name__ == "__main__":
+    unittest.main()
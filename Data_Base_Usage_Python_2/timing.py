@@ -0,0 +1,213 @@
+#timing.py
+import atexit
+import contextlib
+import functools
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+# 2**SUB_BITS buckets per power of two: values are kept within 1/16
+SUB_BITS = 4
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def _bucket(value):
+    """Return the bucket of a non-negative integer value."""
+    if value < 1 << SUB_BITS:
+        return value
+    shift = value.bit_length() - 1 - SUB_BITS
+    return ((shift + 1) << SUB_BITS) + (value >> shift) - (1 << SUB_BITS)
+
+
+def _bucket_bounds(bucket):
+    """Return the lowest and highest value of a bucket."""
+    if bucket < 1 << SUB_BITS:
+        return bucket, bucket
+    shift = (bucket >> SUB_BITS) - 1
+    mantissa = (bucket & ((1 << SUB_BITS) - 1)) + (1 << SUB_BITS)
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+
+class Histogram:
+    """Log-linear histogram of durations in nanoseconds.
+
+    Recording a value costs one bucket computation and a dict update,
+    and memory grows with the spread of the values, not their number.
+    Percentiles are read from the buckets, so they are off by at most
+    the width of a bucket, 1/16 of the value.
+    """
+
+    def __init__(self):
+        """Construct object."""
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def record(self, value):
+        """Add one duration."""
+        bucket = _bucket(value)
+        with self._lock:
+            self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+            self.count += 1
+            self.total += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    def percentile(self, fraction):
+        """Return the duration below which `fraction` of values fall."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = max(1, round(fraction * self.count))
+            # The extremes are known exactly, not just their buckets
+            if rank == 1:
+                return self.min
+            if rank >= self.count:
+                return self.max
+            seen = 0
+            for bucket in sorted(self._buckets):
+                seen += self._buckets[bucket]
+                if seen >= rank:
+                    low, high = _bucket_bounds(bucket)
+                    return min(max((low + high) // 2, self.min), self.max)
+            return self.max
+
+
+class Timings:
+    """Named histograms of how long the instrumented operations take.
+
+    Nothing is recorded until `enable` is called, and a disabled
+    `timed` block or `timed_function` call costs one attribute check.
+    """
+
+    def __init__(self):
+        """Construct object."""
+        self.enabled = False
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        """Return the histogram of a name, creating it if needed."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def record(self, name, duration):
+        """Add a duration in nanoseconds to a named histogram."""
+        self.histogram(name).record(duration)
+
+    def report(self):
+        """Return the timings as a table in milliseconds."""
+        header = ["operation", "count"] + [
+            f"p{round(fraction * 100)}" for fraction in PERCENTILES] + [
+            "max", "total"]
+        rows = []
+        for name in sorted(self.histograms):
+            histogram = self.histograms[name]
+            if not histogram.count:
+                continue
+            values = [histogram.percentile(fraction)
+                      for fraction in PERCENTILES]
+            values += [histogram.max, histogram.total]
+            rows.append([name, str(histogram.count)]
+                        + [f"{value / 1e6:.3f}" for value in values])
+        width = max([len(row[0]) for row in rows] + [len(header[0])])
+        lines = [header[0].ljust(width)
+                 + "".join(f"{column:>10}" for column in header[1:])]
+        for row in rows:
+            lines.append(row[0].ljust(width)
+                         + "".join(f"{value:>10}" for value in row[1:]))
+        return "\n".join(lines)
+
+
+class _Span:
+    """Times one `with` block into a histogram."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        TIMINGS.record(self.name, time.perf_counter_ns() - self.start)
+        return False
+
+
+TIMINGS = Timings()
+_NOT_TIMED = contextlib.nullcontext()
+_dump_target = None
+
+
+def timed(name):
+    """Return a context manager timing its block under `name`."""
+    if not TIMINGS.enabled:
+        return _NOT_TIMED
+    return _Span(name)
+
+
+def timed_function(name):
+    """Decorate a function to time every call under `name`."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not TIMINGS.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                TIMINGS.record(name, time.perf_counter_ns() - start)
+        return wrapper
+    return decorate
+
+
+def dump(target=None):
+    """Write the timings to a file path, or to stderr by default."""
+    target = _dump_target if target is None else target
+    text = (f"Timings at {datetime.now().isoformat(timespec='seconds')}"
+            f" (ms)\n{TIMINGS.report()}\n")
+    if target is None or target == "stderr":
+        sys.stderr.write(text)
+        return
+    directory = os.path.dirname(target)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(target, "a") as dump_file:
+        dump_file.write(text)
+
+
+def _dump_on_signal(signum, frame):
+    dump()
+
+
+def enable(target=None):
+    """Start recording; dump the timings on exit and on SIGUSR1.
+
+    `target` is the file the timings are appended to, stderr if None.
+    """
+    global _dump_target
+    if TIMINGS.enabled:
+        return
+    _dump_target = target
+    TIMINGS.enabled = True
+    atexit.register(dump)
+    if hasattr(signal, "SIGUSR1"):
+        try:
+            signal.signal(signal.SIGUSR1, _dump_on_signal)
+        except ValueError:
+            # Signal handlers can only be set from the main thread
+            pass
@@ -1,5 +1,6 @@
 #classes.py
-from collections import Counter
+import heapq
+from collections import Counter, defaultdict
 from datetime import datetime
 from typing import List, Tuple
 import json
@@ -42,29 +43,82 @@ class Item:
     def __str__(self):
 
         return f"{self.state} {self.category}"
+class CategoryIndex:
+    """Inverted index from lowercased category substrings to stock positions."""
+
+    GRAM_SIZE = 3
+
+    def __init__(self):
+        self._postings = {}  # lowercased category -> sorted positions
+        self._grams = defaultdict(set)  # n-gram -> lowercased categories
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, category: str, position: int) -> None:
+        key = category.lower()
+        positions = self._postings.get(key)
+        if positions is None:
+            positions = self._postings[key] = []
+            for size in range(1, self.GRAM_SIZE + 1):
+                for start in range(len(key) - size + 1):
+                    self._grams[key[start:start + size]].add(key)
+        positions.append(position)
+        self._size += 1
+
+    def categories(self, search_term: str) -> List[str]:
+        term = search_term.lower()
+        if not term:
+            return list(self._postings)
+        if len(term) <= self.GRAM_SIZE:
+            return list(self._grams.get(term, ()))
+
+        candidates = None
+        for start in range(len(term) - self.GRAM_SIZE + 1):
+            matches = self._grams.get(term[start:start + self.GRAM_SIZE])
+            if not matches:
+                return []
+            if candidates is None or len(matches) < len(candidates):
+                candidates = matches
+        return [category for category in candidates if term in category]
+
+    def lookup(self, search_term: str) -> List[int]:
+        postings = [self._postings[category]
+                    for category in self.categories(search_term)]
+        if len(postings) == 1:
+            return list(postings[0])
+        return list(heapq.merge(*postings))
+
 class Warehouse:
 
     def __init__(self, warehouse_id=None):
 
         self.id = warehouse_id
         self.stock = []
+        self._index = CategoryIndex()
 
     def occupancy(self) -> int:
     
         return len(self.stock)
 
     def add_item(self, item: Item) -> None:
+        self._sync_index()
+        self._index.add(item.category, len(self.stock))
         self.stock.append(item)
 
+    def _sync_index(self) -> None:
+        # Pick up items appended to the stock list without add_item
+        for position in range(len(self._index), len(self.stock)):
+            self._index.add(self.stock[position].category, position)
+
     def __str__(self) -> str:
         return f"Warehouse {self.id}"
 
     def search(self, search_term: str) -> List[Item]:
-        return [
-            item
-            for item in self.stock
-            if search_term.lower() in item.category.lower()
-        ]
+        self._sync_index()
+        return [self.stock[position]
+                for position in self._index.lookup(search_term)]
 
 class User:
     def __init__(self, user_name: str = "Anonymous", password=None):
@@ -210,15 +264,14 @@ class Employee(User):
         item_counts = Counter()
 
         for warehouse in stock:
-            for item in warehouse.stock:
-                if search_term.lower() in item.category.lower():
-                    found_items.append(item)
-                    item_key = (
-                        f"{item.state} {item.category} (Warehouse {
-                            item.warehouse})"
-                    )
-                    item_counts[item_key] += 1
-                    self.last_searched_item = item
+            for item in warehouse.search(search_term):
+                found_items.append(item)
+                item_key = (
+                    f"{item.state} {item.category} (Warehouse {
+                        item.warehouse})"
+                )
+                item_counts[item_key] += 1
+                self.last_searched_item = item
 
         return found_items, item_counts
 
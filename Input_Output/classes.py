@@ -1,9 +1,14 @@
 #classes.py
-from collections import Counter
+import heapq
+from collections import Counter, defaultdict
 from datetime import datetime
 from typing import List, Tuple
 import json
 import os
+import uuid
+
+from logwriter import get_writer
+from sessionlog import LOG_DIR, get_session_log
 
 class Item:
 
@@ -16,29 +21,82 @@ class Item:
     def __str__(self):
 
         return f"{self.state} {self.category}"
+class CategoryIndex:
+    """Inverted index from lowercased category substrings to stock positions."""
+
+    GRAM_SIZE = 3
+
+    def __init__(self):
+        self._postings = {}  # lowercased category -> sorted positions
+        self._grams = defaultdict(set)  # n-gram -> lowercased categories
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, category: str, position: int) -> None:
+        key = category.lower()
+        positions = self._postings.get(key)
+        if positions is None:
+            positions = self._postings[key] = []
+            for size in range(1, self.GRAM_SIZE + 1):
+                for start in range(len(key) - size + 1):
+                    self._grams[key[start:start + size]].add(key)
+        positions.append(position)
+        self._size += 1
+
+    def categories(self, search_term: str) -> List[str]:
+        term = search_term.lower()
+        if not term:
+            return list(self._postings)
+        if len(term) <= self.GRAM_SIZE:
+            return list(self._grams.get(term, ()))
+
+        candidates = None
+        for start in range(len(term) - self.GRAM_SIZE + 1):
+            matches = self._grams.get(term[start:start + self.GRAM_SIZE])
+            if not matches:
+                return []
+            if candidates is None or len(matches) < len(candidates):
+                candidates = matches
+        return [category for category in candidates if term in category]
+
+    def lookup(self, search_term: str) -> List[int]:
+        postings = [self._postings[category]
+                    for category in self.categories(search_term)]
+        if len(postings) == 1:
+            return list(postings[0])
+        return list(heapq.merge(*postings))
+
 class Warehouse:
 
     def __init__(self, warehouse_id=None):
 
         self.id = warehouse_id
         self.stock = []
+        self._index = CategoryIndex()
 
     def occupancy(self) -> int:
     
         return len(self.stock)
 
     def add_item(self, item: Item) -> None:
+        self._sync_index()
+        self._index.add(item.category, len(self.stock))
         self.stock.append(item)
 
+    def _sync_index(self) -> None:
+        # Pick up items appended to the stock list without add_item
+        for position in range(len(self._index), len(self.stock)):
+            self._index.add(self.stock[position].category, position)
+
     def __str__(self) -> str:
         return f"Warehouse {self.id}"
 
     def search(self, search_term: str) -> List[Item]:
-        return [
-            item
-            for item in self.stock
-            if search_term.lower() in item.category.lower()
-        ]
+        self._sync_index()
+        return [self.stock[position]
+                for position in self._index.lookup(search_term)]
 
 class User:
     def __init__(self, user_name: str = "Anonymous", password=None):
@@ -150,8 +208,13 @@ class Employee(User):
         self.last_browsed_quantity = self.last_ordered_item = None
         self.last_ordered_quantity = self.last_ordered_item_state = None
         self.last_ordered_item_category = self.displayed_warehouse = None
+        # What the current search-and-order action searched and ordered
+        self.action_searches = []
+        self.action_orders = []
 
     def search_and_order_item(self, stock: List[Warehouse]) -> None:
+        self.action_searches = []
+        self.action_orders = []
         # Authentication check
         if not self.is_authenticated:
             print("You need to be authenticated to search and order items.")
@@ -178,15 +241,16 @@ class Employee(User):
         item_counts = Counter()
 
         for warehouse in stock:
-            for item in warehouse.stock:
-                if search_term.lower() in item.category.lower():
-                    found_items.append(item)
-                    item_key = (
-                        f"{item.state} {item.category} (Warehouse {
-                            item.warehouse})"
-                    )
-                    item_counts[item_key] += 1
-                    self.last_searched_item = item
+            for item in warehouse.search(search_term):
+                found_items.append(item)
+                item_key = (
+                    f"{item.state} {item.category} (Warehouse {
+                        item.warehouse})"
+                )
+                item_counts[item_key] += 1
+                self.last_searched_item = item
+        if found_items:
+            self.action_searches.append(found_items[-1])
 
         return found_items, item_counts
 
@@ -285,6 +349,7 @@ class Employee(User):
             self.last_ordered_item_state = item.state
             self.last_ordered_item_category = item.category
             self.last_ordered_quantity = quantity
+            self.action_orders.append((item.state, item.category, quantity))
         else:
             print("Not enough quantity available for the order.")
 
@@ -305,24 +370,45 @@ class SessionReport:
 class SessionReport:
     def __init__(self, user: User):
         self.user = user
+        self.session_id = uuid.uuid4().hex
         self.actions = []
         self.items_searched = []
         self.items_browsed = []
         self.items_ordered = []
+        self.events = []  # structured records, written by save_to_log
+
+    def _record_event(self, event_type: str, **fields) -> None:
+        self.events.append({
+            "ts": datetime.now().isoformat(timespec="microseconds"),
+            "session": self.session_id,
+            "user": self.user._name,
+            "role": "employee" if self.user.is_authenticated else "user",
+            "type": event_type,
+            **fields,
+        })
 
     def add_action(self, action: str) -> None:
         self.actions.append(action)
+        self._record_event("action", action=action)
 
     def record_searched_item(self, item_name: str) -> None:
         self.items_searched.append(item_name)
+        # The menu passes the last found Item, or None
+        self._record_event(
+            "search",
+            item=None if item_name is None else str(item_name),
+            category=getattr(item_name, "category", None))
 
     def record_browsed_item(self, item_name: str) -> None:
         self.items_browsed.append(item_name)
+        self._record_event("browse", category=item_name)
 
     def record_ordered_item(
         self, item_state: str, item_category: str, quantity: int
     ) -> None:
         self.items_ordered.append((item_state, item_category, quantity))
+        self._record_event("order", state=item_state,
+                           category=item_category, quantity=quantity)
 
     def display_report(self) -> None:
         print(f"Thank you for your visit, {self.user._name}!")
@@ -351,37 +437,7 @@ class SessionReport:
                     )
 
     def save_to_log(self) -> None:
-        current_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-
-        if self.user.is_authenticated:
-            filename = "log/employee_log.txt"
-        else:
-            filename = "log/user_log.txt"
-
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-
-        with open(filename, "a") as log_file:
-            log_file.write(f"Session Report for {self.user._name}:\n")
-
-            if self.items_searched:
-                log_file.write("Items Searched:\n")
-                for i, item_name in enumerate(self.items_searched, 1):
-                    log_file.write(f" {i}. Searched for item: {item_name} - {current_datetime}\n")
-
-            if self.items_browsed:
-                log_file.write("Items Browsed:\n")
-                for i, item_name in enumerate(self.items_browsed, 1):
-                    log_file.write(f" {i}. Browsed item: {item_name} - {current_datetime}\n")
-
-            if self.items_ordered:
-                log_file.write("Items Ordered:\n")
-                for i, (state, category, quantity) in enumerate(self.items_ordered, 1):
-                    log_file.write(
-                        f" {i}. Ordered {quantity} of item: {state} {category} - {current_datetime}\n"
-                    )
-
-            log_file.write(f"Actions performed:\n")
-            for i, action in enumerate(self.actions, 1):
-                log_file.write(f" {i}. {action} - {current_datetime}\n")
+        # One JSON line per event, appended by the background writer
+        get_writer().write(get_session_log(), list(self.events))
 
-        print(f"Session report saved to {filename}")
\ No newline at end of file
+        print(f"Session report saved to {LOG_DIR}")
\ No newline at end of file
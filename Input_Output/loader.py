@@ -5,15 +5,72 @@ import os
 BASE_DIR = os.path.dirname(os.path.realpath(__file__))
 EMPLOYEES_PATH = os.path.join(BASE_DIR, "data", "personnel.json")
 STOCK_PATH = os.path.join(BASE_DIR, "data", "stock.json")
-
-employees = []
-items = []
-
-with open(EMPLOYEES_PATH) as file:
-    employees = json.loads(file.read())
-
-with open(STOCK_PATH) as file:
-    items = json.loads(file.read())
+CHUNK_SIZE = 64 * 1024
+
+
+def _read_json(path):
+    """Read and parse a whole JSON file."""
+    with open(path) as file:
+        return json.load(file)
+
+
+def _iter_json_array(path, chunk_size=CHUNK_SIZE):
+    """Yield the elements of a top-level JSON array one at a time."""
+    decoder = json.JSONDecoder()
+    with open(path) as file:
+        buffer = ""
+        pos = 0
+        eof = False
+        started = False
+
+        while True:
+            # Skip whitespace and separators, reading more data as needed
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                buffer = file.read(chunk_size)
+                pos = 0
+                eof = not buffer
+
+            if pos == len(buffer):
+                raise ValueError(f"Unexpected end of JSON array in {path}")
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError(f"Expected a JSON array in {path}")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            # A bare number or literal may go on in the next chunk until a
+            # "," or "]" follows it, so only trust it once one has been read
+            if end is not None and not eof and buffer[pos] not in '{["':
+                following = end
+                while (following < len(buffer)
+                       and buffer[following] in " \t\r\n"):
+                    following += 1
+                if following == len(buffer) or buffer[following] not in ",]":
+                    end = None
+            # A value touching the end of the buffer may continue in the
+            # next chunk, so only trust it once more data has been read
+            if end is None or (end == len(buffer) and not eof):
+                chunk = file.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+
+            yield element
+            pos = end
 
 
 def _import(name):
@@ -42,15 +99,36 @@ class Loader:
     """Main data loader class."""
 
     model = None
-    objects = None
+    _objects = None
 
     def __init__(self, *args, **kwargs):
-        """Construct object."""
+        """Construct object.
+
+        Nothing is read until the objects are first needed. Pass
+        `stream=True` to read the stock file one record at a time
+        instead of parsing it as a whole.
+        """
         if "model" not in kwargs:
             raise Exception("The loader requires a `model` "
                             "keyword argument to work.")
         self.model = kwargs["model"]
-        self.parse()
+        self.stream = kwargs.get("stream", False)
+
+    @property
+    def objects(self):
+        """Return the objects, loading them on first access."""
+        if self._objects is None:
+            self.parse()
+        return self._objects
+
+    @objects.setter
+    def objects(self, value):
+        self._objects = value
+
+    def preload(self):
+        """Load the objects now instead of on first access."""
+        self.objects
+        return self
 
     def parse(self):
         """Instantiate objects from the data."""
@@ -70,6 +148,7 @@ class Loader:
         """Parse the personnel list."""
         Employee = self.__load_class("Employee")  # noqa: N806
 
+        employees = _read_json(EMPLOYEES_PATH)
         return [Employee(**employee) for employee in employees]
 
     def __parse_stock(self):
@@ -77,7 +156,11 @@ class Loader:
         Item = self.__load_class("Item")  # noqa: N806
         Warehouse = self.__load_class("Warehouse")  # noqa: N806
         warehouses = {}
-        for item in items:
+        if self.stream:
+            records = _iter_json_array(STOCK_PATH)
+        else:
+            records = _read_json(STOCK_PATH)
+        for item in records:
             warehouse_id = str(item["warehouse"])
             if warehouse_id not in warehouses.keys():
                 warehouses[warehouse_id] = Warehouse(warehouse_id)
@@ -0,0 +1,109 @@
+#logwriter.py
+import atexit
+import os
+import queue
+import threading
+import time
+
+FLUSH_INTERVAL = 1.0
+MAX_BATCH = 256
+MAX_PENDING = 10000
+
+
+class LogWriter:
+    """Background writer that batches log records from every session.
+
+    `write` only puts the record on a queue, so callers never wait on
+    file I/O. A worker thread takes the records off the queue and writes
+    them grouped by file, once `max_batch` records are waiting or
+    `flush_interval` seconds have passed, and fsyncs each batch. A crash
+    therefore loses at most the records of the last interval. A target
+    that is not a path is a sink whose `write_batch` gets the list of
+    records queued for it, e.g. a `sessionlog.SessionLog`. When more
+    than `max_pending` records are waiting, new ones are dropped and
+    counted instead of blocking the caller.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH,
+                 max_pending=MAX_PENDING):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, path, text):
+        """Queue text to be appended to a file, or a record for a sink."""
+        if self._closed:
+            raise ValueError("The log writer is closed.")
+        try:
+            self._queue.put_nowait((path, text))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                return
+            batch = [record]
+            # Gather what arrives within the interval, up to a full batch
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                try:
+                    record = self._queue.get(
+                        timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if record is None:
+                    self._write_batch(batch)
+                    return
+                batch.append(record)
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        texts = {}
+        for path, text in batch:
+            texts.setdefault(path, []).append(text)
+        for path, parts in texts.items():
+            try:
+                if not isinstance(path, str):
+                    path.write_batch(parts)
+                    continue
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(path, "a") as log_file:
+                    log_file.write("".join(parts))
+                    log_file.flush()
+                    os.fsync(log_file.fileno())
+            except (OSError, ValueError):
+                # Keep the worker alive; the lost records are counted
+                self.dropped += len(parts)
+
+    def close(self, timeout=None):
+        """Write everything queued so far and stop the worker."""
+        if self._closed:
+            return
+        self._closed = True
+        # The sentinel waits for room, so it is never dropped
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Return the writer shared by all sessions, starting it if needed."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = LogWriter()
+                atexit.register(_writer.close)
+    return _writer
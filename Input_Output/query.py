@@ -40,6 +40,16 @@ def get_selected_operation() -> str:
             return choice
         else:
             print("Invalid choice. Please select a valid option.")
+
+def record_search_and_order(session_report, user):
+    # Only what this action searched and ordered, so a search or an
+    # order is never logged again by a later action
+    session_report.add_action("Searched and Ordered")
+    for item in user.action_searches:
+        session_report.record_searched_item(item)
+    for state, category, quantity in user.action_orders:
+        session_report.record_ordered_item(state, category, quantity)
+
 def main():
     user = None
     while True:
@@ -82,13 +92,7 @@ def main():
                 continue
 
             user.search_and_order_item(stock)
-
-            session_report.add_action("Searched and Ordered")
-            session_report.record_searched_item(user.last_searched_item)
-            session_report.record_ordered_item(
-                user.last_ordered_item_state,
-                user.last_ordered_item_category,
-                user.last_ordered_quantity,)
+            record_search_and_order(session_report, user)
 
         elif choice == "3":
             user.browse_by_category(stock)
@@ -0,0 +1,147 @@
+#reports.py
+import argparse
+import json
+import os
+from collections import Counter
+
+from sessionlog import LOG_DIR, SessionLogReader
+
+STATE_PATH = os.path.join("log", "reports.json")
+
+
+class CrossSessionReport:
+    """Totals over every session recorded in the session log.
+
+    The report keeps orders and units per employee, searches per
+    category, and for every category how many sessions browsed it and
+    how many of those went on to order from it. `update` reads only the
+    log blocks added since the last call, in one pass, and saves the
+    totals together with the position reached after every segment, so a
+    nightly run over months of logs only processes the new data.
+    """
+
+    def __init__(self, state_path=STATE_PATH, log_dir=LOG_DIR):
+        """Construct object, loading the saved totals if there are any."""
+        self.state_path = state_path
+        self.reader = SessionLogReader(log_dir)
+        self.checkpoint = {}
+        self.employee_orders = Counter()
+        self.employee_units = Counter()
+        self.searches = Counter()
+        self.browse_sessions = Counter()
+        self.converted_sessions = Counter()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.state_path) as state_file:
+                state = json.load(state_file)
+        except FileNotFoundError:
+            return
+        self.checkpoint = state["checkpoint"]
+        for name in ("employee_orders", "employee_units", "searches",
+                     "browse_sessions", "converted_sessions"):
+            setattr(self, name, Counter(state[name]))
+
+    def save(self):
+        """Write the totals and the checkpoint, replacing the old state."""
+        state = {
+            "checkpoint": self.checkpoint,
+            "employee_orders": self.employee_orders,
+            "employee_units": self.employee_units,
+            "searches": self.searches,
+            "browse_sessions": self.browse_sessions,
+            "converted_sessions": self.converted_sessions,
+        }
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.state_path + ".tmp", "w") as state_file:
+            json.dump(state, state_file)
+        # Totals and checkpoint change together or not at all
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+    def update(self):
+        """Add the blocks logged since the last update; return their count."""
+        count = 0
+        segment = None
+        for name, number, records in self.reader.blocks(self.checkpoint):
+            if segment is not None and name != segment:
+                self.save()
+            segment = name
+            self._add_block(records)
+            self.checkpoint[name] = number
+            count += 1
+        if count:
+            self.save()
+        return count
+
+    def _add_block(self, records):
+        # A session is written as a whole, so it never spans two blocks
+        browsed = {}
+        converted = set()
+        for record in records:
+            event_type = record.get("type")
+            category = record.get("category")
+            if category is not None:
+                category = category.lower()
+
+            if event_type == "search" and category:
+                self.searches[category] += 1
+            elif event_type == "browse" and category:
+                browsed.setdefault(record["session"], set()).add(category)
+            elif event_type == "order" and record.get("quantity"):
+                if record.get("role") == "employee":
+                    self.employee_orders[record["user"]] += 1
+                    self.employee_units[record["user"]] += record["quantity"]
+                if category in browsed.get(record["session"], ()):
+                    converted.add((record["session"], category))
+
+        for categories in browsed.values():
+            self.browse_sessions.update(categories)
+        self.converted_sessions.update(
+            category for _, category in converted)
+
+    def conversion(self):
+        """Return (category, browsing sessions, ratio) by ratio."""
+        rows = [(category, sessions,
+                 self.converted_sessions[category] / sessions)
+                for category, sessions in self.browse_sessions.items()]
+        return sorted(rows, key=lambda row: (-row[2], -row[1], row[0]))
+
+    def display(self, top=10):
+        """Print the report."""
+        print("Orders per employee:")
+        for user, orders in self.employee_orders.most_common():
+            print(f"{user}: {orders} orders, "
+                  f"{self.employee_units[user]} items")
+
+        print("Most searched categories:")
+        for i, (category, searches) in enumerate(
+                self.searches.most_common(top), 1):
+            print(f"{i}. {category}: {searches} searches")
+
+        print("Browse to order conversion:")
+        for category, sessions, ratio in self.conversion():
+            print(f"{category}: {ratio:.0%} of {sessions} sessions")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Report on every session in the session log.")
+    parser.add_argument("--state", default=STATE_PATH,
+                        help="file keeping the totals and the checkpoint")
+    parser.add_argument("--log-dir", default=LOG_DIR)
+    parser.add_argument("--rebuild", action="store_true",
+                        help="forget the saved totals and read all logs")
+    args = parser.parse_args(argv)
+
+    if args.rebuild and os.path.exists(args.state):
+        os.remove(args.state)
+    report = CrossSessionReport(args.state, args.log_dir)
+    print(f"Read {report.update()} new log blocks.")
+    report.display()
+
+
+if __name__ == "__main__":
+    main()
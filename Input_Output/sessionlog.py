@@ -0,0 +1,300 @@
+#sessionlog.py
+import glob
+import gzip
+import json
+import os
+import threading
+from datetime import datetime
+
+LOG_DIR = os.path.join("log", "sessions")
+MAX_BYTES = 4 * 1024 * 1024
+INDEX_SUFFIX = ".idx"
+
+
+def _segment_day(path):
+    """Return the YYYYMMDD day of a segment file name."""
+    return os.path.basename(path).split("-")[1]
+
+
+def _read_index(path):
+    """Return the index entries of a segment, oldest first."""
+    entries = []
+    try:
+        with open(path + INDEX_SUFFIX) as index_file:
+            for line in index_file:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # An entry torn by a crash; its block is re-indexed
+                    continue
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _indexed_end(entries):
+    """Return the end of the last indexed block of a segment."""
+    return max((entry["offset"] + entry["length"] for entry in entries),
+               default=0)
+
+
+def _block_entry(data):
+    """Return the time range and users of the records of a block."""
+    records = []
+    for line in data.decode().splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    if not records:
+        return {}
+    timestamps = [record["ts"] for record in records]
+    return {
+        "first": min(timestamps),
+        "last": max(timestamps),
+        "users": sorted({record["user"] for record in records}),
+    }
+
+
+class SessionLog:
+    """Structured session log: JSON lines in rotating, gzipped segments.
+
+    Records are appended to `sessions-<day>-<n>.jsonl` in `directory`.
+    Each written batch becomes one block, and a sidecar `.idx` file gets
+    one JSON line per block with its byte offset and length, its first
+    and last timestamp and its users. A segment is closed when it grows
+    past `max_bytes` or the day changes; it is then rewritten as
+    `.jsonl.gz` with every block compressed as its own gzip member, so a
+    reader can still seek straight to the blocks it needs.
+
+    It is a sink for `logwriter.LogWriter`, which calls `write_batch`
+    from its worker thread with the record lists queued by the sessions.
+    Creating it touches no files: the directory is scanned, and older
+    segments compressed, on the first write, so on the worker thread.
+    """
+
+    def __init__(self, directory=LOG_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._path = None
+        self._resumed = False
+
+    def _resume(self):
+        """Continue the open segment of today, closing older ones."""
+        os.makedirs(self.directory, exist_ok=True)
+        today = datetime.now().strftime("%Y%m%d")
+        for path in sorted(glob.glob(
+                os.path.join(self.directory, "sessions-*.jsonl"))):
+            if _segment_day(path) == today:
+                self._path = path
+                self._drop_torn_line(path)
+                if os.path.exists(path + INDEX_SUFFIX):
+                    self._drop_torn_line(path + INDEX_SUFFIX)
+                self._index_tail(path)
+            else:
+                self._compress(path)
+        self._resumed = True
+
+    @staticmethod
+    def _drop_torn_line(path):
+        """Cut a line left half-written by a crash off a file."""
+        with open(path, "r+b") as segment:
+            data = segment.read()
+            if data and not data.endswith(b"\n"):
+                segment.truncate(data.rfind(b"\n") + 1)
+
+    @staticmethod
+    def _index_tail(path):
+        """Index records a crash left written but not indexed.
+
+        Done before anything is appended, so the blocks of a segment
+        always follow one another and the index covers all of them.
+        """
+        end = _indexed_end(_read_index(path))
+        with open(path, "rb") as segment:
+            segment.seek(end)
+            data = segment.read()
+        if not data:
+            return
+        entry = dict(_block_entry(data), offset=end, length=len(data))
+        with open(path + INDEX_SUFFIX, "a") as index_file:
+            index_file.write(json.dumps(entry) + "\n")
+
+    def _new_segment(self, day):
+        """Return the path of the next segment of a day."""
+        existing = glob.glob(
+            os.path.join(self.directory, f"sessions-{day}-*.jsonl*"))
+        numbers = [int(os.path.basename(path).split("-")[2].split(".")[0])
+                   for path in existing if not path.endswith(INDEX_SUFFIX)]
+        number = max(numbers, default=0) + 1
+        return os.path.join(self.directory,
+                            f"sessions-{day}-{number:03d}.jsonl")
+
+    def write_batch(self, batches):
+        """Append lists of records as one indexed block."""
+        records = [record for batch in batches for record in batch]
+        if not records:
+            return
+        data = "".join(json.dumps(record) + "\n"
+                       for record in records).encode()
+        timestamps = [record["ts"] for record in records]
+        entry = {
+            "first": min(timestamps),
+            "last": max(timestamps),
+            "users": sorted({record["user"] for record in records}),
+        }
+
+        with self._lock:
+            if not self._resumed:
+                self._resume()
+            day = datetime.now().strftime("%Y%m%d")
+            if self._path is not None and (
+                    _segment_day(self._path) != day
+                    or os.path.getsize(self._path) >= self.max_bytes):
+                self._compress(self._path)
+                self._path = None
+            if self._path is None:
+                self._path = self._new_segment(day)
+
+            with open(self._path, "ab") as segment:
+                entry["offset"] = segment.tell()
+                entry["length"] = len(data)
+                segment.write(data)
+                segment.flush()
+                os.fsync(segment.fileno())
+            # The index is written after the data, so an entry never
+            # points at a block that is not on disk
+            with open(self._path + INDEX_SUFFIX, "a") as index_file:
+                index_file.write(json.dumps(entry) + "\n")
+
+    def _compress(self, path):
+        """Rewrite a closed segment as gzip members, one per block."""
+        entries = _read_index(path)
+        with open(path, "rb") as segment:
+            data = segment.read()
+        indexed = _indexed_end(entries)
+        if indexed < len(data):
+            # Records written before a crash cut the index short
+            entries.append({"offset": indexed,
+                            "length": len(data) - indexed})
+
+        gz_path = path + ".gz"
+        compressed_entries = []
+        with open(gz_path + ".tmp", "wb") as gz_file:
+            for entry in entries:
+                block = data[entry["offset"]:entry["offset"] + entry["length"]]
+                member = gzip.compress(block)
+                compressed_entries.append(
+                    dict(entry, offset=gz_file.tell(), length=len(member)))
+                gz_file.write(member)
+        with open(gz_path + INDEX_SUFFIX + ".tmp", "w") as index_file:
+            for entry in compressed_entries:
+                index_file.write(json.dumps(entry) + "\n")
+        os.replace(gz_path + ".tmp", gz_path)
+        os.replace(gz_path + INDEX_SUFFIX + ".tmp", gz_path + INDEX_SUFFIX)
+        os.remove(path)
+        if os.path.exists(path + INDEX_SUFFIX):
+            os.remove(path + INDEX_SUFFIX)
+
+
+class SessionLogReader:
+    """Reads the records of a session log, seeking through its indexes.
+
+    Blocks whose time range or users do not match the query are skipped
+    without being read, so time-range and per-user queries only touch
+    the blocks that can match.
+    """
+
+    def __init__(self, directory=LOG_DIR):
+        self.directory = directory
+
+    def segments(self):
+        """Return the segment paths, oldest first."""
+        paths = glob.glob(os.path.join(self.directory, "sessions-*.jsonl"))
+        paths += glob.glob(os.path.join(self.directory, "sessions-*.jsonl.gz"))
+        return sorted(paths)
+
+    def _blocks(self, path):
+        """Return the index entries of a segment, plus any unindexed tail."""
+        entries = _read_index(path)
+        if not path.endswith(".gz"):
+            end = _indexed_end(entries)
+            size = os.path.getsize(path)
+            if end < size:
+                entries.append({"offset": end, "length": size - end})
+        return entries
+
+    def records(self, since=None, until=None, user=None):
+        """Yield the records in a time range, optionally of one user.
+
+        `since` and `until` are ISO timestamps, `since` inclusive and
+        `until` exclusive.
+        """
+        for path in self.segments():
+            for entry in self._blocks(path):
+                # Unindexed blocks carry no bounds and are always read
+                if since is not None and entry.get("last", since) < since:
+                    continue
+                if until is not None and entry.get("first", "") >= until:
+                    continue
+                if user is not None and user not in entry.get(
+                        "users", [user]):
+                    continue
+                yield from self._read_block(path, entry, since, until, user)
+
+    def blocks(self, done=None):
+        """Yield (segment, number, records) for the blocks not yet read.
+
+        `done` maps segment names to the number of their blocks already
+        read, so a consumer can resume where it stopped. Segment names
+        leave out `.gz`, as a segment keeps its blocks when compressed.
+        A tail of the open segment that is not indexed yet is left for a
+        later call.
+        """
+        done = done or {}
+        for path in self.segments():
+            name = os.path.basename(path).removesuffix(".gz")
+            entries = _read_index(path)
+            if path.endswith(".gz"):
+                entries = self._blocks(path)
+            for number in range(done.get(name, 0), len(entries)):
+                records = list(self._read_block(
+                    path, entries[number], None, None, None))
+                yield name, number + 1, records
+
+    def _read_block(self, path, entry, since, until, user):
+        with open(path, "rb") as segment:
+            segment.seek(entry["offset"])
+            data = segment.read(entry["length"])
+        if path.endswith(".gz"):
+            data = gzip.decompress(data)
+        for line in data.decode().splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line torn by a crash in the middle of a write
+                continue
+            if since is not None and record["ts"] < since:
+                continue
+            if until is not None and record["ts"] >= until:
+                continue
+            if user is not None and record["user"] != user:
+                continue
+            yield record
+
+
+_session_log = None
+_session_log_lock = threading.Lock()
+
+
+def get_session_log():
+    """Return the session log shared by all sessions."""
+    global _session_log
+    if _session_log is None:
+        with _session_log_lock:
+            if _session_log is None:
+                _session_log = SessionLog()
+    return _session_log
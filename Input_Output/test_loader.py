@@ -0,0 +1,54 @@
+"""
+Unit tests for the 'loader' module.
+
+The tests check that a JSON array read in small chunks yields the same
+elements as reading it whole, whatever chunk boundary a value spans.
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from loader import _iter_json_array
+
+ELEMENTS = [1.5, -20, 3e10, True, None, "a, b]", {"x": [1, 2]}, [], 12345]
+
+
+class TestIterJsonArray(unittest.TestCase):
+    """Tests for the _iter_json_array function."""
+
+    def setUp(self):
+        """Create a temporary directory for the JSON files."""
+        self.temporary = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temporary.name, "data.json")
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.temporary.cleanup()
+
+    def read(self, text, chunk_size):
+        """Write text to the file and return the elements read back."""
+        with open(self.path, "w") as file:
+            file.write(text)
+        return list(_iter_json_array(self.path, chunk_size))
+
+    def test_every_chunk_size(self):
+        """Test that no chunk boundary splits or drops a value."""
+        for text in (json.dumps(ELEMENTS), json.dumps(ELEMENTS, indent=1)):
+            for chunk_size in range(1, len(text) + 1):
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    self.assertEqual(self.read(text, chunk_size), ELEMENTS)
+
+    def test_number_across_chunks(self):
+        """Test that a number cut by a chunk is read as one number."""
+        self.assertEqual(self.read("[1.5]", 3), [1.5])
+        self.assertEqual(self.read("[10, 200 ]", 2), [10, 200])
+
+    def test_truncated_array(self):
+        """Test that an array cut short raises ValueError."""
+        with self.assertRaises(ValueError):
+            self.read("[1.5, 2", 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
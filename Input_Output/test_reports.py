@@ -0,0 +1,54 @@
+"""
+Unit tests for the 'reports' module.
+
+The tests check that the records of a session only hold the searches
+and orders that actually happened, so the cross-session totals count a
+search without an order, and a repeated search, exactly once each.
+"""
+import unittest
+from unittest.mock import patch
+
+from classes import Employee, Item, SessionReport, Warehouse
+from query import record_search_and_order
+from reports import CrossSessionReport
+
+
+class TestCrossSessionReport(unittest.TestCase):
+    """Tests for the totals of CrossSessionReport."""
+
+    def setUp(self):
+        """Create an authenticated employee and a warehouse of GPS."""
+        self.warehouse = Warehouse(1)
+        for _ in range(3):
+            self.warehouse.add_item(
+                Item("Original", "GPS", 1, "2021-05-26 17:20:10"))
+        self.employee = Employee("John", "password")
+        self.employee.is_authenticated = True
+        self.session = SessionReport(self.employee)
+
+    def search_and_order(self, *answers):
+        """Run one search-and-order action with the given answers."""
+        with patch("builtins.input", side_effect=answers), \
+                patch("builtins.print"):
+            self.employee.search_and_order_item([self.warehouse])
+        record_search_and_order(self.session, self.employee)
+
+    def test_searches_and_orders_are_counted_once(self):
+        """Test that only the actions' own searches and orders count."""
+        self.search_and_order("gps", "1", "2", "cancel")
+        # A search without an order, a cancelled action, a new search
+        self.search_and_order("gps", "cancel", "cancel")
+        self.search_and_order("cancel")
+        self.search_and_order("tablet", "gps", "cancel", "cancel")
+
+        report = CrossSessionReport(state_path="unused.json",
+                                    log_dir="unused")
+        report._add_block(self.session.events)
+
+        self.assertEqual(report.employee_orders, {"John": 1})
+        self.assertEqual(report.employee_units, {"John": 2})
+        self.assertEqual(report.searches, {"gps": 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Unit tests for the 'sessionlog' module.
+
+The tests check that a session log resumed after a crash keeps every
+complete record exactly once, in order, whether the crash tore a line
+or cut the index short, and that creating a log touches no files.
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from sessionlog import INDEX_SUFFIX, SessionLog, SessionLogReader
+
+
+def record(number):
+    """Return a session record numbered for the tests."""
+    return {"ts": f"2024-01-01T00:00:{number:02d}.000000",
+            "session": "s", "user": "john", "role": "employee",
+            "type": "action", "action": str(number)}
+
+
+class TestSessionLog(unittest.TestCase):
+    """Tests for SessionLog and SessionLogReader."""
+
+    def setUp(self):
+        """Create a log in a temporary directory."""
+        self.temporary = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.temporary.name, "sessions")
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.temporary.cleanup()
+
+    def numbers(self):
+        """Return the numbers of the records read back, in order."""
+        return [int(entry["action"])
+                for entry in SessionLogReader(self.directory).records()]
+
+    def test_creating_touches_no_files(self):
+        """Test that the directory is only created by the first write."""
+        log = SessionLog(self.directory)
+        self.assertFalse(os.path.exists(self.directory))
+        log.write_batch([[record(1)]])
+        self.assertEqual(self.numbers(), [1])
+
+    def test_resume_after_unindexed_write(self):
+        """Test that records written but not indexed are kept once."""
+        log = SessionLog(self.directory)
+        log.write_batch([[record(1)]])
+        path = log._path
+        # A crash between writing a block and indexing it
+        with open(path, "a") as segment:
+            segment.write(json.dumps(record(2)) + "\n")
+
+        resumed = SessionLog(self.directory)
+        resumed.write_batch([[record(3)]])
+        self.assertEqual(self.numbers(), [1, 2, 3])
+
+        resumed._compress(path)
+        self.assertEqual(self.numbers(), [1, 2, 3])
+
+    def test_resume_after_torn_lines(self):
+        """Test that torn records and index entries are dropped."""
+        log = SessionLog(self.directory)
+        log.write_batch([[record(1)]])
+        path = log._path
+        with open(path, "a") as segment:
+            segment.write(json.dumps(record(2)) + "\n")
+            segment.write(json.dumps(record(3))[:10])
+        with open(path + INDEX_SUFFIX, "a") as index_file:
+            index_file.write('{"offset": ')
+
+        resumed = SessionLog(self.directory)
+        resumed.write_batch([[record(4)]])
+        self.assertEqual(self.numbers(), [1, 2, 4])
+        with open(path + INDEX_SUFFIX) as index_file:
+            entries = [json.loads(line) for line in index_file]
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(entries[1]["users"], ["john"])
+
+
+if __name__ == "__main__":
+    unittest.main()
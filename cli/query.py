@@ -11,12 +11,31 @@ def list_items_by_warehouse():
         print(f"- {item}")
 
 
+# Function to split an order over the warehouses, fullest first
+def split_order(amount, counts):
+    taken = []
+    for warehouse, count in sorted(counts.items(), key=lambda pair: -pair[1]):
+        if amount <= 0:
+            break
+        if count > 0:
+            taken.append((warehouse, min(count, amount)))
+            amount -= taken[-1][1]
+    return taken
+
+
+# Function to print where the items of an order are taken from
+def print_split(amount, counts):
+    for warehouse, count in split_order(amount, counts):
+        print(f"- {count} from {warehouse}")
+
+
 # Function to search for an item and place an order
 def search_and_order_item(item_name):
     count_warehouse1 = warehouse1.count(item_name)
     count_warehouse2 = warehouse2.count(item_name)
 
     total_available = count_warehouse1 + count_warehouse2
+    counts = {"Warehouse 1": count_warehouse1, "Warehouse 2": count_warehouse2}
 
     print(f"Amount available: {total_available}")
 
@@ -44,6 +63,7 @@ def search_and_order_item(item_name):
 
         if desired_amount <= total_available:
             print(f"{desired_amount} {item_name} have been ordered.")
+            print_split(desired_amount, counts)
         else:
             max_available = min(desired_amount, total_available)
             print("**************************************************")
@@ -59,6 +79,7 @@ def search_and_order_item(item_name):
             )
             if max_order_choice == "y":
                 print(f"{max_available} {item_name} have been ordered.")
+                print_split(max_available, counts)
     else:
         print("Order not placed.")
 